@@ -0,0 +1,79 @@
+"""
+Offline bulk text-to-flowchart conversion; needs no API key or network.
+
+Input is a JSONL file of {"id", "text", "syntax"?, "orientation"?, "layout"?}
+objects (or bare strings), "-" for stdin, or a directory of .txt files. Results are
+written as they complete: JSON lines on stdout, or with --out-dir one
+<id>.json (plus <id>.<format> with --format) per document. A throughput
+report goes to stderr at the end.
+
+Run from the backend directory:
+    python batch_cli.py specs/ --out-dir charts/ --format svg
+    python batch_cli.py docs.jsonl --workers 8 > charts.jsonl
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+from pathlib import Path
+
+from services.batch import (
+    DEFAULT_BATCH_CHUNK_SIZE, EXPORT_FORMATS, BatchStats, batch_workers, iter_batch, read_directory, read_jsonl
+)
+from services.text_parser import TEXT_SYNTAXES
+
+def _documents(source: str):
+    if source == "-":
+        return read_jsonl(sys.stdin)
+    if os.path.isdir(source):
+        return read_directory(source)
+    return read_jsonl(open(source, encoding='utf-8'))
+
+def _safe_name(doc_id) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in str(doc_id)) or "_"
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Convert many process-spec texts to laid-out flowcharts.")
+    parser.add_argument("input", help="JSONL file, '-' for stdin, or a directory of .txt files")
+    parser.add_argument("--out-dir", help="write <id>.json (and <id>.<format>) files here instead of JSONL to stdout")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="also export each chart")
+    parser.add_argument("--syntax", default='flat', choices=TEXT_SYNTAXES)
+    parser.add_argument("--orientation", default='horizontal', choices=('horizontal', 'vertical'))
+    parser.add_argument("--layout", default='hierarchical', choices=('hierarchical', 'layered'))
+    parser.add_argument("--workers", type=int, default=batch_workers(),
+                        help="worker processes, 0 to convert in this process (default: BATCH_WORKERS or CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_BATCH_CHUNK_SIZE,
+                        help="documents per worker task")
+    args = parser.parse_args(argv)
+
+    out_dir = Path(args.out_dir) if args.out_dir else None
+    if out_dir:
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+    stats = BatchStats()
+    results = iter_batch(
+        _documents(args.input), args.format, args.workers, args.chunk_size,
+        defaults={"syntax": args.syntax, "orientation": args.orientation, "layout": args.layout}, stats=stats
+    )
+    for result in results:
+        if "error" in result:
+            print(f"Error in document {result['id']}: {result['error']}", file=sys.stderr)
+        export = result.pop("export", None)
+        if out_dir:
+            name = _safe_name(result["id"])
+            (out_dir / f"{name}.json").write_text(json.dumps(result), encoding='utf-8')
+            if export is not None:
+                (out_dir / f"{name}.{args.format}").write_bytes(export)
+        else:
+            if export is not None:
+                result["export"] = base64.b64encode(export).decode('ascii')
+            sys.stdout.write(json.dumps(result) + "\n")
+
+    report = stats.report()
+    print(f"{report['documents']} documents ({report['failed']} failed) in {report['seconds']:.2f} s, "
+          f"{report['docs_per_sec']} docs/sec", file=sys.stderr)
+    return 1 if report["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Bulk text conversion: one HTTP round trip per document to
+/api/text-to-flowchart versus one /api/batch/text-to-flowchart request and
+the in-process batch runner, on a corpus of generated process specs.
+
+Run from the backend directory (BATCH_WORKERS sets the endpoint's pool):
+    python -m benchmarks.bench_batch
+"""
+import json
+import os
+import random
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.stub_llm import free_port, serve_in_thread
+from services.batch import iter_batch
+
+DOCUMENTS = 2000
+STEPS = 30
+ACTIONS = ["Get user input", "Validate data", "Save record", "Send email", "Print receipt",
+           "Load settings", "Check stock?", "Update totals", "Display summary", "Notify manager"]
+
+def make_spec(seed: int, steps: int = STEPS) -> str:
+    """A process spec with a start, ``steps`` actions and conditional branches, and an end."""
+    rng = random.Random(seed)
+    lines = ["Start"]
+    for i in range(steps):
+        action = f"{rng.choice(ACTIONS)} {i}"
+        if rng.random() < 0.2:
+            lines.append(f"If {action} -> Handle case {i}")
+            lines.append(f"Else -> Skip case {i}")
+        else:
+            lines.append(f"- {action}")
+    lines.append("End")
+    return "\n".join(lines)
+
+def make_corpus(count: int = DOCUMENTS) -> List[Dict]:
+    return [{"id": str(i), "text": make_spec(i)} for i in range(count)]
+
+def per_document(base_url: str, corpus: List[Dict]) -> float:
+    start = time.perf_counter()
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        for doc in corpus:
+            client.post("/api/text-to-flowchart", json={"text": doc["text"]}).raise_for_status()
+    return time.perf_counter() - start
+
+def batch_request(base_url: str, corpus: List[Dict], export_format: str = None) -> float:
+    body = "\n".join(json.dumps(doc) for doc in corpus)
+    params = {"format": export_format} if export_format else {}
+    start = time.perf_counter()
+    with httpx.Client(base_url=base_url, timeout=600) as client:
+        with client.stream("POST", "/api/batch/text-to-flowchart", params=params, content=body) as response:
+            response.raise_for_status()
+            results = sum(1 for line in response.iter_lines() if line)
+    assert results == len(corpus) + 1
+    return time.perf_counter() - start
+
+def in_process(corpus: List[Dict], workers: int, export_format: str = None) -> float:
+    start = time.perf_counter()
+    for _ in iter_batch(iter(corpus), export_format, workers):
+        pass
+    return time.perf_counter() - start
+
+def main():
+    corpus = make_corpus()
+    workers = os.cpu_count() or 1
+    port = free_port()
+    import main as app_module
+    serve_in_thread(app_module.app, port)
+    base_url = f"http://127.0.0.1:{port}"
+
+    print(f"{len(corpus)} documents of {STEPS} steps, {workers} CPUs")
+    print(f"{'runner':>34} {'seconds':>8} {'docs/sec':>9}")
+    runs = [
+        ("HTTP, one request per document", lambda: per_document(base_url, corpus)),
+        ("HTTP batch endpoint", lambda: batch_request(base_url, corpus)),
+        ("HTTP batch endpoint, svg export", lambda: batch_request(base_url, corpus, 'svg')),
+        ("in-process, 0 workers", lambda: in_process(corpus, 0)),
+        (f"in-process, {workers} workers", lambda: in_process(corpus, workers)),
+        (f"in-process, {workers} workers, svg", lambda: in_process(corpus, workers, 'svg')),
+        (f"in-process, {workers} workers, png", lambda: in_process(corpus[:20], workers, 'png') * 100),
+    ]
+    for name, run in runs:
+        seconds = run()
+        print(f"{name:>34} {seconds:>8.2f} {len(corpus) / seconds:>9.1f}")
+    print("(png is timed on 20 documents and scaled)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Level of detail on large charts: normalize + layout of every node against
+the collapsed overview (services.clustering), with the size of each answer
+as JSON, then expanding clusters (first time and again from the cached
+sub-layout) and exporting the overview and the full chart as SVG.
+
+Run from the backend directory:
+    python -m benchmarks.bench_clusters
+"""
+import random
+import time
+from typing import Dict
+
+import orjson
+
+from services.clustering import ClusterStore
+from services.export_service import export_to_svg
+from services.layout_engine import apply_auto_layout
+from services.normalize import normalize_flowchart
+
+SIZES = [10_000, 50_000]
+REPEATS = 3
+
+def make_process_chart(num_nodes: int, seed: int = 0) -> Dict:
+    """
+    Stages of 4-25 steps, each closed by a decision that retries the stage
+    (about 30%) and sometimes skips the next one: long chains and loops,
+    as in large generated process charts.
+    """
+    rng = random.Random(seed)
+    nodes = []
+    edges = []
+    decisions = []
+    previous = None
+    while len(nodes) < num_nodes:
+        start = len(nodes) + 1
+        for i in range(start, min(num_nodes, start + rng.randint(4, 25)) + 1):
+            nodes.append({"id": str(i), "text": f"Step {i}", "type": "process"})
+            if previous is not None:
+                edges.append([previous, str(i)])
+            previous = str(i)
+        if len(nodes) == num_nodes:
+            break
+        decision = str(len(nodes) + 1)
+        nodes.append({"id": decision, "text": f"Check {decision}?", "type": "decision"})
+        edges.append([previous, decision])
+        if rng.random() < 0.3:
+            edges.append([decision, str(start), "no"])
+        decisions.append(decision)
+        previous = decision
+    for decision in decisions:
+        if rng.random() < 0.2:
+            target = int(decision) + rng.randint(30, 60)
+            if target <= num_nodes:
+                edges.append([decision, str(target), "skip"])
+    return {"nodes": nodes, "edges": edges}
+
+def _best(fn) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def _copy(chart: Dict) -> Dict:
+    return {"nodes": [dict(node) for node in chart["nodes"]], "edges": chart["edges"]}
+
+def _full(chart: Dict) -> Dict:
+    normalized, _ = normalize_flowchart(_copy(chart))
+    return apply_auto_layout(normalized)
+
+def _overview(store: ClusterStore, chart: Dict) -> Dict:
+    normalized, _ = normalize_flowchart(_copy(chart))
+    return store.collapse(normalized)
+
+def main():
+    store = ClusterStore()
+    print(f"{'nodes':>7} {'answer':>9} {'ms':>9} {'nodes sent':>11} {'KiB':>9}")
+    for size in SIZES:
+        chart = make_process_chart(size)
+        full = _full(chart)
+        overview = _overview(store, chart)
+        for name, fn, result in (("full", lambda: _full(chart), full),
+                                 ("overview", lambda: _overview(store, chart), overview)):
+            print(f"{size:>7} {name:>9} {_best(fn):>9.1f} {len(result['nodes']):>11} "
+                  f"{len(orjson.dumps(result)) / 1024:>9.1f}")
+
+        clustered = store.get(overview["chart_id"])
+        kinds = {}
+        for cluster in overview["clusters"]:
+            kinds[cluster["kind"]] = kinds.get(cluster["kind"], 0) + 1
+        largest = max(overview["clusters"], key=lambda cluster: cluster["size"])
+        start = time.perf_counter()
+        expanded = clustered.expand(largest["id"])
+        first_ms = (time.perf_counter() - start) * 1000
+        again_ms = _best(lambda: clustered.expand(largest["id"]))
+        print(f"{'':>7} clusters: {kinds}; expand {largest['kind']} of {largest['size']}: "
+              f"first {first_ms:.2f} ms, cached {again_ms:.2f} ms, "
+              f"{len(orjson.dumps(expanded)) / 1024:.1f} KiB")
+
+        start = time.perf_counter()
+        svg = export_to_svg(clustered.overview["nodes"], clustered.overview["edges"])
+        overview_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        placed = clustered.full_chart()
+        svg_full = export_to_svg(placed["nodes"], placed["edges"])
+        full_ms = (time.perf_counter() - start) * 1000
+        print(f"{'':>7} svg export: overview {overview_ms:.1f} ms / {len(svg) / 1024:.0f} KiB, "
+              f"full (first, with layout) {full_ms:.1f} ms / {len(svg_full) / 1024:.0f} KiB\n")
+
+if __name__ == "__main__":
+    main()
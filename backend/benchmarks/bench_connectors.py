@@ -0,0 +1,56 @@
+"""
+Box and connector detection against the golden corpus: edge precision and
+recall versus ground truth, and detection time. OCR is not needed.
+
+Run from the backend directory:
+    python -m benchmarks.bench_connectors
+"""
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.golden_corpus import iter_cases
+from services.image_processor import detect_connectors, detect_shape_regions
+
+def match_regions(regions, centers):
+    """Map region index -> node id by which node centre falls in the region's box."""
+    mapping = {}
+    for i, region in enumerate(regions):
+        x, y, w, h = region["bbox"]
+        for node_id, (cx, cy) in centers.items():
+            if x <= cx <= x + w and y <= cy <= y + h:
+                mapping[i] = node_id
+    return mapping
+
+def score_case(image, truth) -> dict:
+    """Detect boxes and connectors in one corpus image and score the edges against its truth."""
+    gray = np.array(image)
+    start = time.perf_counter()
+    _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    regions = detect_shape_regions(thresh)
+    edges = detect_connectors(thresh, regions)
+    elapsed = time.perf_counter() - start
+
+    mapping = match_regions(regions, truth["centers"])
+    found = {(mapping.get(u), mapping.get(v)) for u, v in edges}
+    expected = {(e[0], e[1]) for e in truth["chart"]["edges"]}
+    hits = len(found & expected)
+    return {
+        "pixels": gray.size,
+        "boxes": len(regions),
+        "precision": hits / len(found) if found else 0.0,
+        "recall": hits / len(expected) if expected else 1.0,
+        "seconds": elapsed
+    }
+
+def main():
+    print(f"{'case':>16} {'pixels':>9} {'boxes':>9} {'precision':>9} {'recall':>7} {'ms':>7}")
+    for name, image, truth in iter_cases():
+        score = score_case(image, truth)
+        boxes = f"{score['boxes']}/{len(truth['centers'])}"
+        print(f"{name:>16} {score['pixels']:>9} {boxes:>9} {score['precision']:>9.2f} "
+              f"{score['recall']:>7.2f} {score['seconds'] * 1000:>7.1f}")
+
+if __name__ == "__main__":
+    main()
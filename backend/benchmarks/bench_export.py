@@ -0,0 +1,87 @@
+"""
+Export endpoints on a 5k-node chart: base64-in-JSON versus the raw
+streaming variants. Every measurement gets a fresh server process; the
+table shows time to first byte, total time and the server's peak RSS
+growth during the request (Linux only).
+
+Run from the backend directory:
+    python -m benchmarks.bench_export
+"""
+import multiprocessing
+import os
+import time
+
+import httpx
+
+from benchmarks.bench_png import make_grid_chart
+from benchmarks.stub_llm import free_port
+
+# 50 levels x 100 nodes; PNG is rendered at 0.5x to stay within the pixel limit
+GRID = (50, 100)
+PNG_SCALE = 0.5
+ROUTES = [
+    ("png", "/api/export/png", {"scale": PNG_SCALE}),
+    ("png", "/api/export/png/stream", {"scale": PNG_SCALE}),
+    ("svg", "/api/export/svg", {}),
+    ("svg", "/api/export/svg/stream", {}),
+    ("pdf", "/api/export/pdf", {}),
+    ("pdf", "/api/export/pdf/stream", {}),
+]
+
+def _serve(port: int) -> None:
+    # No OCR workers: the export routes do not use them
+    os.environ["IMAGE_WORKERS"] = "0"
+    import uvicorn
+    import main
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+def _status_mb(pid: int, field: str) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def measure(path: str, params: dict, chart: dict):
+    port = free_port()
+    server = multiprocessing.get_context("spawn").Process(target=_serve, args=(port,))
+    server.start()
+    url = f"http://127.0.0.1:{port}"
+    try:
+        with httpx.Client(base_url=url, timeout=300) as client:
+            while True:
+                try:
+                    client.get("/")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.05)
+            # Warm up imports and fonts on a tiny chart first
+            client.post(path, params=params, json=make_grid_chart(2, 2))
+            baseline = _status_mb(server.pid, "VmRSS:")
+
+            start = time.perf_counter()
+            first_byte = None
+            size = 0
+            with client.stream("POST", path, params=params, json=chart) as response:
+                response.raise_for_status()
+                for piece in response.iter_raw():
+                    if first_byte is None:
+                        first_byte = time.perf_counter() - start
+                    size += len(piece)
+            total = time.perf_counter() - start
+            peak = _status_mb(server.pid, "VmHWM:") - baseline
+    finally:
+        server.kill()
+        server.join()
+    return first_byte, total, peak, size
+
+def main():
+    chart = make_grid_chart(*GRID)
+    print(f"{len(chart['nodes'])} nodes, {len(chart['edges'])} edges")
+    print(f"{'route':>24} {'ttfb s':>8} {'total s':>8} {'peak MB':>8} {'bytes':>10}")
+    for _, path, params in ROUTES:
+        first_byte, total, peak, size = measure(path, params, chart)
+        print(f"{path:>24} {first_byte:>8.3f} {total:>8.3f} {peak:>8.0f} {size:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+CompactGraph vs networkx micro-benchmark: build time, BFS time, peak memory
+and cold import time. networkx is optional; its rows are skipped when it is
+not installed.
+
+Run from the backend directory:
+    python -m benchmarks.bench_graph
+"""
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+from benchmarks.bench_layout import make_flowchart
+from services.graph import CompactGraph
+
+SIZES = [1_000, 10_000, 100_000]
+
+def import_time(module: str) -> float:
+    """Cold import time of a module in a fresh interpreter."""
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=".")
+    return float(out.stdout.strip()) if out.returncode == 0 else float("nan")
+
+def compact_path(chart):
+    graph = CompactGraph.from_flowchart(chart["nodes"], chart["edges"], include_dangling=True)
+    seen = set(graph.sources())
+    queue = deque(seen)
+    while queue:
+        for succ in graph.successors(queue.popleft()):
+            if succ not in seen:
+                seen.add(succ)
+                queue.append(succ)
+    return graph
+
+def networkx_path(chart):
+    import networkx as nx
+    G = nx.DiGraph()
+    for node in chart["nodes"]:
+        G.add_node(node["id"])
+    for edge in chart["edges"]:
+        G.add_edge(edge[0], edge[1])
+    seen = {n for n in G.nodes() if G.in_degree(n) == 0}
+    queue = deque(seen)
+    while queue:
+        for succ in G.successors(queue.popleft()):
+            if succ not in seen:
+                seen.add(succ)
+                queue.append(succ)
+    return G
+
+def measure(fn, chart):
+    start = time.perf_counter()
+    fn(chart)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = fn(chart)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, peak
+
+def main():
+    try:
+        import networkx  # noqa: F401
+        paths = [("compact", compact_path), ("networkx", networkx_path)]
+    except ImportError:
+        paths = [("compact", compact_path)]
+
+    print("cold import:")
+    print(f"  services.graph {import_time('services.graph') * 1000:8.2f} ms")
+    if len(paths) > 1:
+        print(f"  networkx       {import_time('networkx') * 1000:8.2f} ms")
+
+    print(f"\n{'nodes':>8} {'path':>9} {'seconds':>9} {'peak MiB':>9}")
+    for size in SIZES:
+        chart = make_flowchart(size)
+        for name, fn in paths:
+            elapsed, peak = measure(fn, chart)
+            print(f"{size:>8} {name:>9} {elapsed:>9.4f} {peak / 2**20:>9.2f}")
+
+if __name__ == "__main__":
+    main()
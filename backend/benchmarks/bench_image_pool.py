@@ -0,0 +1,63 @@
+"""
+Concurrent upload benchmark for /api/image-to-flowchart.
+
+Runs main.app on a background thread and fires concurrent uploads of a
+synthetic flowchart image. Reports throughput, how many uploads were
+rejected with 503 by the bounded queue, and the latency of GET / while
+uploads are in flight (the event loop must stay responsive).
+
+Run from the backend directory (IMAGE_WORKERS / IMAGE_QUEUE_SIZE apply):
+    python -m benchmarks.bench_image_pool
+"""
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from benchmarks.stub_llm import free_port, serve_in_thread
+from benchmarks.synthetic_images import make_synthetic_chart, render_flowchart_image
+
+CONCURRENCY = [1, 4, 16, 32]
+
+async def run(base_url: str, image: bytes, uploads: int):
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        async def upload():
+            files = {"file": ("chart.png", image, "image/png")}
+            return (await client.post("/api/image-to-flowchart", files=files)).status_code
+
+        async def probe(stop: asyncio.Event, samples: list):
+            while not stop.is_set():
+                start = time.perf_counter()
+                await client.get("/")
+                samples.append(time.perf_counter() - start)
+                await asyncio.sleep(0.05)
+
+        stop = asyncio.Event()
+        samples = []
+        prober = asyncio.create_task(probe(stop, samples))
+        start = time.perf_counter()
+        codes = await asyncio.gather(*(upload() for _ in range(uploads)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await prober
+        return codes, elapsed, samples
+
+def main():
+    import main as app_module
+    port = free_port()
+    serve_in_thread(app_module.app, port)
+    image = render_flowchart_image(make_synthetic_chart(12))
+    pool = app_module.get_image_pool()
+    print(f"image {len(image)} bytes, workers={pool.max_workers}, queue={pool.max_queue}")
+    print(f"{'uploads':>8} {'ok/s':>8} {'503s':>6} {'probe p50 ms':>13} {'probe max ms':>13}")
+
+    for uploads in CONCURRENCY:
+        codes, elapsed, samples = asyncio.run(run(f"http://127.0.0.1:{port}", image, uploads))
+        ok = codes.count(200)
+        p50 = statistics.median(samples) * 1000 if samples else float("nan")
+        worst = max(samples) * 1000 if samples else float("nan")
+        print(f"{uploads:>8} {ok / elapsed:>8.2f} {codes.count(503):>6} {p50:>13.2f} {worst:>13.2f}")
+
+if __name__ == "__main__":
+    main()
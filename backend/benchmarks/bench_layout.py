@@ -0,0 +1,45 @@
+"""
+Layout engine scaling benchmark.
+
+Run from the backend directory:
+    python -m benchmarks.bench_layout
+"""
+import random
+import time
+from typing import Dict
+
+from services.layout_engine import apply_auto_layout
+
+SIZES = [100, 1_000, 10_000, 100_000]
+
+def make_flowchart(num_nodes: int, branching: float = 0.2, seed: int = 0) -> Dict:
+    """Build a connected chart: a main chain plus random forward branches."""
+    rng = random.Random(seed)
+    nodes = [{"id": str(i), "text": f"Step {i}", "type": "process"} for i in range(1, num_nodes + 1)]
+    edges = [[str(i), str(i + 1)] for i in range(1, num_nodes)]
+    for i in range(1, num_nodes - 1):
+        if rng.random() < branching:
+            target = rng.randint(i + 2, min(num_nodes, i + 20))
+            edges.append([str(i), str(target), "yes"])
+    return {"nodes": nodes, "edges": edges}
+
+def time_layout(chart: Dict, orientation: str, layout: str = 'hierarchical', repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        data = {"nodes": [dict(n) for n in chart["nodes"]], "edges": chart["edges"]}
+        start = time.perf_counter()
+        apply_auto_layout(data, orientation, layout)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    print(f"{'nodes':>8} {'layout':>12} {'orientation':>11} {'seconds':>10} {'us/node':>9}")
+    for size in SIZES:
+        chart = make_flowchart(size)
+        for layout in ('hierarchical', 'layered'):
+            for orientation in ('horizontal', 'vertical'):
+                elapsed = time_layout(chart, orientation, layout)
+                print(f"{size:>8} {layout:>12} {orientation:>11} {elapsed:>10.4f} {elapsed / size * 1e6:>9.2f}")
+
+if __name__ == "__main__":
+    main()
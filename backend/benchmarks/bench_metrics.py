@@ -0,0 +1,117 @@
+"""
+Instrumentation overhead: the cost of one stage timer, one size
+observation and one pass through MetricsMiddleware, and the text pipeline
+(parse + layout of a 30-step spec, the /api/text-to-flowchart work) with
+metrics on, off, and on with Server-Timing. Also times a /metrics render.
+
+Run from the backend directory:
+    python -m benchmarks.bench_metrics
+"""
+import asyncio
+import time
+
+import services.metrics as metrics_module
+from benchmarks.bench_batch import make_spec
+from services.layout_engine import apply_auto_layout
+from services.metrics import Metrics, MetricsMiddleware, observe_size, timed
+from services.text_parser import parse_text
+
+CALLS = 200_000
+PIPELINE_RUNS = 4000
+ROUNDS = 40
+REQUESTS = 20_000
+
+def set_metrics(enabled: bool) -> None:
+    metrics_module.metrics = Metrics() if enabled else None
+    metrics_module._metrics_ready = True
+
+def per_call_ns(fn, calls: int = CALLS) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) * 1e9 / calls
+
+def timer_once():
+    with timed("parse"):
+        pass
+
+def pipeline(spec: str):
+    def run():
+        apply_auto_layout(parse_text(spec))
+    return run
+
+async def _app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+async def _receive():
+    return {"type": "http.request", "body": b""}
+
+async def _send(message):
+    pass
+
+def asgi_us(app) -> float:
+    scope = {"type": "http", "method": "POST", "path": "/api/text-to-flowchart", "headers": []}
+
+    async def run():
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            await app(dict(scope), _receive, _send)
+        return time.perf_counter() - start
+
+    return asyncio.run(run()) * 1e6 / REQUESTS
+
+def main():
+    baseline = per_call_ns(lambda: None)
+    print(f"{'per call':>34} {'ns':>8}")
+    for enabled in (False, True):
+        set_metrics(enabled)
+        state = "on" if enabled else "off"
+        timer_ns = per_call_ns(timer_once) - baseline
+        size_ns = per_call_ns(lambda: observe_size('nodes', 42)) - baseline
+        print(f"{'timed() stage, metrics ' + state:>34} {timer_ns:>8.0f}")
+        print(f"{'observe_size(), metrics ' + state:>34} {size_ns:>8.0f}")
+
+    print(f"\n{'per request':>34} {'us':>8}")
+    bare = asgi_us(_app)
+    for enabled, server_timing in ((False, False), (True, False), (True, True)):
+        set_metrics(enabled)
+        middleware = MetricsMiddleware(_app)
+        middleware.server_timing = server_timing
+        name = f"middleware, metrics {'on' if enabled else 'off'}" + (", Server-Timing" if server_timing else "")
+        middleware_us = asgi_us(middleware) - bare
+        print(f"{name:>34} {middleware_us:>8.2f}")
+
+    spec = make_spec(0)
+    run = pipeline(spec)
+    run()
+    configs = (("metrics off", False, False), ("metrics on", True, False),
+               ("metrics on + Server-Timing", True, True))
+    # Configurations take turns and each keeps its best round, so drift in
+    # machine speed does not swamp a difference of a few microseconds
+    best = {name: float("inf") for name, _, _ in configs}
+    for _ in range(ROUNDS):
+        for name, enabled, server_timing in configs:
+            set_metrics(enabled)
+            token = metrics_module._request_timings.set({} if server_timing else None)
+            best[name] = min(best[name], per_call_ns(run, PIPELINE_RUNS // ROUNDS) / 1000)
+            metrics_module._request_timings.reset(token)
+    print(f"\n{'parse + layout, 30 steps':>34} {'us':>8} {'overhead':>9}")
+    for name, _, _ in configs:
+        print(f"{name:>34} {best[name]:>8.1f} {best[name] / best['metrics off'] - 1:>8.2%}")
+    # A text request runs two stages, records two sizes and passes the (last, Server-Timing) middleware once
+    estimate = (2 * timer_ns + 2 * size_ns) / 1000 + middleware_us
+    print(f"{'added per request, Server-Timing':>34} {estimate:>8.1f} {estimate / best['metrics off']:>8.2%}")
+
+    set_metrics(True)
+    registry = metrics_module.get_metrics()
+    for stage in ("parse", "llm", "layout", "export_png", "export_svg", "export_pdf", "image_decode", "image_ocr"):
+        registry.observe_stage(stage, 0.01)
+    for kind in ("nodes", "edges", "image_bytes", "export_bytes"):
+        registry.observe_size(kind, 100)
+    start = time.perf_counter()
+    body = registry.render()
+    print(f"\n/metrics render: {(time.perf_counter() - start) * 1000:.2f} ms, {len(body)} bytes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Live editing of a nested-syntax spec: cost per keystroke of an editor
+session (re-parse the touched statements, lay out the nodes the edit
+affects) against re-parsing and re-laying out the whole document. Keystrokes
+either retype a step near the middle of the spec (text-only edits) or add
+a new step after it (structural edits); "parse only" is the retyping
+without layout, and "with gotos" the same on a spec whose rejected orders
+jump back to earlier steps.
+
+Run from the backend directory:
+    python -m benchmarks.bench_nested
+"""
+import random
+import time
+from typing import List
+
+from services.layout_engine import apply_auto_layout
+from services.nested_parser import DocumentStore, NestedDocument, parse_nested_text
+
+SIZES = [1_000, 10_000, 50_000]
+KEYSTROKES = 50
+
+def make_nested_spec(num_lines: int, seed: int = 0, gotos: bool = False) -> List[str]:
+    """
+    Steps with nested if/else, while and repeat blocks, about ``num_lines``
+    lines. With ``gotos``, rejected orders jump back to an earlier step.
+    """
+    rng = random.Random(seed)
+    lines = ["Start"]
+    while len(lines) < num_lines - 1:
+        i = len(lines)
+        roll = rng.random()
+        if roll < 0.1:
+            lines += [f"if order {i} valid:", f"    Save order {i}", f"    if priority {i}:",
+                      f"        Ship express {i}", "    else:", f"        Ship ground {i}",
+                      "else:", f"    Reject order {i}"]
+            if gotos:
+                lines.append(f"    goto Process record {rng.randrange(1, i)}")
+        elif roll < 0.15:
+            lines += [f"while items {i} left:", f"    Pack item {i}"]
+        elif roll < 0.2:
+            lines += ["repeat:", f"    Send reminder {i}", f"until paid {i}"]
+        else:
+            lines.append(f"Process record {i}")
+    lines.append("End")
+    return lines
+
+def parse_ms(lines: List[str], target: int, word: str) -> float:
+    document = NestedDocument(lines)
+    start = time.perf_counter()
+    for n in range(KEYSTROKES):
+        document.edit(target, target + 1, [word[:min(len(word), 14 + n)]])
+    return (time.perf_counter() - start) * 1000 / KEYSTROKES
+
+def main():
+    print(f"{'lines':>7} {'nodes':>7} {'full ms':>8} {'retype ms':>10} {'new line ms':>12} "
+          f"{'parse only ms':>14} {'with gotos ms':>14}")
+    for size in SIZES:
+        lines = make_nested_spec(size)
+        text = "\n".join(lines)
+        start = time.perf_counter()
+        apply_auto_layout(parse_nested_text(text), 'vertical')
+        full_ms = (time.perf_counter() - start) * 1000
+
+        store = DocumentStore()
+        version = store.open("doc", text, 'vertical')["version"]
+        target = next(i for i in range(len(lines) // 2, len(lines)) if lines[i].startswith("    Save order"))
+        word = "    Save order and notify the warehouse"
+
+        # Typing into an existing step: text-only edits
+        start = time.perf_counter()
+        for n in range(KEYSTROKES):
+            typed = word[:min(len(word), 14 + n)]
+            version = store.edit("doc", version, target, target + 1, [typed])["version"]
+        retype_ms = (time.perf_counter() - start) * 1000 / KEYSTROKES
+
+        # Pressing enter and typing a new step: structural edits
+        start = time.perf_counter()
+        version = store.edit("doc", version, target + 1, target + 1, ["    N"])["version"]
+        for n in range(KEYSTROKES - 1):
+            version = store.edit("doc", version, target + 1, target + 2, [f"    Notify {n}"])["version"]
+        new_line_ms = (time.perf_counter() - start) * 1000 / KEYSTROKES
+
+        plain_ms = parse_ms(lines, target, word)
+        jumping = make_nested_spec(size, gotos=True)
+        goto_target = next(i for i in range(len(jumping) // 2, len(jumping)) if jumping[i].startswith("    Save order"))
+        goto_ms = parse_ms(jumping, goto_target, word)
+
+        nodes = len(parse_nested_text(text)["nodes"])
+        print(f"{size:>7} {nodes:>7} {full_ms:>8.1f} {retype_ms:>10.3f} {new_line_ms:>12.2f} "
+              f"{plain_ms:>14.3f} {goto_ms:>14.3f}")
+
+if __name__ == "__main__":
+    main()
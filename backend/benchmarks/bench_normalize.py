@@ -0,0 +1,70 @@
+"""
+Normalization cost next to layout, on clean charts and on "LLM-style"
+charts with the usual defects: integer ids, repeated nodes, edges to ids
+that do not exist, unknown node types and detached sub-flows. For the
+messy charts it also reports the repairs and whether any two nodes still
+share a position after layout.
+
+Run from the backend directory:
+    python -m benchmarks.bench_normalize
+"""
+import random
+import time
+from typing import Dict
+
+from benchmarks.bench_layout import make_flowchart
+from services.layout_engine import apply_auto_layout
+from services.normalize import normalize_flowchart
+
+SIZES = [100, 1_000, 10_000]
+REPEATS = 5
+
+def make_messy_chart(num_nodes: int, seed: int = 0) -> Dict:
+    """make_flowchart split into 4 detached flows, with about 5% of each defect mixed in."""
+    rng = random.Random(seed)
+    chart = make_flowchart(num_nodes, seed=seed)
+    nodes = [dict(node) for node in chart["nodes"]]
+    quarter = -(-num_nodes // 4)
+    edges = [edge for edge in chart["edges"] if (int(edge[0]) - 1) // quarter == (int(edge[1]) - 1) // quarter]
+    for node in rng.sample(nodes, num_nodes // 20):
+        node["id"] = int(node["id"])
+        node["type"] = rng.choice(["terminal", "action", None])
+    nodes += [dict(node) for node in rng.sample(nodes, num_nodes // 20)]
+    edges += [[str(rng.randint(1, num_nodes)), f"missing-{k}"] for k in range(num_nodes // 20)]
+    return {"nodes": nodes, "edges": edges}
+
+def _best(fn) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def _copy(chart: Dict) -> Dict:
+    return {"nodes": [dict(node) for node in chart["nodes"]], "edges": chart["edges"]}
+
+def main():
+    print(f"{'chart':>16} {'normalize ms':>13} {'layout ms':>10} {'share':>7}")
+    for size in SIZES:
+        for kind, chart in (("clean", make_flowchart(size)), ("messy", make_messy_chart(size))):
+            normalized, report = normalize_flowchart(chart)
+            normalize_ms = _best(lambda: normalize_flowchart(chart))
+            layout_ms = _best(lambda: apply_auto_layout(_copy(normalized)))
+            print(f"{f'{kind} {size}':>16} {normalize_ms:>13.2f} {layout_ms:>10.2f} "
+                  f"{normalize_ms / (normalize_ms + layout_ms):>7.1%}")
+
+    chart = make_messy_chart(1_000)
+    normalized, report = normalize_flowchart(chart)
+    print(f"\nmessy 1000: {report}")
+    for name, data in (("as sent", chart), ("normalized", normalized)):
+        try:
+            placed = apply_auto_layout(_copy(data))
+            positions = [(node["position"]["x"], node["position"]["y"]) for node in placed["nodes"]]
+            overlaps = len(positions) - len(set(positions))
+            print(f"{name:>12}: {overlaps} nodes share a position with another")
+        except Exception as e:
+            print(f"{name:>12}: layout failed: {e!r}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Whole-page tesseract versus contour-guided per-box OCR on synthetic
+flowchart images of increasing size. Needs the tesseract binary.
+
+Run from the backend directory:
+    python -m benchmarks.bench_ocr
+"""
+import io
+import time
+
+import cv2
+import numpy as np
+import pytesseract
+from PIL import Image
+
+from benchmarks.synthetic_images import make_synthetic_chart, render_flowchart_image
+from services.image_processor import detect_shape_regions, ocr_regions
+
+SIZES = [5, 20, 60]
+
+def main():
+    try:
+        pytesseract.get_tesseract_version()
+    except pytesseract.TesseractNotFoundError:
+        print("tesseract binary not found; skipping")
+        return
+
+    print(f"{'boxes':>6} {'pixels':>10} {'page s':>8} {'boxes s':>8} {'detected':>9}")
+    for size in SIZES:
+        image = Image.open(io.BytesIO(render_flowchart_image(make_synthetic_chart(size))))
+        gray = np.array(image)
+
+        start = time.perf_counter()
+        pytesseract.image_to_string(image)
+        page = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        regions = detect_shape_regions(thresh)
+        ocr_regions(gray, regions)
+        boxes = time.perf_counter() - start
+
+        print(f"{size:>6} {gray.size:>10} {page:>8.2f} {boxes:>8.2f} {len(regions):>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+PDF export: render time, file size and page count for tiled and fit-to-page
+output on laid-out charts of increasing size.
+
+Run from the backend directory:
+    python -m benchmarks.bench_pdf
+"""
+import io
+import time
+
+from benchmarks.bench_png import make_grid_chart
+from services.pdf_export import PDF_MODES, write_pdf
+
+# (columns, rows) of the grid chart
+GRIDS = [(5, 10), (20, 50), (50, 100), (100, 200)]
+
+def main():
+    print(f"{'nodes':>7} {'mode':>5} {'seconds':>8} {'KB':>7} {'pages':>6} {'bytes/node':>11}")
+    for columns, rows in GRIDS:
+        chart = make_grid_chart(columns, rows)
+        for mode in PDF_MODES:
+            buffer = io.BytesIO()
+            start = time.perf_counter()
+            write_pdf(buffer, chart["nodes"], chart["edges"], mode)
+            elapsed = time.perf_counter() - start
+            data = buffer.getvalue()
+            pages = data.count(b"/Type /Page\n")
+            print(f"{len(chart['nodes']):>7} {mode:>5} {elapsed:>8.2f} {len(data) // 1024:>7} {pages:>6} "
+                  f"{len(data) / len(chart['nodes']):>11.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Server-side PNG export: time and peak memory for banded rendering versus a
+single full-canvas buffer, on grid charts up to a ~20k x 20k pixel canvas
+and on a tall vertical chain whose back edge spans every band.
+Each measurement runs in a fresh process so peak RSS is not shared.
+
+Run from the backend directory:
+    python -m benchmarks.bench_png
+"""
+import multiprocessing
+import time
+from typing import Dict
+
+from services.layout_engine import level_position
+
+# (columns, rows); 33 x 49 renders at about 20000 x 20000 pixels
+GRIDS = [(5, 10), (12, 24), (20, 40), (33, 49)]
+BACK_EDGE_CHAIN = 300
+TYPES = ["process", "decision", "io", "process", "start", "end"]
+SINGLE_BUFFER = 1 << 62
+# The single-buffer comparison is skipped above this many pixels (it needs
+# several GB and minutes at 20k x 20k)
+SINGLE_BUFFER_MAX_PIXELS = 250_000_000
+
+def make_grid_chart(columns: int, rows: int) -> Dict:
+    """Positioned chart: ``rows`` nodes per level, linked to the next level."""
+    nodes = []
+    edges = []
+    for level in range(columns):
+        for slot in range(rows):
+            node_id = f"{level}-{slot}"
+            nodes.append({
+                "id": node_id,
+                "text": f"Step {level}.{slot}",
+                "type": TYPES[(level + slot) % len(TYPES)],
+                "position": level_position('horizontal', level, slot, rows)
+            })
+            if level:
+                edges.append([f"{level - 1}-{slot}", node_id])
+                if slot % 3 == 0 and slot + 1 < rows:
+                    edges.append([f"{level - 1}-{slot}", f"{level}-{slot + 1}", "yes"])
+    return {"nodes": nodes, "edges": edges}
+
+def make_back_edge_chart(length: int) -> Dict:
+    """Vertical chain of ``length`` nodes whose last node loops back to the first."""
+    nodes = [{
+        "id": str(i),
+        "text": f"Step {i}",
+        "type": TYPES[i % len(TYPES)],
+        "position": level_position('vertical', i, 0, 1)
+    } for i in range(length)]
+    edges = [[str(i), str(i + 1)] for i in range(length - 1)]
+    edges.append([str(length - 1), "0", "again"])
+    return {"nodes": nodes, "edges": edges}
+
+def _chart(shape) -> Dict:
+    if isinstance(shape, int):
+        return make_back_edge_chart(shape)
+    return make_grid_chart(*shape)
+
+def _rss_mb(field: str) -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def _measure(shape, band_bytes: int, results) -> None:
+    from services.raster_export import iter_png
+
+    chart = _chart(shape)
+    baseline = _rss_mb("VmRSS:")
+    start = time.perf_counter()
+    size = sum(len(piece) for piece in iter_png(chart["nodes"], chart["edges"], band_bytes=band_bytes))
+    elapsed = time.perf_counter() - start
+    results.put((elapsed, _rss_mb("VmHWM:") - baseline, size))
+
+def measure(shape, band_bytes: int):
+    """Time, peak MB and PNG size for a (columns, rows) grid or a back-edge chain of that length."""
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_measure, args=(shape, band_bytes, results))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"measurement failed for {shape}")
+    return results.get()
+
+def main():
+    from services.raster_export import DEFAULT_SCALE, _scene
+
+    print(f"{'nodes':>6} {'canvas':>13} {'band s':>7} {'band MB':>8} {'full s':>7} {'full MB':>8} {'png KB':>8}")
+    for shape in GRIDS + [BACK_EDGE_CHAIN]:
+        chart = _chart(shape)
+        width, height, _ = _scene(chart["nodes"], chart["edges"], DEFAULT_SCALE)
+        band_s, band_mb, size = measure(shape, 8 * 1024 * 1024)
+        if width * height <= SINGLE_BUFFER_MAX_PIXELS:
+            full_s, full_mb, _ = measure(shape, SINGLE_BUFFER)
+            full = f"{full_s:>7.2f} {full_mb:>8.0f}"
+        else:
+            full = f"{'-':>7} {'-':>8}"
+        print(f"{len(chart['nodes']):>6} {f'{width}x{height}':>13} {band_s:>7.2f} {band_mb:>8.0f} "
+              f"{full} {size // 1024:>8}")
+
+if __name__ == "__main__":
+    main()
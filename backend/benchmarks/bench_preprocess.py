@@ -0,0 +1,61 @@
+"""
+Upload decoding: full-resolution RGB decode + grayscale (the old path)
+versus load_grayscale (header check, JPEG draft mode, direct "L"
+conversion, capped working size) on phone-photo sized charts.
+
+Run from the backend directory:
+    python -m benchmarks.bench_preprocess
+"""
+import io
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from benchmarks.synthetic_images import make_synthetic_chart, render_flowchart
+from services.image_preprocess import load_grayscale
+
+# (label, long side in pixels, format)
+CASES = [
+    ("12MP jpeg", 4000, "JPEG"),
+    ("40MP jpeg", 7300, "JPEG"),
+    ("12MP png", 4000, "PNG"),
+]
+
+def make_photo(long_side: int, fmt: str) -> bytes:
+    """A rendered chart on a 4:3 RGB frame ``long_side`` wide, like a camera upload."""
+    chart, _ = render_flowchart(make_synthetic_chart(6, seed=11))
+    frame = Image.new("RGB", (max(chart.width, chart.height * 4 // 3), chart.height), "white")
+    frame.paste(chart, ((frame.width - chart.width) // 2, 0))
+    scale = long_side / frame.width
+    image = frame.resize((long_side, round(frame.height * scale)))
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, quality=90)
+    return buffer.getvalue()
+
+def full_decode(data: bytes) -> np.ndarray:
+    img_array = np.array(Image.open(io.BytesIO(data)))
+    return cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
+
+def measure(fn, data: bytes):
+    tracemalloc.start()
+    start = time.perf_counter()
+    gray = fn(data)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return gray, elapsed * 1000, peak / 2 ** 20
+
+def main():
+    print(f"{'case':>10} {'bytes':>10} {'full ms':>8} {'full MB':>8} {'new ms':>8} {'new MB':>7} {'working':>11}")
+    for label, long_side, fmt in CASES:
+        data = make_photo(long_side, fmt)
+        _, full_ms, full_mb = measure(full_decode, data)
+        gray, new_ms, new_mb = measure(load_grayscale, data)
+        working = f"{gray.shape[1]}x{gray.shape[0]}"
+        print(f"{label:>10} {len(data):>10} {full_ms:>8.1f} {full_mb:>8.1f} {new_ms:>8.1f} {new_mb:>7.1f} {working:>11}")
+
+if __name__ == "__main__":
+    main()
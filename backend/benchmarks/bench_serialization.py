@@ -0,0 +1,75 @@
+"""
+Chart responses at 10k nodes: FastAPI's default path (jsonable_encoder,
+then json.dumps in JSONResponse) against returning an ORJSONResponse
+directly, in the usual and the columnar wire format. Reports encode time,
+peak traced memory and body size, the memory of the chart itself as dicts
+and as FlowchartColumns, and whole /api/text-to-flowchart requests.
+
+Run from the backend directory:
+    python -m benchmarks.bench_serialization
+"""
+import time
+import tracemalloc
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.testclient import TestClient
+
+from benchmarks.bench_text_parser import make_long_spec
+from services.flowchart_model import FlowchartColumns, encode_chart
+from services.layout_engine import apply_auto_layout
+from services.text_parser import parse_text_to_flowchart
+
+SPEC_LINES = 10_000
+REPEATS = 5
+
+def _measure(fn):
+    """(best seconds over REPEATS, peak traced MB of one run, result)."""
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak / (1024 * 1024), result
+
+def main():
+    spec = make_long_spec(SPEC_LINES)
+    chart = apply_auto_layout(parse_text_to_flowchart(spec))
+    print(f"{len(chart['nodes'])} nodes, {len(chart['edges'])} edges\n")
+
+    encoders = [
+        ("jsonable_encoder + JSONResponse", lambda: JSONResponse(jsonable_encoder(chart)).body),
+        ("ORJSONResponse", lambda: ORJSONResponse(chart).body),
+        ("ORJSONResponse, columnar", lambda: ORJSONResponse(encode_chart(chart, 'columnar')).body),
+    ]
+    print(f"{'response encoding':>34} {'ms':>8} {'peak MB':>8} {'body KB':>8}")
+    for name, encode in encoders:
+        seconds, peak, body = _measure(encode)
+        print(f"{name:>34} {seconds * 1000:>8.1f} {peak:>8.1f} {len(body) // 1024:>8}")
+
+    # Build each representation from the encoded bytes so nothing is shared with ``chart``
+    body = orjson.dumps(chart)
+    _, dict_mb, _ = _measure(lambda: orjson.loads(body))
+    _, columns_mb, _ = _measure(lambda: FlowchartColumns.from_flowchart(orjson.loads(body)))
+    columns = FlowchartColumns.from_flowchart(chart)
+    _, kept_mb, _ = _measure(lambda: FlowchartColumns.from_wire(columns.to_wire()))
+    print(f"\nchart in memory: dicts {dict_mb:.1f} MB, FlowchartColumns {kept_mb:.1f} MB "
+          f"(converting from dicts peaks at {columns_mb:.1f} MB)")
+
+    import main as app_module
+    client = TestClient(app_module.app)
+    print(f"\n{'POST /api/text-to-flowchart':>34} {'ms':>8} {'peak MB':>8} {'body KB':>8}")
+    for wire in ('json', 'columnar'):
+        seconds, peak, response = _measure(
+            lambda: client.post(f"/api/text-to-flowchart?wire={wire}", json={"text": spec})
+        )
+        assert response.status_code == 200
+        print(f"{'wire=' + wire:>34} {seconds * 1000:>8.1f} {peak:>8.1f} {len(response.content) // 1024:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Cold start: the import of main in a fresh interpreter (and which heavy
+libraries it loads), then `python main.py` started with WARMUP=none and
+WARMUP=all, timing spawn to first answer, the first request of each kind
+of endpoint, and a second one for comparison. The server's own view
+(GET /api/startup/stats) is printed below each table.
+
+Run from the backend directory:
+    python -m benchmarks.bench_startup
+"""
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.bench_png import make_grid_chart
+from benchmarks.stub_llm import free_port
+
+IMPORT_RUNS = 5
+HEAVY_MODULES = ("cv2", "pytesseract", "numpy", "PIL", "reportlab", "groq", "uvicorn")
+
+IMPORT_SCRIPT = f"""
+import json, sys, time
+start = time.perf_counter()
+import main
+print(json.dumps({{
+    "seconds": time.perf_counter() - start,
+    "loaded": [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+}}))
+"""
+
+def _upload() -> bytes:
+    from PIL import Image, ImageDraw
+    image = Image.new("L", (400, 200), 255)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((100, 60, 300, 140), outline=0, width=3)
+    draw.text((170, 90), "Start", fill=0)
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+def _requests(chart: dict, upload: bytes):
+    return [
+        ("text", lambda client: client.post("/api/text-to-flowchart", json={"text": "Start\nWork\nEnd"})),
+        ("text, layered", lambda client: client.post(
+            "/api/text-to-flowchart", json={"text": "Start\nWork\nEnd", "layout": "layered"})),
+        ("export png", lambda client: client.post("/api/export/png", json=chart)),
+        ("export pdf", lambda client: client.post("/api/export/pdf", json=chart)),
+        ("image", lambda client: client.post(
+            "/api/image-to-flowchart", files={"file": ("chart.png", upload, "image/png")})),
+    ]
+
+def measure_import():
+    times = []
+    for _ in range(IMPORT_RUNS):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], capture_output=True, text=True, check=True)
+        interpreter = time.perf_counter() - start
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        times.append((result["seconds"], interpreter))
+    best_import, best_total = min(times)
+    print(f"import main: best {best_import * 1000:.0f} ms of {IMPORT_RUNS} "
+          f"(whole interpreter {best_total * 1000:.0f} ms)")
+    print(f"heavy modules loaded by the import: {', '.join(result['loaded']) or 'none'}\n")
+
+def measure_serve(warmup: str, chart: dict, upload: bytes) -> None:
+    port = free_port()
+    env = dict(os.environ, PORT=str(port), WARMUP=warmup, WEB_WORKERS="1", IMAGE_WORKERS="1")
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "main.py"], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=120) as client:
+            while True:
+                try:
+                    client.get("/")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.01)
+            ready = time.perf_counter() - start
+            print(f"WARMUP={warmup}: first answer {ready * 1000:.0f} ms after spawn")
+            print(f"{'request':>16} {'first ms':>9} {'second ms':>10} {'status':>7}")
+            for name, request in _requests(chart, upload):
+                timings = []
+                for _ in range(2):
+                    request_start = time.perf_counter()
+                    response = request(client)
+                    timings.append((time.perf_counter() - request_start) * 1000)
+                print(f"{name:>16} {timings[0]:>9.1f} {timings[1]:>10.1f} {response.status_code:>7}")
+            report = client.get("/api/startup/stats").json()
+            warmed = ", ".join(f"{hook} {ms:.0f}" for hook, ms in report["warmup_ms"].items()) or "none"
+            print(f"server: import {report['import_ms']} ms, ready {report['ready_ms']} ms, "
+                  f"warm-up ms: {warmed}\n")
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    measure_import()
+    chart = make_grid_chart(4, 5)
+    upload = _upload()
+    for warmup in ("none", "all"):
+        measure_serve(warmup, chart, upload)
+
+if __name__ == "__main__":
+    main()
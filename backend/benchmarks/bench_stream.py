@@ -0,0 +1,53 @@
+"""
+Time-to-first-node for the streaming prompt endpoint versus time-to-result
+for the buffered one, against the local stub LLM.
+
+Run from the backend directory:
+    python -m benchmarks.bench_stream
+"""
+import json
+import os
+import time
+
+import httpx
+
+from benchmarks.stub_llm import create_stub_llm_app, free_port, serve_in_thread
+
+LLM_LATENCY = 2.0
+
+def main():
+    stub_port = free_port()
+    serve_in_thread(create_stub_llm_app(LLM_LATENCY), stub_port)
+
+    os.environ["GROQ_API_KEY"] = "stub"
+    os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{stub_port}"
+    os.environ["PROMPT_CACHE_BACKEND"] = "none"
+
+    import main as app_module
+    app_port = free_port()
+    serve_in_thread(app_module.app, app_port)
+
+    with httpx.Client(base_url=f"http://127.0.0.1:{app_port}", timeout=60) as client:
+        start = time.perf_counter()
+        client.post("/api/prompt-to-flowchart", json={"prompt": "buffered"}).raise_for_status()
+        buffered = time.perf_counter() - start
+
+        start = time.perf_counter()
+        first_node = None
+        frames = 0
+        with client.stream("POST", "/api/prompt-to-flowchart/stream", json={"prompt": "streamed"}) as response:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                frames += 1
+                if first_node is None and json.loads(line)["type"] == "node":
+                    first_node = time.perf_counter() - start
+        streamed = time.perf_counter() - start
+
+    print(f"stub LLM latency {LLM_LATENCY}s")
+    print(f"buffered endpoint, time to result:   {buffered * 1000:8.1f} ms")
+    print(f"streaming endpoint, first node:      {first_node * 1000:8.1f} ms")
+    print(f"streaming endpoint, done ({frames} frames): {streamed * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+SVG export: time and output size of the streaming writer against the
+original exporter (per-edge ``next()`` node lookups and fully inline
+attributes), on laid-out charts from 1k to 20k nodes.
+
+Run from the backend directory:
+    python -m benchmarks.bench_svg
+"""
+import time
+from typing import Dict, List
+
+from benchmarks.bench_layout import make_flowchart
+from services.export_service import stream_svg
+from services.layout_engine import apply_auto_layout
+
+SIZES = [1000, 2500, 5000, 10000, 20000]
+# The original exporter is O(E*N); it is only timed up to this size
+LEGACY_MAX_NODES = 5000
+
+def legacy_svg(nodes: List[Dict], edges: List, indexed: bool = False) -> str:
+    """
+    The exporter as it was before the streaming writer. ``indexed`` swaps
+    the per-edge scans for a dict (same output) so large charts finish.
+    """
+    index = {}
+    for node in nodes:
+        index.setdefault(node["id"], node)
+    svg_parts = ['<svg xmlns="http://www.w3.org/2000/svg" width="800" height="600" viewBox="0 0 800 600">']
+    for edge in edges:
+        if indexed:
+            from_node, to_node = index.get(edge[0]), index.get(edge[1])
+        else:
+            from_node = next((n for n in nodes if n["id"] == edge[0]), None)
+            to_node = next((n for n in nodes if n["id"] == edge[1]), None)
+        if from_node and to_node and "position" in from_node and "position" in to_node:
+            x1 = from_node["position"]["x"]
+            y1 = from_node["position"]["y"] + 30
+            x2 = to_node["position"]["x"]
+            y2 = to_node["position"]["y"] - 30
+            svg_parts.append(f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" stroke="#666" stroke-width="2" marker-end="url(#arrowhead)"/>')
+            if len(edge) > 2:
+                svg_parts.append(f'<text x="{(x1 + x2) / 2}" y="{(y1 + y2) / 2}" fill="#666" font-size="12">{edge[2]}</text>')
+    for node in nodes:
+        if "position" in node:
+            x = node["position"]["x"]
+            y = node["position"]["y"]
+            if node.get("type", "process") == "decision":
+                svg_parts.append(f'<polygon points="{x},{y-40} {x+60},{y} {x},{y+40} {x-60},{y}" fill="#fff" stroke="#333" stroke-width="2"/>')
+            else:
+                svg_parts.append(f'<rect x="{x-60}" y="{y-30}" width="120" height="60" rx="10" fill="#fff" stroke="#333" stroke-width="2"/>')
+            svg_parts.append(f'<text x="{x}" y="{y+5}" text-anchor="middle" font-size="14" fill="#333">{node["text"][:20]}</text>')
+    svg_parts.append('<defs><marker id="arrowhead" markerWidth="10" markerHeight="10" refX="9" refY="3" orient="auto"><polygon points="0 0, 10 3, 0 6" fill="#666"/></marker></defs>')
+    svg_parts.append('</svg>')
+    return ''.join(svg_parts)
+
+def main():
+    print(f"{'nodes':>7} {'edges':>7} {'new ms':>8} {'us/elem':>8} {'new KB':>8} {'old KB':>8} {'old ms':>9}")
+    for size in SIZES:
+        chart = apply_auto_layout(make_flowchart(size, branching=0.3), 'vertical')
+        nodes, edges = chart["nodes"], chart["edges"]
+
+        start = time.perf_counter()
+        new_bytes = sum(len(piece) for piece in stream_svg(nodes, edges))
+        new_ms = (time.perf_counter() - start) * 1000
+
+        old_ms = "-"
+        if size <= LEGACY_MAX_NODES:
+            start = time.perf_counter()
+            legacy_svg(nodes, edges)
+            old_ms = f"{(time.perf_counter() - start) * 1000:.0f}"
+
+        per_element = new_ms * 1000 / (len(nodes) + len(edges))
+        print(f"{size:>7} {len(edges):>7} {new_ms:>8.1f} {per_element:>8.2f} {new_bytes // 1024:>8} "
+              f"{len(legacy_svg(nodes, edges, indexed=True)) // 1024:>8} {old_ms:>9}")
+
+if __name__ == "__main__":
+    main()
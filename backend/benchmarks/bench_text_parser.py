@@ -0,0 +1,139 @@
+"""
+Text parser scaling: the single-pass parser against the original (per-line
+uncompiled regexes, a list rebuilt for every "->" line, any() keyword scans)
+on specs up to 100k lines, plus peak memory when a 100k-line spec is parsed
+from a file object instead of a string. Outputs are checked to be identical.
+
+Run from the backend directory:
+    python -m benchmarks.bench_text_parser
+"""
+import os
+import random
+import re
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List
+
+from benchmarks.bench_batch import ACTIONS
+from services.text_parser import parse_text_to_flowchart
+
+SIZES = [1_000, 10_000, 100_000]
+# The original parser is quadratic in "->" lines; it is only timed up to this size
+LEGACY_MAX_LINES = 10_000
+
+def make_long_spec(num_lines: int, seed: int = 0) -> str:
+    """A spec of ``num_lines`` lines: bullets, numbering, branches and else lines."""
+    rng = random.Random(seed)
+    lines = ["Start"]
+    while len(lines) < num_lines - 1:
+        i = len(lines)
+        roll = rng.random()
+        if roll < 0.15:
+            lines.append(f"If {rng.choice(ACTIONS)} {i} -> Handle case {i}")
+            lines.append(f"Else -> Skip case {i}")
+        elif roll < 0.5:
+            lines.append(f"- {rng.choice(ACTIONS)} {i}")
+        else:
+            lines.append(f"{i}. {rng.choice(ACTIONS)} {i}")
+    lines.append("End")
+    return "\n".join(lines)
+
+def legacy_parse(text: str) -> Dict:
+    """The parser as it was before the single-pass rewrite."""
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    nodes: List[Dict] = []
+    edges: List = []
+    node_id = 1
+    last_node_id = None
+    condition_stack = []
+    for line in lines:
+        line = re.sub(r'^[-*•]\s*', '', line)
+        line = re.sub(r'^\d+\.\s*', '', line)
+        if '->' in line:
+            parts = line.split('->')
+            condition = parts[0].strip()
+            action = parts[1].strip() if len(parts) > 1 else ""
+            if condition.lower() not in [n['text'].lower() for n in nodes]:
+                node_type = 'decision' if any(kw in condition.lower() for kw in ['if', 'check', 'validate', '?']) else 'process'
+                nodes.append({"id": str(node_id), "text": condition, "type": node_type})
+                if last_node_id:
+                    edges.append([last_node_id, str(node_id)])
+                condition_stack.append(str(node_id))
+                last_node_id = str(node_id)
+                node_id += 1
+            if action:
+                nodes.append({"id": str(node_id), "text": action, "type": legacy_node_type(action)})
+                if condition_stack:
+                    edges.append([condition_stack[-1], str(node_id), "yes"])
+                last_node_id = str(node_id)
+                node_id += 1
+        elif line.lower().startswith(('else', 'otherwise', 'no')):
+            action = re.sub(r'^(else|otherwise|no)[:\s]*', '', line, flags=re.IGNORECASE).strip()
+            if action:
+                nodes.append({"id": str(node_id), "text": action, "type": legacy_node_type(action)})
+                if condition_stack:
+                    edges.append([condition_stack[-1], str(node_id), "no"])
+                    condition_stack.pop()
+                last_node_id = str(node_id)
+                node_id += 1
+        else:
+            nodes.append({"id": str(node_id), "text": line, "type": legacy_node_type(line)})
+            if last_node_id:
+                edges.append([last_node_id, str(node_id)])
+            last_node_id = str(node_id)
+            node_id += 1
+    return {"nodes": nodes, "edges": edges}
+
+def legacy_node_type(text: str) -> str:
+    text_lower = text.lower()
+    if any(kw in text_lower for kw in ['start', 'begin']):
+        return 'start'
+    elif any(kw in text_lower for kw in ['end', 'finish', 'stop', 'exit']):
+        return 'end'
+    elif any(kw in text_lower for kw in ['if', 'check', 'validate', 'verify', '?', 'decision']):
+        return 'decision'
+    elif any(kw in text_lower for kw in ['input', 'output', 'print', 'display', 'show', 'read', 'get']):
+        return 'io'
+    return 'process'
+
+def _timed(fn, arg):
+    start = time.perf_counter()
+    result = fn(arg)
+    return time.perf_counter() - start, result
+
+def _peak_mb(fn) -> float:
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+def main():
+    print(f"{'lines':>8} {'new s':>8} {'us/line':>8} {'old s':>8}")
+    for size in SIZES:
+        spec = make_long_spec(size)
+        new_s, result = _timed(parse_text_to_flowchart, spec)
+        old_s = "-"
+        if size <= LEGACY_MAX_LINES:
+            seconds, legacy = _timed(legacy_parse, spec)
+            assert legacy == result, "parser output changed"
+            old_s = f"{seconds:.3f}"
+        print(f"{size:>8} {new_s:>8.3f} {new_s * 1e6 / size:>8.2f} {old_s:>8}")
+
+    spec = make_long_spec(SIZES[-1])
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding='utf-8') as f:
+        f.write(spec)
+    try:
+        def from_file():
+            with open(f.name, encoding='utf-8') as lines:
+                parse_text_to_flowchart(lines)
+        from_string = _peak_mb(lambda: parse_text_to_flowchart(spec))
+        legacy = _peak_mb(lambda: [line.strip() for line in spec.split('\n') if line.strip()])
+        print(f"\n{len(spec) // 1024} KB spec, peak MB: from file {_peak_mb(from_file):.1f}, "
+              f"from string {from_string:.1f} (the old line split alone {legacy:.1f})")
+    finally:
+        os.unlink(f.name)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Golden corpus of synthetic flowchart images with ground truth, generated
+locally, for checking and timing the image pipeline.
+
+Each case is ``<name>.png`` plus ``<name>.json`` holding the chart and the
+pixel centre of every node. Generate into a directory with:
+    python -m benchmarks.golden_corpus [out_dir]
+"""
+import json
+import os
+import sys
+from typing import Dict, Iterator, Tuple
+
+from PIL import Image
+
+from benchmarks.synthetic_images import make_synthetic_chart, render_flowchart
+
+# (name, nodes, decision rate, branch rate, layout, scale)
+CASES = [
+    ("chain_small", 5, 0.0, 0.0, 'hierarchical', 1.0),
+    ("chain_decisions", 8, 0.4, 0.0, 'hierarchical', 1.0),
+    ("branches", 10, 0.5, 1.0, 'layered', 1.0),
+    ("branches_scaled", 10, 0.5, 1.0, 'layered', 0.6),
+    ("branches_large", 10, 0.5, 1.0, 'layered', 3.0),
+    ("long_chain", 30, 0.3, 0.0, 'hierarchical', 1.0),
+    ("side_by_side", 12, 0.5, 1.0, 'hierarchical', 1.0),
+    ("many_branches", 24, 0.6, 1.0, 'layered', 1.0),
+]
+
+def iter_cases(seed: int = 0) -> Iterator[Tuple[str, Image.Image, Dict]]:
+    """Yield (name, image, truth) for every case, deterministically."""
+    for name, size, decisions, branches, layout, scale in CASES:
+        chart = make_synthetic_chart(size, decisions, branches, seed=seed)
+        image, centers = render_flowchart(chart, scale, layout)
+        yield name, image, {"chart": chart, "centers": centers}
+
+def write_corpus(out_dir: str) -> None:
+    os.makedirs(out_dir, exist_ok=True)
+    for name, image, truth in iter_cases():
+        image.save(os.path.join(out_dir, f"{name}.png"))
+        with open(os.path.join(out_dir, f"{name}.json"), "w") as f:
+            json.dump(truth, f, indent=2)
+        print(f"wrote {name}")
+
+if __name__ == "__main__":
+    write_corpus(sys.argv[1] if len(sys.argv) > 1 else "golden_corpus")
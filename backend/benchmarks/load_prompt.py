@@ -0,0 +1,59 @@
+"""
+Load test for /api/prompt-to-flowchart against a local stub LLM.
+
+Starts the stub (fixed latency per completion) and main.app on background
+threads, then measures throughput at increasing numbers of concurrent users.
+With a non-blocking LLM client throughput grows with users until
+LLM_MAX_IN_FLIGHT is reached.
+
+Run from the backend directory:
+    python -m benchmarks.load_prompt
+"""
+import asyncio
+import os
+import time
+
+import httpx
+
+from benchmarks.stub_llm import create_stub_llm_app, free_port, serve_in_thread
+
+LLM_LATENCY = 0.5
+USERS = [1, 2, 4, 8, 16, 32]
+REQUESTS_PER_USER = 4
+
+async def run_users(base_url: str, users: int) -> float:
+    counter = iter(range(users * REQUESTS_PER_USER))
+
+    async def user(client: httpx.AsyncClient):
+        for _ in range(REQUESTS_PER_USER):
+            # Unique prompts so neither the cache nor coalescing kicks in
+            prompt = f"load test flow {users}-{next(counter)}-{time.perf_counter_ns()}"
+            response = await client.post("/api/prompt-to-flowchart", json={"prompt": prompt})
+            response.raise_for_status()
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(user(client) for _ in range(users)))
+        return users * REQUESTS_PER_USER / (time.perf_counter() - start)
+
+def main():
+    stub_port = free_port()
+    serve_in_thread(create_stub_llm_app(LLM_LATENCY), stub_port)
+
+    os.environ["GROQ_API_KEY"] = "stub"
+    os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{stub_port}"
+    os.environ["PROMPT_CACHE_BACKEND"] = "none"
+    os.environ.setdefault("LLM_MAX_IN_FLIGHT", "64")
+
+    import main as app_module
+    app_port = free_port()
+    serve_in_thread(app_module.app, app_port)
+
+    print(f"stub LLM latency {LLM_LATENCY}s, LLM_MAX_IN_FLIGHT={os.environ['LLM_MAX_IN_FLIGHT']}")
+    print(f"{'users':>6} {'req/s':>8}")
+    for users in USERS:
+        throughput = asyncio.run(run_users(f"http://127.0.0.1:{app_port}", users))
+        print(f"{users:>6} {throughput:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Local stand-in for the Groq chat completions API, plus a helper to run any
+ASGI app on a background thread. Point the Groq SDK at it with
+GROQ_BASE_URL=http://127.0.0.1:<port>.
+"""
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+STUB_FLOWCHART = {
+    "nodes": [
+        {"id": "1", "text": "Start", "type": "start"},
+        {"id": "2", "text": "Enter credentials", "type": "io"},
+        {"id": "3", "text": "Valid?", "type": "decision"},
+        {"id": "4", "text": "Show dashboard", "type": "process"},
+        {"id": "5", "text": "End", "type": "end"}
+    ],
+    "edges": [["1", "2"], ["2", "3"], ["3", "4", "yes"], ["3", "2", "no"], ["4", "5"]]
+}
+
+def create_stub_llm_app(latency: float = 0.5) -> FastAPI:
+    """
+    App answering every completion with STUB_FLOWCHART after ``latency``
+    seconds. With ``stream: true`` the content is sent as SSE chunks spread
+    evenly over the same latency, like a token stream.
+    """
+    app = FastAPI()
+    content = json.dumps(STUB_FLOWCHART, indent=2)
+
+    async def sse_chunks(model: str, pieces: int = 50):
+        size = -(-len(content) // pieces)
+        for start in range(0, len(content), size):
+            await asyncio.sleep(latency / pieces)
+            chunk = {
+                "id": "stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": content[start:start + size]}, "finish_reason": None}]
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(body: dict):
+        if body.get("stream"):
+            return StreamingResponse(sse_chunks(body.get("model", "stub")), media_type="text/event-stream")
+        await asyncio.sleep(latency)
+        return {
+            "id": "stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }
+
+    return app
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def serve_in_thread(app, port: int) -> uvicorn.Server:
+    """Start ``app`` on 127.0.0.1:port in a daemon thread and wait until it accepts connections."""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
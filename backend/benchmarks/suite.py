@@ -0,0 +1,422 @@
+"""
+Benchmark suite: micro-benchmarks of each service function on synthetic
+workloads, and an HTTP load test of every endpoint of main.app (served on a
+background thread, with the LLM replaced by the local stub). Results are
+written as JSON so two runs, e.g. before and after a commit, can be compared.
+
+Workloads are generated from fixed seeds: random DAGs (a main chain plus
+forward branches, --branching controls how many), long flat and nested text
+specs, and rendered flowchart images.
+
+Run from the backend directory:
+    python -m benchmarks.suite run --profile quick
+    python -m benchmarks.suite run --only layout --no-http --out before.json
+    python -m benchmarks.suite compare before.json after.json --threshold 0.1
+
+``compare`` exits with status 1 when anything regressed by more than the
+threshold, so it can gate a CI job. Micro-benchmarks keep the fastest run
+over several rounds, but small cases still vary by tens of percent between
+processes on shared or throttled machines: compare runs made on the same
+machine, and raise --threshold (or compare the best of two runs per side)
+where the noise is higher.
+"""
+import argparse
+import asyncio
+import gc
+import importlib.metadata
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+# (prepare, fn): prepare() builds fresh arguments untimed, fn(*args) is timed
+Case = Tuple[str, Callable[[], tuple], Callable]
+
+PROFILES = {
+    "quick": {
+        "spec_lines": [1_000],
+        "dag_nodes": [1_000],
+        "raster_nodes": 100,
+        "image_boxes": [8],
+        "repeat": 3,
+        "rounds": 3,
+        "http_requests": 50,
+        "http_users": 8,
+        "llm_latency": 0.05,
+    },
+    "full": {
+        "spec_lines": [1_000, 10_000],
+        "dag_nodes": [1_000, 10_000],
+        "raster_nodes": 1_000,
+        "image_boxes": [8, 30],
+        "repeat": 7,
+        "rounds": 5,
+        "http_requests": 400,
+        "http_users": 16,
+        "llm_latency": 0.2,
+    },
+}
+# Each case repeats at least ``repeat`` times and until it has run this long
+MIN_CASE_SECONDS = 0.5
+MAX_CASE_RUNS = 1000
+# A load-test scenario stops sending new requests after this long
+MAX_SCENARIO_SECONDS = 10.0
+RESULTS_DIR = Path(__file__).parent / "results"
+
+def _copy_chart(chart: Dict) -> Dict:
+    """Nodes copied (layout writes positions into them), edges shared."""
+    return {"nodes": [dict(node) for node in chart["nodes"]], "edges": chart["edges"]}
+
+def micro_cases(profile: Dict, branching: float) -> List[Case]:
+    """Every service-level case for ``profile``; workloads are built here, once."""
+    from benchmarks.bench_batch import make_spec
+    from benchmarks.bench_layout import make_flowchart
+    from benchmarks.bench_nested import make_nested_spec
+    from benchmarks.bench_text_parser import make_long_spec
+    from benchmarks.synthetic_images import make_synthetic_chart, render_flowchart_image
+    from services.clustering import find_clusters
+    from services.export_service import export_to_pdf, export_to_svg
+    from services.flowchart_model import FlowchartColumns
+    from services.graph import CompactGraph
+    from services.image_preprocess import load_grayscale
+    from services.image_processor import detect_connectors, detect_shape_regions
+    from services.incremental_layout import apply_incremental_layout
+    from services.layout_engine import apply_auto_layout
+    from services.nested_parser import parse_nested_text
+    from services.node_types import classify_text
+    from services.normalize import normalize_flowchart
+    from services.raster_export import render_png
+    from services.text_parser import parse_text_to_flowchart
+    import cv2
+
+    cases: List[Case] = []
+    no_args = lambda: ()  # noqa: E731
+
+    spec = make_spec(0)
+    cases.append(("text_parser.parse_text_to_flowchart[30 steps]", lambda: (spec,), parse_text_to_flowchart))
+    for lines in profile["spec_lines"]:
+        flat = make_long_spec(lines)
+        nested = "\n".join(make_nested_spec(lines))
+        cases.append((f"text_parser.parse_text_to_flowchart[{lines} lines]", lambda flat=flat: (flat,),
+                      parse_text_to_flowchart))
+        cases.append((f"nested_parser.parse_nested_text[{lines} lines]", lambda nested=nested: (nested,),
+                      parse_nested_text))
+
+    texts = [f"{word} item {i}" for i, word in enumerate(["Get", "Check", "Save", "End", "Start", "Send"] * 2000)]
+    cases.append(("node_types.classify_text[12000 texts]", no_args, lambda: [classify_text(t) for t in texts]))
+
+    for size in profile["dag_nodes"]:
+        chart = make_flowchart(size, branching)
+        placed = apply_auto_layout(_copy_chart(chart))
+        tag = f"[{size} nodes]"
+        cases.append((f"graph.CompactGraph.from_flowchart{tag}", lambda chart=chart: (chart["nodes"], chart["edges"]),
+                      CompactGraph.from_flowchart))
+        cases.append((f"normalize.normalize_flowchart{tag}", lambda chart=chart: (chart,), normalize_flowchart))
+        graph = CompactGraph.from_flowchart(chart["nodes"], chart["edges"])
+        cases.append((f"clustering.find_clusters{tag}", lambda graph=graph: (graph,), find_clusters))
+        cases.append((f"layout_engine.apply_auto_layout[hierarchical]{tag}",
+                      lambda chart=chart: (_copy_chart(chart), 'horizontal', 'hierarchical'), apply_auto_layout))
+        cases.append((f"layout_engine.apply_auto_layout[layered]{tag}",
+                      lambda chart=chart: (_copy_chart(chart), 'horizontal', 'layered'), apply_auto_layout))
+        middle = chart["nodes"][size // 2]["id"]
+        diff = {"added_nodes": [{"id": "new", "text": "New step", "type": "process"}],
+                "added_edges": [[middle, "new"]]}
+        cases.append((f"incremental_layout.apply_incremental_layout[add 1]{tag}",
+                      lambda placed=placed, diff=diff: (_copy_chart(placed), diff), apply_incremental_layout))
+        cases.append((f"export_service.export_to_svg{tag}",
+                      lambda placed=placed: (placed["nodes"], placed["edges"]), export_to_svg))
+        cases.append((f"export_service.export_to_pdf[fit]{tag}",
+                      lambda placed=placed: (placed["nodes"], placed["edges"], 'fit'), export_to_pdf))
+        cases.append((f"flowchart_model.FlowchartColumns[to_wire]{tag}", lambda placed=placed: (placed,),
+                      lambda chart: FlowchartColumns.from_flowchart(chart).to_wire()))
+
+    raster = apply_auto_layout(make_flowchart(profile["raster_nodes"], branching), 'vertical')
+    cases.append((f"raster_export.render_png[{profile['raster_nodes']} nodes, scale 1]",
+                  lambda: (raster["nodes"], raster["edges"], 1.0), render_png))
+
+    for boxes in profile["image_boxes"]:
+        image = render_flowchart_image(make_synthetic_chart(boxes, branch_rate=0.5, seed=boxes))
+        gray = load_grayscale(image)
+        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        regions = detect_shape_regions(thresh)
+        tag = f"[{boxes} boxes]"
+        cases.append((f"image_preprocess.load_grayscale{tag}", lambda image=image: (image,), load_grayscale))
+        cases.append((f"image_processor.detect_shape_regions{tag}", lambda thresh=thresh: (thresh,),
+                      detect_shape_regions))
+        cases.append((f"image_processor.detect_connectors{tag}",
+                      lambda thresh=thresh, regions=regions: (thresh, regions), detect_connectors))
+    return cases
+
+def measure(prepare: Callable[[], tuple], fn: Callable, repeat: int) -> List[float]:
+    """
+    Run ``fn`` at least ``repeat`` times (and for MIN_CASE_SECONDS); seconds
+    per run. As in timeit, the garbage collector is off while a run is timed
+    so a collection left over from other cases does not land in one of them.
+    """
+    samples = []
+    gc.collect()
+    started = time.perf_counter()
+    while len(samples) < repeat or (time.perf_counter() - started < MIN_CASE_SECONDS
+                                    and len(samples) < MAX_CASE_RUNS):
+        args = prepare()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            fn(*args)
+            samples.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return samples
+
+def run_micro(profile: Dict, branching: float, only: Optional[str]) -> Dict[str, Dict]:
+    """
+    Every case, in ``rounds`` passes over the whole list: a slow phase of a
+    shared machine then hits one pass of each case instead of all its runs.
+    """
+    cases = [case for case in micro_cases(profile, branching) if not only or re.search(only, case[0])]
+    samples = {name: [] for name, _, _ in cases}
+    for _ in range(profile["rounds"]):
+        for name, prepare, fn in cases:
+            samples[name] += measure(prepare, fn, profile["repeat"])
+
+    results = {}
+    for name, runs in samples.items():
+        results[name] = {
+            "runs": len(runs),
+            "min_s": min(runs),
+            "median_s": statistics.median(runs),
+            "mean_s": statistics.fmean(runs),
+        }
+        print(f"{name:<64} {results[name]['min_s'] * 1000:>10.3f} ms", file=sys.stderr)
+    return results
+
+def http_scenarios(profile: Dict, branching: float) -> List[Tuple[str, Callable[[int], Dict]]]:
+    """(name, request(i)) pairs; request returns httpx.request keyword arguments."""
+    from benchmarks.bench_batch import make_spec
+    from benchmarks.bench_layout import make_flowchart
+    from benchmarks.bench_text_parser import make_long_spec
+    from benchmarks.synthetic_images import make_synthetic_chart, render_flowchart_image
+    from services.layout_engine import apply_auto_layout
+
+    spec = make_spec(0)
+    long_spec = make_long_spec(profile["spec_lines"][-1])
+    placed = apply_auto_layout(make_flowchart(200, branching), 'vertical')
+    export = {"nodes": placed["nodes"], "edges": placed["edges"]}
+    middle = placed["nodes"][100]["id"]
+    diff = {"added_nodes": [{"id": "new", "text": "New step", "type": "process"}], "added_edges": [[middle, "new"]]}
+    image = render_flowchart_image(make_synthetic_chart(8, seed=8))
+    batch = "\n".join(json.dumps(make_spec(i)) for i in range(50)).encode('utf-8')
+
+    post = lambda path, **kwargs: lambda i: {"method": "POST", "url": path, **kwargs}  # noqa: E731
+    return [
+        ("GET /", lambda i: {"method": "GET", "url": "/"}),
+        ("POST /api/text-to-flowchart[30 steps]", post("/api/text-to-flowchart", json={"text": spec})),
+        (f"POST /api/text-to-flowchart[{len(long_spec.splitlines())} lines]",
+         post("/api/text-to-flowchart", json={"text": long_spec})),
+        ("POST /api/text-to-flowchart/incremental[open]",
+         lambda i: {"method": "POST", "url": "/api/text-to-flowchart/incremental",
+                    "json": {"document_id": str(i), "text": spec.replace("-", "")}}),
+        # Unique prompts so neither the prompt cache nor coalescing answers them
+        ("POST /api/prompt-to-flowchart",
+         lambda i: {"method": "POST", "url": "/api/prompt-to-flowchart", "json": {"prompt": f"suite {i} {time.time_ns()}"}}),
+        ("POST /api/prompt-to-flowchart/stream",
+         lambda i: {"method": "POST", "url": "/api/prompt-to-flowchart/stream",
+                    "json": {"prompt": f"suite stream {i} {time.time_ns()}"}}),
+        ("POST /api/image-to-flowchart[8 boxes]",
+         post("/api/image-to-flowchart", files={"file": ("chart.png", image, "image/png")})),
+        ("POST /api/layout/incremental[200 nodes]",
+         post("/api/layout/incremental", json={**export, "diff": diff})),
+        ("POST /api/export/svg[200 nodes]", post("/api/export/svg", json=export)),
+        ("POST /api/export/pdf[200 nodes]", post("/api/export/pdf", json=export)),
+        ("POST /api/export/png[200 nodes]", post("/api/export/png", json=export, params={"scale": 1.0})),
+        ("POST /api/batch/text-to-flowchart[50 docs]", post("/api/batch/text-to-flowchart", content=batch)),
+        ("GET /metrics", lambda i: {"method": "GET", "url": "/metrics"}),
+    ]
+
+async def _load(base_url: str, request: Callable[[int], Dict], total: int, users: int) -> Dict:
+    """``total`` requests from ``users`` concurrent clients, cut short after MAX_SCENARIO_SECONDS."""
+    import httpx
+
+    counter = iter(range(total))
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + MAX_SCENARIO_SECONDS
+
+    async def user(client):
+        nonlocal errors
+        for i in counter:
+            if time.perf_counter() > deadline:
+                break
+            start = time.perf_counter()
+            response = await client.request(**request(i))
+            await response.aread()
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(user(client) for _ in range(users)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]  # noqa: E731
+    return {
+        "requests": len(latencies),
+        "users": users,
+        "errors": errors,
+        "requests_per_s": len(latencies) / elapsed,
+        "p50_s": pick(0.50),
+        "p95_s": pick(0.95),
+        "p99_s": pick(0.99),
+    }
+
+def run_http(profile: Dict, branching: float, only: Optional[str]) -> Dict[str, Dict]:
+    from benchmarks.stub_llm import create_stub_llm_app, free_port, serve_in_thread
+
+    stub_port = free_port()
+    serve_in_thread(create_stub_llm_app(profile["llm_latency"]), stub_port)
+    os.environ.update({
+        "GROQ_API_KEY": "stub",
+        "GROQ_BASE_URL": f"http://127.0.0.1:{stub_port}",
+        "PROMPT_CACHE_BACKEND": "none",
+        "IMAGE_CACHE_BACKEND": "none",
+    })
+    import main as app_module
+    app_port = free_port()
+    serve_in_thread(app_module.app, app_port)
+    base_url = f"http://127.0.0.1:{app_port}"
+
+    results = {}
+    for name, request in http_scenarios(profile, branching):
+        if only and not re.search(only, name):
+            continue
+        if "image" in name and not _has_tesseract():
+            results[name] = {"skipped": "tesseract not installed"}
+            continue
+        # One warm-up request per scenario (imports, pools, first-call caches)
+        asyncio.run(_load(base_url, request, 1, 1))
+        results[name] = asyncio.run(_load(base_url, request, profile["http_requests"], profile["http_users"]))
+        print(f"{name:<64} {results[name]['requests_per_s']:>10.1f} req/s", file=sys.stderr)
+    return results
+
+def _has_tesseract() -> bool:
+    import pytesseract
+    try:
+        pytesseract.get_tesseract_version()
+        return True
+    except pytesseract.TesseractNotFoundError:
+        return False
+
+def environment() -> Dict:
+    """Where the numbers came from: commit, interpreter, machine and library versions."""
+    def git(*args):
+        out = subprocess.run(["git", *args], capture_output=True, text=True, cwd=Path(__file__).parent)
+        return out.stdout.strip() if out.returncode == 0 else None
+
+    versions = {}
+    for package in ("fastapi", "starlette", "pydantic", "numpy", "opencv-python", "Pillow", "reportlab", "orjson"):
+        try:
+            versions[package] = importlib.metadata.version(package)
+        except importlib.metadata.PackageNotFoundError:
+            versions[package] = None
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "hash_seed": os.getenv("PYTHONHASHSEED"),
+        "packages": versions,
+    }
+
+def run(args) -> int:
+    profile = PROFILES[args.profile]
+    if args.repeat:
+        profile = {**profile, "repeat": args.repeat}
+    if args.rounds:
+        profile = {**profile, "rounds": args.rounds}
+    meta = environment()
+    meta.update({
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "profile": args.profile,
+        "settings": {**profile, "branching": args.branching},
+        "tesseract": _has_tesseract(),
+    })
+    results = {"meta": meta, "micro": {}, "http": {}}
+    if not args.no_micro:
+        results["micro"] = run_micro(profile, args.branching, args.only)
+    if not args.no_http:
+        results["http"] = run_http(profile, args.branching, args.only)
+
+    out = Path(args.out) if args.out else RESULTS_DIR / (
+        f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{(meta['commit'] or 'nogit')[:8]}.json"
+    )
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2), encoding='utf-8')
+    print(f"results written to {out}", file=sys.stderr)
+    return 0
+
+# (section, metric, True when higher is better)
+COMPARED_METRICS = [("micro", "min_s", False), ("http", "requests_per_s", True), ("http", "p95_s", False)]
+
+def compare(args) -> int:
+    old = json.loads(Path(args.old).read_text(encoding='utf-8'))
+    new = json.loads(Path(args.new).read_text(encoding='utf-8'))
+    print(f"old: {(old['meta']['commit'] or '?')[:8]} ({old['meta']['profile']}), "
+          f"new: {(new['meta']['commit'] or '?')[:8]} ({new['meta']['profile']})")
+    if old["meta"]["settings"] != new["meta"]["settings"]:
+        print("warning: the runs used different settings; only cases with the same name are compared")
+
+    regressions = 0
+    print(f"{'case':<64} {'metric':>14} {'old':>10} {'new':>10} {'change':>8}")
+    for section, metric, higher_is_better in COMPARED_METRICS:
+        for name, new_case in new.get(section, {}).items():
+            old_case = old.get(section, {}).get(name)
+            if not old_case or metric not in old_case or metric not in new_case or not old_case[metric]:
+                continue
+            change = new_case[metric] / old_case[metric] - 1
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > args.threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            elif worse < -args.threshold:
+                flag = "  faster"
+            print(f"{name:<64} {metric:>14} {old_case[metric]:>10.4g} {new_case[metric]:>10.4g} "
+                  f"{change:>+8.1%}{flag}")
+    print(f"\n{regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Service micro-benchmarks and HTTP load tests, saved as JSON.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the suite and write a results file")
+    run_parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    run_parser.add_argument("--only", help="regex: run only cases whose name matches")
+    run_parser.add_argument("--branching", type=float, default=0.2,
+                            help="share of DAG nodes that get an extra forward edge")
+    run_parser.add_argument("--repeat", type=int, help="minimum runs per micro-benchmark and round")
+    run_parser.add_argument("--rounds", type=int, help="passes over the micro-benchmarks")
+    run_parser.add_argument("--no-micro", action="store_true", help="skip the service micro-benchmarks")
+    run_parser.add_argument("--no-http", action="store_true", help="skip the HTTP load test")
+    run_parser.add_argument("--out", help=f"results file (default: {RESULTS_DIR.name}/<time>-<commit>.json)")
+
+    compare_parser = commands.add_parser("compare", help="compare two results files")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.1,
+                                help="relative change counted as a regression (default 0.1)")
+
+    args = parser.parse_args(argv)
+    return run(args) if args.command == "run" else compare(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+Synthetic flowchart images for image pipeline benchmarks.
+
+Charts are laid out with the real layout engine and drawn with Pillow:
+rectangles for process/io, rounded boxes for start/end, diamonds for
+decisions and connectors with filled arrowheads. Connectors are straight
+unless that would cross another box; those are routed around the right
+side of the chart in their own lane.
+"""
+import io
+import math
+import random
+from typing import Dict, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+from services.layout_engine import apply_auto_layout
+
+BOX_W = 180
+BOX_H = 70
+MARGIN = 60
+LANE_GAP = 24
+
+def make_synthetic_chart(num_nodes: int, decision_rate: float = 0.25, branch_rate: float = 0.0,
+                         seed: int = 0) -> Dict:
+    """
+    A start/end-framed chain where some steps are decisions. With
+    ``branch_rate`` > 0 that share of decisions also gets a 'no' edge
+    skipping ahead two steps.
+    """
+    rng = random.Random(seed)
+    nodes = [{"id": "1", "text": "Start", "type": "start"}]
+    edges = []
+    for i in range(2, num_nodes):
+        if rng.random() < decision_rate:
+            nodes.append({"id": str(i), "text": f"Check {i}?", "type": "decision"})
+            if i + 2 <= num_nodes and rng.random() < branch_rate:
+                edges.append([str(i), str(i + 2), "no"])
+        else:
+            nodes.append({"id": str(i), "text": f"Step {i}", "type": "process"})
+        edges.append([str(i - 1), str(i)])
+    nodes.append({"id": str(num_nodes), "text": "End", "type": "end"})
+    edges.append([str(num_nodes - 1), str(num_nodes)])
+    return {"nodes": nodes, "edges": edges}
+
+def _box(center: Tuple[float, float]) -> Tuple[float, float, float, float]:
+    x, y = center
+    return x - BOX_W / 2, y - BOX_H / 2, x + BOX_W / 2, y + BOX_H / 2
+
+def _inside(node_type: str, dx: float, dy: float) -> bool:
+    """Whether offset (dx, dy) from a node's centre is inside its shape."""
+    half_w, half_h = BOX_W / 2, BOX_H / 2
+    if node_type == "decision":
+        return abs(dx) / half_w + abs(dy) / half_h <= 1
+    if node_type in ("start", "end"):
+        radius = half_h
+        corner_x = max(0.0, abs(dx) - (half_w - radius))
+        return corner_x ** 2 + dy ** 2 <= radius ** 2
+    return abs(dx) <= half_w and abs(dy) <= half_h
+
+def _border_point(center, towards, node_type: str = "process"):
+    """Point where the segment center->towards leaves the node's shape."""
+    (x, y), (tx, ty) = center, towards
+    dx, dy = tx - x, ty - y
+    if dx == 0 and dy == 0:
+        return x, y
+    # Bisect along the ray; the bounding box is the outer limit
+    low, high = 0.0, min(
+        (BOX_W / 2) / abs(dx) if dx else math.inf,
+        (BOX_H / 2) / abs(dy) if dy else math.inf
+    )
+    for _ in range(24):
+        mid = (low + high) / 2
+        if _inside(node_type, dx * mid, dy * mid):
+            low = mid
+        else:
+            high = mid
+    return x + dx * high, y + dy * high
+
+def _crosses_box(start, end, centers, skip) -> bool:
+    """Whether the straight segment passes through any box other than its endpoints'."""
+    for node_id, (x, y) in centers.items():
+        if node_id in skip:
+            continue
+        left, top, right, bottom = _box((x, y))
+        for step in range(1, 32):
+            t = step / 32
+            px = start[0] + (end[0] - start[0]) * t
+            py = start[1] + (end[1] - start[1]) * t
+            if left <= px <= right and top <= py <= bottom:
+                return True
+    return False
+
+def render_flowchart_image(chart: Dict, fmt: str = "PNG", scale: float = 1.0, layout: str = 'hierarchical') -> bytes:
+    """Lay out ``chart`` vertically and render it to encoded image bytes."""
+    image, _ = render_flowchart(chart, scale, layout)
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+def _side_port(center, node_type: str, side: int, dy: float) -> Tuple[float, float]:
+    """Point on the left (side=-1) or right (side=1) border of a node, dy off centre."""
+    x, y = center
+    if node_type == "decision":
+        reach = (BOX_W / 2) * (1 - abs(dy) / (BOX_H / 2))
+    elif node_type in ("start", "end"):
+        radius = BOX_H / 2
+        reach = BOX_W / 2 - radius + math.sqrt(radius ** 2 - dy ** 2)
+    else:
+        reach = BOX_W / 2
+    return x + side * reach, y + dy
+
+def _assign_lanes(spans):
+    """
+    Give each detour (index, top, bottom) a side and a lane. Shorter spans go
+    on inner lanes so nested detours never cross; a span interleaving with
+    one already on a side goes to the other side.
+    """
+    placed = {1: [], -1: []}
+    lanes = {}
+    for index, top, bottom in sorted(spans, key=lambda span: span[2] - span[1]):
+        side = 1
+        for candidate in (1, -1):
+            if all(bottom <= t or top >= b or (top <= t and bottom >= b) for t, b in placed[candidate]):
+                side = candidate
+                break
+        placed[side].append((top, bottom))
+        lanes[index] = (side, len(placed[side]))
+    return lanes, len(placed[1]), len(placed[-1])
+
+def render_flowchart(chart: Dict, scale: float = 1.0, layout: str = 'hierarchical') -> Tuple[Image.Image, Dict]:
+    """Lay out ``chart`` vertically and draw it; also return each node's pixel centre."""
+    chart = apply_auto_layout({"nodes": [dict(n) for n in chart["nodes"]], "edges": chart["edges"]}, 'vertical', layout)
+    types = {n["id"]: n.get("type", "process") for n in chart["nodes"]}
+    xs = [n["position"]["x"] for n in chart["nodes"]]
+    ys = [n["position"]["y"] for n in chart["nodes"]]
+    centers = {n["id"]: (n["position"]["x"], n["position"]["y"]) for n in chart["nodes"]}
+
+    straight = {}
+    detours = []
+    for i, edge in enumerate(chart["edges"]):
+        start = _border_point(centers[edge[0]], centers[edge[1]], types[edge[0]])
+        end = _border_point(centers[edge[1]], centers[edge[0]], types[edge[1]])
+        if _crosses_box(start, end, centers, (edge[0], edge[1])):
+            sy, ty = centers[edge[0]][1], centers[edge[1]][1]
+            detours.append((i, min(sy, ty), max(sy, ty)))
+        else:
+            straight[i] = [start, end]
+    lanes, right_lanes, left_lanes = _assign_lanes(detours)
+
+    # Shift everything so the left lanes and margins fit on the canvas
+    off_x = MARGIN + BOX_W / 2 - min(xs) + left_lanes * LANE_GAP
+    off_y = MARGIN + BOX_H / 2 - min(ys)
+    centers = {node_id: (x + off_x, y + off_y) for node_id, (x, y) in centers.items()}
+    edge_x = {1: max(xs) + off_x + BOX_W / 2, -1: min(xs) + off_x - BOX_W / 2}
+
+    routes = []
+    for i, edge in enumerate(chart["edges"]):
+        if i in straight:
+            routes.append([(x + off_x, y + off_y) for x, y in straight[i]])
+            continue
+        # Leave below and enter above the centre line so ports are never shared
+        side, lane = lanes[i]
+        lane_x = edge_x[side] + side * lane * LANE_GAP
+        start = _side_port(centers[edge[0]], types[edge[0]], side, BOX_H / 4)
+        end = _side_port(centers[edge[1]], types[edge[1]], side, -BOX_H / 4)
+        routes.append([start, (lane_x, start[1]), (lane_x, end[1]), end])
+
+    width = int(max(xs) - min(xs) + BOX_W + 2 * MARGIN + (left_lanes + right_lanes) * LANE_GAP)
+    height = int(max(ys) - min(ys) + BOX_H + 2 * MARGIN)
+
+    image = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=18)
+
+    for route in routes:
+        draw.line(route, fill=0, width=3, joint="curve")
+        (px, py), end = route[-2], route[-1]
+        angle = math.atan2(end[1] - py, end[0] - px)
+        head = [end] + [
+            (end[0] - 16 * math.cos(angle + s * 0.45), end[1] - 16 * math.sin(angle + s * 0.45))
+            for s in (-1, 1)
+        ]
+        draw.polygon(head, fill=0)
+
+    for node in chart["nodes"]:
+        x, y = centers[node["id"]]
+        left, top, right, bottom = _box((x, y))
+        if node["type"] == "decision":
+            draw.polygon([(x, top), (right, y), (x, bottom), (left, y)], outline=0, fill=255, width=3)
+        elif node["type"] in ("start", "end"):
+            draw.rounded_rectangle((left, top, right, bottom), radius=BOX_H // 2, outline=0, fill=255, width=3)
+        else:
+            draw.rectangle((left, top, right, bottom), outline=0, fill=255, width=3)
+        draw.text((x, y), node["text"], fill=0, font=font, anchor="mm")
+
+    if scale != 1.0:
+        image = image.resize((int(width * scale), int(height * scale)), Image.LANCZOS)
+        centers = {node_id: (x * scale, y * scale) for node_id, (x, y) in centers.items()}
+
+    return image, centers
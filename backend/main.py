@@ -1,19 +1,48 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+import time
+# Measured from here: the import of this module (and all it loads) is the worker's cold start
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 import os
+import base64
+import glob
+import itertools
+import tempfile
+from typing import Dict, Literal, Optional
 from dotenv import load_dotenv
-import uvicorn
+import orjson
 
-from services.text_parser import parse_text_to_flowchart
-from services.ai_generator import generate_flowchart_from_prompt
-from services.image_processor import process_image_to_flowchart
+from services.text_parser import parse_text
+from services.flowchart_model import WIRE_FORMATS, FlowchartColumns, encode_chart
+from services.nested_parser import get_document_store, UnknownDocumentError, StaleDocumentError
+from services.ai_generator import (
+    generate_flowchart_from_prompt_async, stream_flowchart_from_prompt, get_prompt_cache, close_async_groq_client
+)
+from services.image_cache import get_image_cache, image_cache_key
+from services.image_preprocess import ImageTooLargeError
 from services.layout_engine import apply_auto_layout
-from services.export_service import export_to_png, export_to_svg, export_to_pdf
+from services.normalize import normalize_flowchart
+from services.clustering import DETAIL_LEVELS, UnknownClusterError, collapses, get_cluster_store
+from services.incremental_layout import apply_incremental_layout
+from services.export_service import (
+    export_to_png, export_to_svg, export_to_pdf, stream_png, stream_svg, stream_pdf
+)
+from services.export_service import DEFAULT_SCALE
+from services.workers import get_image_pool, process_image, QueueFullError, WorkerCrashedError
+from services.batch import DEFAULT_BATCH_SPOOL_BYTES, BatchStats, get_batch_pool, read_jsonl
+from services.metrics import MetricsMiddleware, count_error, get_metrics, observe_size, record_stage
+from services.startup import (
+    StartupMiddleware, mark_imported, run_warmup, startup_report, warmup_names, web_workers, worker_state_reliable
+)
 
 load_dotenv()
 
-app = FastAPI(title="AI Flowchart Maker API")
+app = FastAPI(title="AI Flowchart Maker API", default_response_class=ORJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -24,74 +53,442 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(StartupMiddleware)
+
+# Outermost, so request latency covers CORS handling too
+app.add_middleware(MetricsMiddleware)
+
+# Accepted syntax, orientation and layout options; FastAPI answers 422 for anything else
+Syntax = Literal['flat', 'nested']
+Orientation = Literal['horizontal', 'vertical']
+Layout = Literal['hierarchical', 'layered']
+PdfMode = Literal['tile', 'fit']
+ExportFormat = Literal['png', 'svg', 'pdf']
+
 class TextInput(BaseModel):
     text: str
-    orientation: str = 'horizontal'
+    syntax: Syntax = 'flat'
+    orientation: Orientation = 'horizontal'
+    layout: Layout = 'hierarchical'
+    detail: str = 'full'
 
 class PromptInput(BaseModel):
     prompt: str
-    orientation: str = 'horizontal'
+    orientation: Orientation = 'horizontal'
+    layout: Layout = 'hierarchical'
+    detail: str = 'full'
 
 class ExportInput(BaseModel):
+    nodes: list = []
+    edges: list = []
+    # Alternatively the chart in the columnar wire format, or the id of a
+    # collapsed chart (exported as its overview or fully expanded)
+    columns: Optional[dict] = None
+    chart_id: Optional[str] = None
+
+class ClusterExpandInput(BaseModel):
+    chart_id: str
+    cluster_id: str
+    # Clusters the client has open already
+    expanded: list = []
+
+class LayoutDiff(BaseModel):
+    added_nodes: list = []
+    removed_nodes: list = []
+    added_edges: list = []
+    removed_edges: list = []
+
+class TextEditInput(BaseModel):
+    document_id: str
+    version: int = 0
+    text: Optional[str] = None
+    start: int = 0
+    end: int = 0
+    lines: list = []
+    orientation: Orientation = 'horizontal'
+    layout: Layout = 'hierarchical'
+
+class IncrementalLayoutInput(BaseModel):
     nodes: list
     edges: list
+    diff: LayoutDiff
+    orientation: Orientation = 'horizontal'
+
+def check_wire(wire: str) -> None:
+    if wire not in WIRE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"wire must be one of {', '.join(WIRE_FORMATS)}")
+
+def check_detail(detail: str) -> None:
+    if detail not in DETAIL_LEVELS:
+        raise HTTPException(status_code=400, detail=f"detail must be one of {', '.join(DETAIL_LEVELS)}")
+    if detail == 'overview':
+        require_worker_state("Collapsed charts")
+
+def require_worker_state(feature: str) -> None:
+    """
+    501 for features whose state lives in one web worker (live-edit
+    documents, collapsed charts) when clients may reach any worker.
+    """
+    if not worker_state_reliable():
+        raise HTTPException(
+            status_code=501,
+            detail=f"{feature} are kept by one of {web_workers()} web workers; run with WEB_WORKERS=1, "
+                   f"or with STICKY_SESSIONS=1 behind a proxy that sends each client to the same worker"
+        )
+
+def chart_response(result: Dict, wire: str = 'json') -> ORJSONResponse:
+    """
+    Chart answers are returned as a ready response so FastAPI does not walk
+    every node through jsonable_encoder first; orjson encodes them once.
+    """
+    return ORJSONResponse(encode_chart(result, wire))
+
+def layout_chart(result: Dict, orientation: str, layout: str, detail: str = 'full') -> Dict:
+    """
+    Normalize a chart from any input path (text, LLM, OCR), lay it out (or
+    only its overview, see services.clustering) and attach the
+    normalization report as "graph". Without reliable worker state,
+    detail 'auto' always lays out every node.
+    """
+    chart, report = normalize_flowchart(result)
+    if collapses(detail, len(chart["nodes"])) and worker_state_reliable():
+        chart = get_cluster_store().collapse(chart, orientation, layout)
+    else:
+        chart = apply_auto_layout(chart, orientation, layout)
+    chart["graph"] = report
+    return chart
+
+def export_chart(data: ExportInput, detail: str = 'full'):
+    """
+    (nodes, edges) of an export request, decoding the columnar form if it
+    was sent. A ``chart_id`` exports that collapsed chart's overview or,
+    with detail 'full', every node (laid out on the first such export).
+    """
+    if data.chart_id is not None:
+        check_detail(detail)
+        require_worker_state("Collapsed charts")
+        try:
+            clustered = get_cluster_store().get(data.chart_id)
+        except UnknownClusterError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        chart = clustered.overview if collapses(detail, len(clustered.nodes)) else clustered.full_chart()
+        return chart["nodes"], chart["edges"]
+    if data.columns is None:
+        return data.nodes, data.edges
+    try:
+        chart = FlowchartColumns.from_wire(data.columns).to_flowchart()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return chart["nodes"], chart["edges"]
+
+def ndjson_frame(frame: Dict) -> bytes:
+    return orjson.dumps(frame) + b"\n"
+
+@app.on_event("startup")
+async def startup():
+    # Load the subsystems chosen with WARMUP (by default the image workers)
+    # so their first request does not pay for them
+    await run_warmup(warmup_names())
+
+@app.on_event("shutdown")
+async def shutdown():
+    await close_async_groq_client()
+    get_image_pool().shutdown()
+    get_batch_pool().shutdown()
 
 @app.get("/")
 async def root():
     return {"message": "AI Flowchart Maker API", "status": "running"}
 
+@app.get("/api/cache/stats")
+async def cache_stats():
+    prompt_cache = get_prompt_cache()
+    image_cache = get_image_cache()
+    return {
+        "prompt": prompt_cache.stats() if prompt_cache else None,
+        "image": image_cache.stats() if image_cache else None
+    }
+
+@app.get("/api/workers/stats")
+async def worker_stats():
+    return {"image": get_image_pool().stats(), "batch": get_batch_pool().stats()}
+
+@app.get("/api/startup/stats")
+async def startup_stats():
+    return startup_report()
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    registry = get_metrics()
+    if registry is None:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS_ENABLED=0)")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/api/text-to-flowchart")
-async def text_to_flowchart(input_data: TextInput):
+async def text_to_flowchart(input_data: TextInput, wire: str = 'json'):
+    check_wire(wire)
+    check_detail(input_data.detail)
     try:
-        result = parse_text_to_flowchart(input_data.text)
-        result = apply_auto_layout(result, input_data.orientation)
-        return result
+        result = parse_text(input_data.text, input_data.syntax)
+        result = layout_chart(result, input_data.orientation, input_data.layout, input_data.detail)
+        return chart_response(result, wire)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/text-to-flowchart/incremental")
+async def text_to_flowchart_incremental(input_data: TextEditInput):
+    """
+    Live editing of a nested-syntax spec. Send the full ``text`` to open a
+    document (and again whenever the answer is 404 or 409): the answer is
+    the laid-out chart. Then send each edit as the replaced line range
+    ``start:end``, the new ``lines`` and the ``version`` returned last time:
+    the answer is only the diff and the positions of nodes that were placed,
+    and an edit re-parses only the statements it touches.
+    """
+    require_worker_state("Live-edit documents")
+    store = get_document_store()
+    try:
+        if input_data.text is not None:
+            return chart_response(store.open(input_data.document_id, input_data.text,
+                                             input_data.orientation, input_data.layout))
+        return ORJSONResponse(store.edit(input_data.document_id, input_data.version,
+                                         input_data.start, input_data.end, input_data.lines))
+    except UnknownDocumentError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except StaleDocumentError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/batch/text-to-flowchart")
+async def batch_text_to_flowchart(request: Request, format: Optional[ExportFormat] = None, syntax: Syntax = 'flat',
+                                  orientation: Orientation = 'horizontal', layout: Layout = 'hierarchical'):
+    """
+    Body: NDJSON documents ({"id", "text", "syntax"?, ...} or bare
+    strings). Response: NDJSON, one {"type": "result"} or {"type": "error"}
+    frame per document as its chunk finishes in the batch workers (exports
+    are base64 in "export"; a line that is not a JSON object or string gets
+    an error frame), then a {"type": "done"} frame with throughput. 503
+    while the shared batch pool already runs BATCH_MAX_RUNNING batches.
+    """
+    pool = get_batch_pool()
+    try:
+        release = pool.admit()
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+    # The body is spooled (to disk past BATCH_SPOOL_BYTES) and read a line at
+    # a time while the batch runs, so a large upload is never held whole
+    body = tempfile.SpooledTemporaryFile(max_size=int(os.getenv("BATCH_SPOOL_BYTES", DEFAULT_BATCH_SPOOL_BYTES)))
+    try:
+        async for chunk in request.stream():
+            body.write(chunk)
+        body.seek(0)
+    except BaseException:
+        body.close()
+        release()
+        raise
+
+    def finish() -> None:
+        body.close()
+        release()
+
+    def frames():
+        stats = BatchStats()
+        defaults = {"syntax": syntax, "orientation": orientation, "layout": layout}
+        try:
+            for result in pool.run(read_jsonl(body), format, defaults=defaults, stats=stats):
+                if "error" in result:
+                    yield ndjson_frame({"type": "error", "id": result["id"], "detail": result["error"]})
+                    continue
+                if "export" in result:
+                    result["export"] = base64.b64encode(result["export"]).decode('utf-8')
+                yield ndjson_frame({"type": "result", **result})
+        except WorkerCrashedError as e:
+            yield ndjson_frame({"type": "error", "id": None, "detail": str(e)})
+            return
+        finally:
+            finish()
+        yield ndjson_frame({"type": "done", **stats.report()})
+
+    # The background task frees the slot even if the client leaves before the first frame
+    return StreamingResponse(frames(), media_type="application/x-ndjson", background=BackgroundTask(finish))
+
 @app.post("/api/prompt-to-flowchart")
-async def prompt_to_flowchart(input_data: PromptInput):
+async def prompt_to_flowchart(input_data: PromptInput, wire: str = 'json'):
+    check_wire(wire)
+    check_detail(input_data.detail)
     try:
-        result = generate_flowchart_from_prompt(input_data.prompt)
-        result = apply_auto_layout(result, input_data.orientation)
-        return result
+        result = await generate_flowchart_from_prompt_async(input_data.prompt)
+        result = layout_chart(result, input_data.orientation, input_data.layout, input_data.detail)
+        return chart_response(result, wire)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/prompt-to-flowchart/stream")
+async def prompt_to_flowchart_stream(input_data: PromptInput):
+    """
+    NDJSON stream: one {"type": "node"} / {"type": "edge"} frame per element as
+    the LLM produces it, then a {"type": "done"} frame with the laid-out chart.
+    """
+    check_detail(input_data.detail)
+    async def frames():
+        async for kind, item in stream_flowchart_from_prompt(input_data.prompt):
+            if kind == "result":
+                try:
+                    item = layout_chart(item, input_data.orientation, input_data.layout, input_data.detail)
+                    yield ndjson_frame({"type": "done", **item})
+                except Exception as e:
+                    yield ndjson_frame({"type": "error", "detail": str(e)})
+            else:
+                yield ndjson_frame({"type": kind, kind: item})
+
+    return StreamingResponse(frames(), media_type="application/x-ndjson")
+
 @app.post("/api/image-to-flowchart")
-async def image_to_flowchart(file: UploadFile = File(...), orientation: str = 'horizontal'):
+async def image_to_flowchart(file: UploadFile = File(...), orientation: Orientation = 'horizontal',
+                             layout: Layout = 'hierarchical', detail: str = 'full', wire: str = 'json'):
+    check_wire(wire)
+    check_detail(detail)
     try:
         contents = await file.read()
-        result = process_image_to_flowchart(contents)
-        result = apply_auto_layout(result, orientation)
-        return result
+        observe_size("image_bytes", len(contents))
+        # Re-uploads of the same image (e.g. to change orientation) skip OCR
+        cache = get_image_cache()
+        key = image_cache_key(contents)
+        result = cache.get(key) if cache is not None else None
+        if result is None:
+            # OCR is CPU-bound: run it in the worker pool, off the event loop
+            result = await get_image_pool().submit(process_image, contents)
+            # Only successful extractions carry timings; never cache the fallback chart
+            if "timings" not in result:
+                count_error("image")
+            else:
+                # Measured in the worker process; recorded here where /metrics is served
+                for stage, ms in result["timings"].items():
+                    record_stage(f"image_{stage}", ms / 1000)
+                if cache is not None:
+                    cache.set(key, {"nodes": result["nodes"], "edges": result["edges"]})
+        result = layout_chart(result, orientation, layout, detail)
+        return chart_response(result, wire)
+    except (QueueFullError, WorkerCrashedError) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/layout/incremental")
+async def incremental_layout(input_data: IncrementalLayoutInput):
+    try:
+        result = apply_incremental_layout(
+            {"nodes": input_data.nodes, "edges": input_data.edges},
+            input_data.diff.model_dump(),
+            input_data.orientation
+        )
+        return ORJSONResponse(result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/clusters/expand")
+async def expand_cluster(input_data: ClusterExpandInput, wire: str = 'json'):
+    """
+    The members of one cluster of a collapsed chart (answered with
+    detail=overview), placed around its summary node, with the edges
+    inside the cluster and across its border. 404 when this process no
+    longer has the chart: request it again.
+    """
+    check_wire(wire)
+    require_worker_state("Collapsed charts")
+    try:
+        clustered = get_cluster_store().get(input_data.chart_id)
+        return chart_response(clustered.expand(input_data.cluster_id, input_data.expanded), wire)
+    except UnknownClusterError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Exports render (and a chart_id export may lay out the full chart) for as
+# long as the chart takes: plain handlers, so FastAPI runs them in the thread pool
 @app.post("/api/export/png")
-async def export_png(data: ExportInput):
+def export_png(data: ExportInput, scale: float = Query(DEFAULT_SCALE, gt=0), detail: str = 'full'):
+    nodes, edges = export_chart(data, detail)
     try:
-        png_data = export_to_png(data.nodes, data.edges)
-        return {"data": png_data, "type": "image/png"}
+        png_data = export_to_png(nodes, edges, scale)
+        return ORJSONResponse({"data": png_data, "type": "image/png"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/export/svg")
-async def export_svg(data: ExportInput):
+def export_svg(data: ExportInput, detail: str = 'full'):
+    nodes, edges = export_chart(data, detail)
     try:
-        svg_data = export_to_svg(data.nodes, data.edges)
-        return {"data": svg_data, "type": "image/svg+xml"}
+        svg_data = export_to_svg(nodes, edges)
+        return ORJSONResponse({"data": svg_data, "type": "image/svg+xml"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/export/pdf")
-async def export_pdf(data: ExportInput):
+def export_pdf(data: ExportInput, mode: PdfMode = 'tile', detail: str = 'full'):
+    nodes, edges = export_chart(data, detail)
     try:
-        pdf_data = export_to_pdf(data.nodes, data.edges)
-        return {"data": pdf_data, "type": "application/pdf"}
+        pdf_data = export_to_pdf(nodes, edges, mode)
+        return ORJSONResponse({"data": pdf_data, "type": "application/pdf"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def stream_export(chunks, media_type: str, filename: str) -> StreamingResponse:
+    """
+    Raw export bytes with chunked transfer. The first piece is produced before
+    the response starts, so setup errors (e.g. an oversized canvas) still
+    become a 500; the rest renders in the thread pool as it is sent.
+    """
+    try:
+        first = await run_in_threadpool(next, chunks, b"")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(
+        itertools.chain([first], chunks),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@app.post("/api/export/png/stream")
+async def export_png_stream(data: ExportInput, scale: float = Query(DEFAULT_SCALE, gt=0), detail: str = 'full'):
+    nodes, edges = await run_in_threadpool(export_chart, data, detail)
+    return await stream_export(stream_png(nodes, edges, scale), "image/png", "flowchart.png")
+
+@app.post("/api/export/svg/stream")
+async def export_svg_stream(data: ExportInput, detail: str = 'full'):
+    nodes, edges = await run_in_threadpool(export_chart, data, detail)
+    return await stream_export(stream_svg(nodes, edges), "image/svg+xml", "flowchart.svg")
+
+@app.post("/api/export/pdf/stream")
+async def export_pdf_stream(data: ExportInput, mode: PdfMode = 'tile', detail: str = 'full'):
+    nodes, edges = await run_in_threadpool(export_chart, data, detail)
+    return await stream_export(stream_pdf(nodes, edges, mode), "application/pdf", "flowchart.pdf")
+
+mark_imported(_import_started)
+
 if __name__ == "__main__":
+    import uvicorn
+
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    workers = web_workers()
+    if workers > 1:
+        # Each worker process imports main and runs its own startup (warm-up,
+        # image pool); caches, live-edit documents and collapsed charts are
+        # per worker. Metrics are shared through snapshots in METRICS_DIR.
+        if not os.getenv("METRICS_DIR"):
+            os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="flowchart-metrics-")
+        for stale in glob.glob(os.path.join(os.environ["METRICS_DIR"], "*.json")):
+            os.remove(stale)
+        if not worker_state_reliable():
+            print(f"⚠️ WEB_WORKERS={workers}: live-edit documents and collapsed charts stay in one worker, "
+                  f"so those requests answer 501 (detail=auto lays out every node); "
+                  f"set STICKY_SESSIONS=1 if a proxy sends each client to the same worker")
+        uvicorn.run("main:app", host="0.0.0.0", port=port, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port)
@@ -1,39 +1,35 @@
 import os
+import re
+import copy
 import json
-from typing import Dict
+import asyncio
+import hashlib
+from typing import AsyncIterator, Dict, Tuple
+
+from services.cache import create_cache_from_env
+from services.metrics import count_error, timed
+from services.stream_parser import FlowchartStreamParser
 
 # Lazy initialization - client will be created when first needed
 client = None
+async_client = None
 AI_AVAILABLE = False
 
-def get_groq_client():
-    """Get or create Groq client."""
-    global client, AI_AVAILABLE
-    
-    if client is not None:
-        return client
-    
-    try:
-        from groq import Groq
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
-            raise ValueError("GROQ_API_KEY not found in environment")
-        client = Groq(api_key=api_key)
-        AI_AVAILABLE = True
-        print("✅ Groq AI client initialized successfully")
-        return client
-    except Exception as e:
-        print(f"⚠️ Groq AI initialization failed: {e}")
-        print("AI prompt generation will use fallback mode")
-        AI_AVAILABLE = False
-        return None
+# Async path: bounded concurrency and coalescing of identical in-flight prompts
+_llm_semaphore = None
+_in_flight = {}
 
-def generate_flowchart_from_prompt(prompt: str) -> Dict:
-    """
-    Use Groq AI to generate flowchart structure from natural language prompt.
-    """
-    
-    system_prompt = """You are a flowchart generation expert. Given a user's description, generate a structured flowchart.
+# Prompt result cache, configured from PROMPT_CACHE_* environment variables
+prompt_cache = None
+_prompt_cache_ready = False
+
+MODEL = "llama-3.3-70b-versatile"  # Fast and powerful Groq model
+TEMPERATURE = 0.7
+MAX_TOKENS = 1500
+DEFAULT_LLM_MAX_IN_FLIGHT = 8
+DEFAULT_LLM_TIMEOUT = 30.0
+
+SYSTEM_PROMPT = """You are a flowchart generation expert. Given a user's description, generate a structured flowchart.
 
 Return ONLY a valid JSON object with this exact structure:
 {
@@ -62,47 +58,301 @@ Rules:
 - Keep text concise and clear
 - Create logical flow with proper connections"""
 
+def get_groq_client():
+    """Get or create Groq client."""
+    global client, AI_AVAILABLE
+    
+    if client is not None:
+        return client
+    
+    try:
+        from groq import Groq
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            raise ValueError("GROQ_API_KEY not found in environment")
+        client = Groq(api_key=api_key)
+        AI_AVAILABLE = True
+        print("✅ Groq AI client initialized successfully")
+        return client
+    except Exception as e:
+        print(f"⚠️ Groq AI initialization failed: {e}")
+        print("AI prompt generation will use fallback mode")
+        AI_AVAILABLE = False
+        return None
+
+def get_async_groq_client():
+    """
+    Get or create the async Groq client.
+
+    The client wraps a single pooled httpx.AsyncClient sized to
+    LLM_MAX_IN_FLIGHT, so connections are reused across requests.
+    """
+    global async_client, AI_AVAILABLE
+    
+    if async_client is not None:
+        return async_client
+    
+    try:
+        import httpx
+        from groq import AsyncGroq
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            raise ValueError("GROQ_API_KEY not found in environment")
+        max_in_flight = llm_max_in_flight()
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight),
+            timeout=llm_timeout()
+        )
+        async_client = AsyncGroq(api_key=api_key, http_client=http_client, timeout=llm_timeout(), max_retries=1)
+        AI_AVAILABLE = True
+        print("✅ Groq async AI client initialized successfully")
+        return async_client
+    except Exception as e:
+        print(f"⚠️ Groq async AI initialization failed: {e}")
+        print("AI prompt generation will use fallback mode")
+        AI_AVAILABLE = False
+        return None
+
+async def close_async_groq_client():
+    """Close the pooled connections of the async client, if one was created."""
+    global async_client
+    
+    if async_client is not None:
+        await async_client.close()
+        async_client = None
+
+def llm_max_in_flight() -> int:
+    return int(os.getenv("LLM_MAX_IN_FLIGHT", DEFAULT_LLM_MAX_IN_FLIGHT))
+
+def llm_timeout() -> float:
+    return float(os.getenv("LLM_TIMEOUT", DEFAULT_LLM_TIMEOUT))
+
+def get_llm_semaphore() -> asyncio.Semaphore:
+    """Semaphore bounding concurrent LLM calls (LLM_MAX_IN_FLIGHT)."""
+    global _llm_semaphore
+    
+    if _llm_semaphore is None:
+        _llm_semaphore = asyncio.Semaphore(llm_max_in_flight())
+    return _llm_semaphore
+
+def get_prompt_cache():
+    """Get or create the prompt result cache (None when disabled)."""
+    global prompt_cache, _prompt_cache_ready
+
+    if not _prompt_cache_ready:
+        prompt_cache = create_cache_from_env("PROMPT_CACHE")
+        _prompt_cache_ready = True
+    return prompt_cache
+
+def normalize_prompt(prompt: str) -> str:
+    """Case- and whitespace-insensitive form of a prompt."""
+    return re.sub(r'\s+', ' ', prompt).strip().lower()
+
+def prompt_cache_key(prompt: str, model: str = MODEL, temperature: float = TEMPERATURE,
+                     system_prompt: str = SYSTEM_PROMPT) -> str:
+    """Cache key over the normalized prompt and everything that changes the completion."""
+    system_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+    raw = json.dumps([normalize_prompt(prompt), model, temperature, system_hash])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def completion_request(prompt: str) -> Dict:
+    """Keyword arguments for a chat completion call."""
+    return {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": f"Create a flowchart for: {prompt}"}
+        ],
+        "temperature": TEMPERATURE,
+        "max_tokens": MAX_TOKENS
+    }
+
+def parse_completion(content: str) -> Dict:
+    """Extract and validate the flowchart JSON from a completion."""
+    content = content.strip()
+    
+    # Extract JSON from markdown code blocks if present
+    if "```json" in content:
+        content = content.split("```json")[1].split("```")[0].strip()
+    elif "```" in content:
+        content = content.split("```")[1].split("```")[0].strip()
+    
+    result = json.loads(content)
+    
+    # Validate structure
+    if "nodes" not in result or "edges" not in result:
+        raise ValueError("Invalid response structure")
+    
+    return result
+
+def fallback_flowchart(prompt: str) -> Dict:
+    """Basic structure used when the AI call fails."""
+    return {
+        "nodes": [
+            {"id": "1", "text": "Start", "type": "start"},
+            {"id": "2", "text": prompt[:50], "type": "process"},
+            {"id": "3", "text": "End", "type": "end"}
+        ],
+        "edges": [["1", "2"], ["2", "3"]]
+    }
+
+def generate_flowchart_from_prompt(prompt: str, groq_client=None, cache=None) -> Dict:
+    """
+    Use Groq AI to generate flowchart structure from natural language prompt.
+
+    Results are cached by normalized prompt and model settings; a cache hit
+    skips the LLM call entirely. ``groq_client`` and ``cache`` default to the
+    shared client and cache and can be injected (e.g. a fake client).
+    """
+    if cache is None:
+        cache = get_prompt_cache()
+    key = prompt_cache_key(prompt)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    
     try:
         # Get Groq client (lazy initialization)
-        groq_client = get_groq_client()
+        if groq_client is None:
+            groq_client = get_groq_client()
         
         if not groq_client:
             raise Exception("Groq AI client not available")
             
-        response = groq_client.chat.completions.create(
-            model="llama-3.3-70b-versatile",  # Fast and powerful Groq model
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Create a flowchart for: {prompt}"}
-            ],
-            temperature=0.7,
-            max_tokens=1500
-        )
+        with timed("llm"):
+            response = groq_client.chat.completions.create(**completion_request(prompt))
+        result = parse_completion(response.choices[0].message.content)
         
-        content = response.choices[0].message.content.strip()
+        # Only real completions are cached, never the fallback
+        if cache is not None:
+            cache.set(key, result)
         
-        # Extract JSON from markdown code blocks if present
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
+        return result
         
-        result = json.loads(content)
+    except Exception as e:
+        # Fallback to basic structure if API fails
+        print(f"AI generation error: {e}")
+        count_error("llm")
+        return fallback_flowchart(prompt)
+
+async def generate_flowchart_from_prompt_async(prompt: str, groq_client=None, cache=None) -> Dict:
+    """
+    Non-blocking variant of generate_flowchart_from_prompt for the event loop.
+
+    Concurrent requests for the same (normalized) prompt share one LLM call.
+    Calls are bounded by LLM_MAX_IN_FLIGHT and each is cut off after
+    LLM_TIMEOUT seconds, falling back to the basic structure.
+    """
+    if cache is None:
+        cache = get_prompt_cache()
+    key = prompt_cache_key(prompt)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_complete_async(prompt, key, groq_client, cache))
+        _in_flight[key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(key, None))
+    
+    # Shield so one caller disconnecting does not cancel the shared call;
+    # every caller gets its own copy because layout mutates the result
+    result = await asyncio.shield(task)
+    return copy.deepcopy(result)
+
+async def _complete_async(prompt: str, key: str, groq_client, cache) -> Dict:
+    try:
+        if groq_client is None:
+            groq_client = get_async_groq_client()
         
-        # Validate structure
-        if "nodes" not in result or "edges" not in result:
-            raise ValueError("Invalid response structure")
+        if not groq_client:
+            raise Exception("Groq AI client not available")
+        
+        async with get_llm_semaphore():
+            with timed("llm"):
+                response = await asyncio.wait_for(
+                    groq_client.chat.completions.create(**completion_request(prompt)),
+                    timeout=llm_timeout()
+                )
+        result = parse_completion(response.choices[0].message.content)
+        
+        if cache is not None:
+            cache.set(key, result)
         
         return result
         
     except Exception as e:
-        # Fallback to basic structure if API fails
-        print(f"AI generation error: {e}")
-        return {
-            "nodes": [
-                {"id": "1", "text": "Start", "type": "start"},
-                {"id": "2", "text": prompt[:50], "type": "process"},
-                {"id": "3", "text": "End", "type": "end"}
-            ],
-            "edges": [["1", "2"], ["2", "3"]]
-        }
+        print(f"AI generation error: {e!r}")
+        count_error("llm")
+        return fallback_flowchart(prompt)
+
+async def stream_flowchart_from_prompt(prompt: str, groq_client=None, cache=None) -> AsyncIterator[Tuple[str, object]]:
+    """
+    Streaming variant of generate_flowchart_from_prompt_async.
+
+    Yields ("node", node) and ("edge", edge) as soon as each one is complete
+    in the LLM's streamed output, then ("result", flowchart) with the fully
+    parsed structure (or the fallback if the call failed). Cache hits replay
+    the cached nodes and edges immediately.
+    """
+    if cache is None:
+        cache = get_prompt_cache()
+    key = prompt_cache_key(prompt)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            for node in cached.get("nodes", []):
+                yield "node", node
+            for edge in cached.get("edges", []):
+                yield "edge", edge
+            yield "result", cached
+            return
+    
+    parser = FlowchartStreamParser()
+    streamed = {"nodes": [], "edges": []}
+    content = []
+    
+    try:
+        if groq_client is None:
+            groq_client = get_async_groq_client()
+        
+        if not groq_client:
+            raise Exception("Groq AI client not available")
+        
+        loop = asyncio.get_running_loop()
+        async with get_llm_semaphore():
+            with timed("llm"):
+                deadline = loop.time() + llm_timeout()
+                stream = await asyncio.wait_for(
+                    groq_client.chat.completions.create(**completion_request(prompt), stream=True),
+                    timeout=llm_timeout()
+                )
+                chunks = stream.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=max(0.0, deadline - loop.time()))
+                    except StopAsyncIteration:
+                        break
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if not delta:
+                        continue
+                    content.append(delta)
+                    for kind, item in parser.feed(delta):
+                        streamed[kind + "s"].append(item)
+                        yield kind, item
+        
+        result = parse_completion("".join(content))
+        
+        if cache is not None:
+            cache.set(key, result)
+    
+    except Exception as e:
+        print(f"AI generation error: {e!r}")
+        count_error("llm")
+        # Keep whatever was streamed before the failure
+        result = streamed if streamed["nodes"] else fallback_flowchart(prompt)
+    
+    yield "result", result
@@ -0,0 +1,282 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
+
+from services.text_parser import parse_text
+from services.layout_engine import LAYOUTS, ORIENTATIONS, apply_auto_layout
+from services.normalize import normalize_flowchart
+from services.workers import QueueFullError, WorkerCrashedError
+
+# Documents travel to the workers in chunks (one pickle per chunk instead of
+# per document), and at most BATCH_IN_FLIGHT chunks per worker are submitted
+# ahead, so a huge input is never all in memory.
+DEFAULT_BATCH_CHUNK_SIZE = 16
+BATCH_IN_FLIGHT = 4
+# Batches the API runs at once on its shared pool; more are answered with 503
+DEFAULT_BATCH_MAX_RUNNING = 2
+# Request bodies of the batch endpoint are spooled to disk past this size
+DEFAULT_BATCH_SPOOL_BYTES = 1 << 20
+EXPORT_FORMATS = ('png', 'svg', 'pdf')
+
+def convert_document(doc: Dict, export_format: Optional[str] = None) -> Dict:
+    """
+    Parse, normalize and lay out one document (the normalization report is
+    under "graph"). ``doc`` has "text" and optionally "id",
+    "syntax", "orientation" and "layout". Failures are returned, not raised, so one bad
+    document never stops a batch.
+    """
+    result = {"id": doc.get("id")}
+    if not isinstance(doc.get("text"), str):
+        result["error"] = "Document has no \"text\""
+        return result
+    for option, allowed, default in (("orientation", ORIENTATIONS, 'horizontal'), ("layout", LAYOUTS, 'hierarchical')):
+        value = doc.get(option, default)
+        if value not in allowed:
+            result["error"] = f"Unknown {option} '{value}', expected one of {', '.join(allowed)}"
+            return result
+    try:
+        chart, report = normalize_flowchart(parse_text(doc["text"], doc.get("syntax", 'flat')))
+        chart = apply_auto_layout(chart, doc.get("orientation", 'horizontal'), doc.get("layout", 'hierarchical'))
+        result.update(chart)
+        result["graph"] = report
+        if export_format:
+            result["export"] = export_bytes(chart["nodes"], chart["edges"], export_format)
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+def export_bytes(nodes: List[Dict], edges: List, export_format: str) -> bytes:
+    """Raw file bytes of a laid-out chart in one of EXPORT_FORMATS."""
+    # Imported here so a batch without exports never loads Pillow/reportlab
+    if export_format == 'png':
+        from services.raster_export import render_png
+        return render_png(nodes, edges)
+    if export_format == 'svg':
+        from services.export_service import export_to_svg
+        return export_to_svg(nodes, edges).encode('utf-8')
+    if export_format == 'pdf':
+        from services.pdf_export import write_pdf
+        buffer = BytesIO()
+        write_pdf(buffer, nodes, edges)
+        return buffer.getvalue()
+    raise ValueError(f"Unknown export format '{export_format}', expected one of {', '.join(EXPORT_FORMATS)}")
+
+def _convert_chunk(docs: List[Dict], export_format: Optional[str]) -> List[Dict]:
+    return [convert_document(doc, export_format) for doc in docs]
+
+def _chunks(documents: Iterable, size: int, defaults: Dict) -> Iterator[Tuple[List[Dict], List[Dict]]]:
+    """
+    (chunk of documents to convert, results of documents that failed
+    already). Anything that is not an object fails here: a ValueError from
+    read_jsonl with its message, any other JSON value as not a document.
+    """
+    chunk = []
+    failed = []
+    for index, doc in enumerate(documents):
+        if isinstance(doc, dict):
+            chunk.append({"id": str(index), **defaults, **doc})
+        elif isinstance(doc, ValueError):
+            failed.append({"id": str(index), "error": str(doc)})
+        else:
+            failed.append({"id": str(index), "error": "Document is not a JSON object or string"})
+        if len(chunk) >= size or len(failed) >= size:
+            yield chunk, failed
+            chunk = []
+            failed = []
+    if chunk or failed:
+        yield chunk, failed
+
+class BatchStats:
+    """Running totals for a batch; ``docs_per_sec`` is over wall time since start."""
+
+    def __init__(self):
+        self.documents = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+
+    @property
+    def seconds(self) -> float:
+        return time.perf_counter() - self.started
+
+    def report(self) -> Dict:
+        seconds = self.seconds
+        return {
+            "documents": self.documents,
+            "failed": self.failed,
+            "seconds": round(seconds, 3),
+            "docs_per_sec": round(self.documents / seconds, 1) if seconds > 0 else 0.0
+        }
+
+def batch_workers() -> int:
+    """BATCH_WORKERS, by default the cores divided among the web workers (each runs its own pool)."""
+    from services.startup import web_workers
+    return int(os.getenv("BATCH_WORKERS", max(1, (os.cpu_count() or 1) // web_workers())))
+
+def iter_batch(documents: Iterable[Dict], export_format: Optional[str] = None,
+               workers: Optional[int] = None, chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE,
+               defaults: Optional[Dict] = None, stats: Optional[BatchStats] = None,
+               executor: Optional[ProcessPoolExecutor] = None) -> Iterator[Dict]:
+    """
+    Convert ``documents`` over a process pool, yielding each result as soon
+    as its chunk completes (completion order, not input order; every result
+    carries its document's "id", its position in the input by default).
+    ``defaults`` fills in "syntax"/"orientation"/"layout" where a document
+    has none.
+    ``workers=0`` converts in this process; otherwise the batch runs on
+    ``executor`` (a pool of ``workers`` processes shared with other batches,
+    see BatchWorkerPool) or on a pool started for the batch and shut down
+    when it ends.
+    """
+    if export_format and export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{export_format}', expected one of {', '.join(EXPORT_FORMATS)}")
+    workers = batch_workers() if workers is None else workers
+    stats = stats if stats is not None else BatchStats()
+    chunks = _chunks(documents, max(1, chunk_size), defaults or {})
+
+    def finished(results: List[Dict]) -> Iterator[Dict]:
+        for result in results:
+            stats.documents += 1
+            if "error" in result:
+                stats.failed += 1
+            yield result
+
+    if workers <= 0:
+        for chunk, failed in chunks:
+            yield from finished(failed)
+            yield from finished(_convert_chunk(chunk, export_format))
+        return
+
+    if executor is not None:
+        yield from _run_chunks(executor, chunks, workers, export_format, finished)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from _run_chunks(executor, chunks, workers, export_format, finished)
+
+def _run_chunks(executor: ProcessPoolExecutor, chunks: Iterator, workers: int,
+                export_format: Optional[str], finished: Callable) -> Iterator[Dict]:
+    pending = set()
+    for chunk, failed in chunks:
+        yield from finished(failed)
+        if not chunk:
+            continue
+        pending.add(executor.submit(_convert_chunk, chunk, export_format))
+        if len(pending) >= workers * BATCH_IN_FLIGHT:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from finished(future.result())
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield from finished(future.result())
+
+class BatchWorkerPool:
+    """
+    The API's batch workers: one process pool shared by every batch request,
+    running at most ``max_batches`` batches at once. ``admit`` raises
+    QueueFullError beyond that so the API can answer 503 instead of stacking
+    up batches. A worker that dies fails its batch with WorkerCrashedError
+    and the next batch starts a fresh pool.
+    """
+
+    def __init__(self, max_workers: int, max_batches: int = DEFAULT_BATCH_MAX_RUNNING):
+        self.max_workers = max_workers
+        self.max_batches = max_batches
+        self.running = 0
+        self.rejected = 0
+        self.restarts = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "BatchWorkerPool":
+        return cls(batch_workers(), int(os.getenv("BATCH_MAX_RUNNING", DEFAULT_BATCH_MAX_RUNNING)))
+
+    def admit(self) -> Callable[[], None]:
+        """Take a batch slot; returns the function that gives it back (safe to call more than once)."""
+        with self._lock:
+            if self.running >= self.max_batches:
+                self.rejected += 1
+                raise QueueFullError(f"Batch pool is busy ({self.running} batches running), retry later")
+            self.running += 1
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            with self._lock:
+                if not released:
+                    released = True
+                    self.running -= 1
+
+        return release
+
+    def run(self, documents: Iterable, export_format: Optional[str] = None,
+            defaults: Optional[Dict] = None, stats: Optional[BatchStats] = None) -> Iterator[Dict]:
+        """iter_batch on the shared pool (call ``admit`` first)."""
+        with self._lock:
+            if self._executor is None and self.max_workers > 0:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            executor = self._executor
+        try:
+            yield from iter_batch(documents, export_format, self.max_workers,
+                                  defaults=defaults, stats=stats, executor=executor)
+        except BrokenProcessPool as e:
+            with self._lock:
+                if executor is self._executor:
+                    print("⚠️ Batch worker pool broken, restarting it")
+                    self.restarts += 1
+                    self._executor = None
+                    executor.shutdown(wait=False, cancel_futures=True)
+            raise WorkerCrashedError(f"Batch worker crashed, retry later ({e})") from None
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "max_running": self.max_batches,
+            "running": self.running,
+            "rejected": self.rejected,
+            "restarts": self.restarts
+        }
+
+batch_pool: Optional[BatchWorkerPool] = None
+
+def get_batch_pool() -> BatchWorkerPool:
+    """Get or create the API's shared batch worker pool (configured from the environment)."""
+    global batch_pool
+
+    if batch_pool is None:
+        batch_pool = BatchWorkerPool.from_env()
+    return batch_pool
+
+def read_jsonl(lines: Iterable) -> Iterator[Dict]:
+    """
+    Documents from JSON lines (str or bytes): objects with "text", or bare
+    strings taken as the text. Blank lines are skipped; a line that is not
+    JSON comes out as a ValueError, and other JSON values as they are, so
+    iter_batch fails that one document.
+    """
+    for line in lines:
+        if line.strip():
+            try:
+                doc = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                yield ValueError(f"Invalid JSON: {e}")
+                continue
+            yield {"text": doc} if isinstance(doc, str) else doc
+
+def read_directory(path: str, pattern: str = "*.txt") -> Iterator[Dict]:
+    """One document per matching file, with the file name (no suffix) as its id."""
+    for file in sorted(Path(path).glob(pattern)):
+        yield {"id": file.stem, "text": file.read_text(encoding='utf-8')}
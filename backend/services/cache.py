@@ -0,0 +1,202 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+class MemoryCache:
+    """
+    In-process LRU cache with per-entry TTL.
+
+    Values must be JSON-serializable and are stored encoded (UTF-8 JSON
+    bytes), so callers that mutate a returned value (layout adds positions)
+    never corrupt the cache. With ``max_bytes`` set, the total encoded size
+    is bounded as well.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: Optional[float] = 3600, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires_at, encoded value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is not None and entry[0] < time.time():
+                del self._entries[key]
+                self.size_bytes -= len(entry[1])
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            encoded = entry[1]
+        return json.loads(encoded)
+
+    def set(self, key: str, value: Any) -> None:
+        encoded = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= len(previous[1])
+            if self.max_bytes is not None and len(encoded) > self.max_bytes:
+                return
+            self._entries[key] = (expires_at, encoded)
+            self.size_bytes += len(encoded)
+            while len(self._entries) > self.max_entries or (
+                    self.max_bytes is not None and self.size_bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= len(evicted[1])
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            size = len(self._entries)
+        return {
+            "backend": "memory",
+            "size": size,
+            "max_entries": self.max_entries,
+            "bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+class SQLiteCache:
+    """
+    On-disk LRU cache with per-entry TTL backed by a single SQLite file, so
+    entries survive restarts. Same interface as MemoryCache. Values are
+    stored as BLOBs and sizes are measured on the BLOB form, so
+    ``max_bytes`` counts bytes (also for TEXT rows of older cache files).
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl: Optional[float] = 86400,
+                 max_bytes: Optional[int] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[1] is not None and row[1] < now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.evictions += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        encoded = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        with self._lock:
+            if self.max_bytes is not None and len(encoded) > self.max_bytes:
+                # Never fits: drop any older value instead of evicting everything else
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, encoded, expires_at, now)
+            )
+            count, total = self._conn.execute("SELECT COUNT(*), SUM(LENGTH(CAST(value AS BLOB))) FROM cache").fetchone()
+            overflow = count - self.max_entries
+            if self.max_bytes is not None and total > self.max_bytes:
+                # Oldest entries until enough bytes are freed (the new one fits on its own)
+                excess = total - self.max_bytes
+                oldest = self._conn.execute(
+                    "SELECT LENGTH(CAST(value AS BLOB)) FROM cache ORDER BY last_access LIMIT ?", (count - 1,)
+                )
+                freed = 0
+                evict = 0
+                for (size,) in oldest:
+                    if freed >= excess:
+                        break
+                    freed += size
+                    evict += 1
+                overflow = max(overflow, evict)
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY last_access LIMIT ?)",
+                    (overflow,)
+                )
+                self.evictions += overflow
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            size, total = self._conn.execute("SELECT COUNT(*), SUM(LENGTH(CAST(value AS BLOB))) FROM cache").fetchone()
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "size": size,
+            "max_entries": self.max_entries,
+            "bytes": total or 0,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+def create_cache_from_env(prefix: str, default_max_entries: int = 256, default_ttl: float = 3600,
+                          default_max_bytes: int = 0):
+    """
+    Build a cache from ``<prefix>_BACKEND`` (memory, sqlite or none),
+    ``<prefix>_PATH``, ``<prefix>_MAX_ENTRIES``, ``<prefix>_MAX_BYTES`` (total
+    encoded size, 0 for no limit) and ``<prefix>_TTL`` (seconds, 0 disables
+    expiry). Returns None when caching is disabled.
+    """
+    backend = os.getenv(f"{prefix}_BACKEND", "memory").lower()
+    max_entries = int(os.getenv(f"{prefix}_MAX_ENTRIES", default_max_entries))
+    max_bytes = int(os.getenv(f"{prefix}_MAX_BYTES", default_max_bytes)) or None
+    ttl = float(os.getenv(f"{prefix}_TTL", default_ttl)) or None
+
+    if backend == "none":
+        return None
+    if backend == "sqlite":
+        path = os.getenv(f"{prefix}_PATH", f"{prefix.lower()}.sqlite3")
+        return SQLiteCache(path, max_entries=max_entries, ttl=ttl, max_bytes=max_bytes)
+    return MemoryCache(max_entries=max_entries, ttl=ttl, max_bytes=max_bytes)
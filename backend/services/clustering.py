@@ -0,0 +1,290 @@
+import os
+import secrets
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from services.graph import CompactGraph
+from services.layout_engine import apply_auto_layout
+from services.metrics import instrumented
+
+# Level of detail of a chart answer: 'full' places every node; 'overview'
+# collapses clusters into summary nodes and places only what is visible;
+# 'auto' is the overview for charts of CLUSTER_AUTO_NODES nodes or more
+DETAIL_LEVELS = ('full', 'overview', 'auto')
+DEFAULT_AUTO_NODES = 2000
+DEFAULT_MAX_CHARTS = 16
+
+# Shorter chains stay as they are. No cluster holds more than
+# MAX_CLUSTER_SIZE nodes: a bigger cycle is left open (its chains still
+# collapse, a bare loop is walked as one chain from an arbitrary vertex)
+# and longer chains are cut into pieces.
+MIN_CHAIN_LENGTH = 3
+MAX_CLUSTER_SIZE = 1000
+
+class UnknownClusterError(Exception):
+    """Raised when a chart id or cluster id is not known to this process."""
+
+def collapses(detail: str, num_nodes: int) -> bool:
+    """Whether a chart of ``num_nodes`` nodes is answered as an overview at this detail level."""
+    if detail == 'auto':
+        return num_nodes >= int(os.getenv("CLUSTER_AUTO_NODES", DEFAULT_AUTO_NODES))
+    return detail == 'overview'
+
+@instrumented("cluster")
+def find_clusters(graph: CompactGraph, min_chain: int = MIN_CHAIN_LENGTH,
+                  max_size: int = MAX_CLUSTER_SIZE) -> List[Tuple[str, List[int]]]:
+    """
+    Groups of vertices to collapse, as (kind, vertices) in O(N + E): every
+    strongly connected component of 2 to ``max_size`` vertices ("cycle"),
+    then every chain of at least ``min_chain`` other vertices in which each
+    link is the only edge out of one and the only edge into the next,
+    counted once the cycles are collapsed ("chain"). A loop of more than
+    ``max_size`` vertices with nothing else attached has no first vertex,
+    so it is walked as a chain from its first vertex in id order.
+    """
+    n = graph.num_nodes
+    label, count = graph.strongly_connected_components()
+    clusters = []
+    # Units: vertex v is unit v, the k-th collapsed cycle is unit n + k
+    unit = list(range(n))
+    if count < n:
+        sizes = [0] * count
+        for c in label:
+            sizes[c] += 1
+        cycles = {}
+        for v, c in enumerate(label):
+            if 2 <= sizes[c] <= max_size:
+                cycles.setdefault(c, []).append(v)
+        for members in cycles.values():
+            for v in members:
+                unit[v] = n + len(clusters)
+            clusters.append(("cycle", members))
+
+    # Degrees count distinct links between units
+    links = {(unit[u], unit[v]) for u, v in zip(graph.edge_src, graph.edge_dst)}
+    m = n + len(clusters)
+    out_degree = [0] * m
+    in_degree = [0] * m
+    succ = [-1] * m
+    pred = [-1] * m
+    for a, b in links:
+        if a != b:
+            out_degree[a] += 1
+            in_degree[b] += 1
+            succ[a] = b
+            pred[b] = a
+
+    walked = bytearray(n)
+
+    def walk(v: int) -> None:
+        chain = [v]
+        walked[v] = 1
+        w = v
+        while out_degree[w] == 1:
+            w = succ[w]
+            if w >= n or in_degree[w] != 1 or w == v:
+                break
+            if len(chain) == max_size:
+                clusters.append(("chain", chain))
+                chain = []
+            chain.append(w)
+            walked[w] = 1
+        if len(chain) >= min_chain:
+            clusters.append(("chain", chain))
+
+    for v in range(n):
+        if unit[v] != v:
+            continue
+        # Chains are walked from their first vertex only
+        p = pred[v]
+        if in_degree[v] == 1 and p < n and out_degree[p] == 1:
+            continue
+        walk(v)
+
+    # What is left unwalked are bare loops too big to be a cycle cluster
+    for v in range(n):
+        if unit[v] == v and not walked[v]:
+            walk(v)
+    return clusters
+
+class ClusteredChart:
+    """
+    A normalized chart with its clusters collapsed into summary nodes.
+
+    Only the overview (summary nodes and the nodes outside any cluster) is
+    laid out up front. For each cluster the members, the edges inside it
+    and the edges crossing its border are indexed once, so expanding a
+    cluster costs in proportion to the cluster, not the chart; its
+    sub-layout is computed on the first expansion and kept.
+    """
+
+    def __init__(self, chart: Dict, orientation: str = 'horizontal', layout: str = 'hierarchical'):
+        edges = chart["edges"]
+        self.graph = graph = CompactGraph.from_flowchart(chart["nodes"], edges)
+        self.nodes = graph.vertex_nodes(chart["nodes"])
+        self.edges = edges
+        self.orientation = orientation
+        self.layout = layout
+        n = graph.num_nodes
+
+        found = find_clusters(graph)
+        self.members = [members for _, members in found]
+        self.cluster_ids = []
+        self.clusters = []
+        self.owner = owner = [-1] * n
+        for k, (kind, members) in enumerate(found):
+            cluster_id = f"cluster-{k + 1}"
+            while cluster_id in graph.index:
+                cluster_id = "_" + cluster_id
+            self.cluster_ids.append(cluster_id)
+            self.clusters.append({"id": cluster_id, "kind": kind, "size": len(members)})
+            for v in members:
+                owner[v] = k
+        self.cluster_index = {cluster_id: k for k, cluster_id in enumerate(self.cluster_ids)}
+
+        # Edges of the input by edge number k of the graph: inside a cluster,
+        # or crossing the border of one or two clusters
+        self.inner = [[] for _ in found]
+        self.border = [[] for _ in found]
+        overview_edges = []
+        seen = set()
+        for k, (u, v) in enumerate(zip(graph.edge_src, graph.edge_dst)):
+            cu = owner[u]
+            cv = owner[v]
+            if cu >= 0 and cu == cv:
+                self.inner[cu].append(k)
+                continue
+            if cu >= 0:
+                self.border[cu].append(k)
+            if cv >= 0:
+                self.border[cv].append(k)
+            self._add_edge(overview_edges, seen, k, ())
+
+        # Each summary node takes the place of its cluster's first member
+        overview_nodes = []
+        emitted = set()
+        for v, node in enumerate(self.nodes):
+            k = owner[v]
+            if k < 0:
+                overview_nodes.append(dict(node))
+            elif k not in emitted:
+                emitted.add(k)
+                overview_nodes.append(self._summary_node(k))
+        self.overview = apply_auto_layout({"nodes": overview_nodes, "edges": overview_edges}, orientation, layout)
+        self.summary_positions = {
+            node["id"]: node["position"] for node in self.overview["nodes"] if node["id"] in self.cluster_index
+        }
+        self._sublayouts = {}
+        self._full = None
+
+    def _summary_node(self, k: int) -> Dict:
+        members = self.members[k]
+        first = self.nodes[members[0]].get("text", "")
+        if self.clusters[k]["kind"] == "cycle":
+            text = f"Loop at {first} ({len(members)} steps)"
+        else:
+            text = f"{first} .. {self.nodes[members[-1]].get('text', '')} ({len(members)} steps)"
+        return {"id": self.cluster_ids[k], "text": text, "type": "process"}
+
+    def _visible_id(self, v: int, opened: Iterable[int]) -> str:
+        """The id a vertex is drawn under: its own, or its cluster's while that is collapsed."""
+        k = self.owner[v]
+        if k < 0 or k in opened:
+            return self.graph.ids[v]
+        return self.cluster_ids[k]
+
+    def _add_edge(self, edges: List, seen: set, k: int, opened: Iterable[int]) -> None:
+        """Append edge k between visible ids, once per pair (the first edge's label wins)."""
+        a = self._visible_id(self.graph.edge_src[k], opened)
+        b = self._visible_id(self.graph.edge_dst[k], opened)
+        if (a, b) in seen:
+            return
+        seen.add((a, b))
+        edge = self.edges[self.graph.edge_pos[k]]
+        edges.append([a, b] if len(edge) < 3 else [a, b, edge[2]])
+
+    def expand(self, cluster_id: str, expanded: Iterable[str] = ()) -> Dict:
+        """
+        The members of one cluster, placed by their own sub-layout centred on
+        the summary node, with the edges inside the cluster and those crossing
+        its border. ``expanded`` names clusters the client has open already,
+        so border edges point at their members rather than their summary.
+        """
+        k = self.cluster_index.get(cluster_id)
+        if k is None:
+            raise UnknownClusterError(f"Unknown cluster '{cluster_id}'")
+
+        placed = self._sublayouts.get(k)
+        if placed is None:
+            inner = [self.edges[self.graph.edge_pos[e]] for e in self.inner[k]]
+            nodes = [dict(self.nodes[v]) for v in self.members[k]]
+            placed = apply_auto_layout({"nodes": nodes, "edges": inner}, self.orientation, self.layout)
+            self._sublayouts[k] = placed
+
+        xs = [node["position"]["x"] for node in placed["nodes"]]
+        ys = [node["position"]["y"] for node in placed["nodes"]]
+        center = self.summary_positions[cluster_id]
+        dx = center["x"] - (min(xs) + max(xs)) / 2
+        dy = center["y"] - (min(ys) + max(ys)) / 2
+        nodes = [
+            {**node, "position": {"x": node["position"]["x"] + dx, "y": node["position"]["y"] + dy}}
+            for node in placed["nodes"]
+        ]
+
+        opened = {self.cluster_index[c] for c in expanded if c in self.cluster_index}
+        opened.add(k)
+        edges = list(placed["edges"])
+        seen = set()
+        for e in self.border[k]:
+            self._add_edge(edges, seen, e, opened)
+        return {"cluster": cluster_id, "nodes": nodes, "edges": edges}
+
+    def full_chart(self) -> Dict:
+        """Every node placed by one layout of the whole chart (computed on first use, e.g. by an export)."""
+        if self._full is None:
+            nodes = [dict(node) for node in self.nodes]
+            self._full = apply_auto_layout({"nodes": nodes, "edges": self.edges}, self.orientation, self.layout)
+        return self._full
+
+class ClusterStore:
+    """
+    Collapsed charts by chart id, with LRU eviction. Like editor sessions
+    they live in this process only; a client whose chart id is refused
+    requests the chart again.
+    """
+
+    def __init__(self, max_charts: int = DEFAULT_MAX_CHARTS):
+        self.max_charts = max_charts
+        self._charts = OrderedDict()
+
+    def collapse(self, chart: Dict, orientation: str = 'horizontal', layout: str = 'hierarchical') -> Dict:
+        """
+        Lay out the overview of a normalized chart. When something was
+        collapsed the answer carries a ``chart_id`` for expansion and exports,
+        and the ``clusters`` ({"id", "kind", "size"}) its summary nodes stand for.
+        """
+        clustered = ClusteredChart(chart, orientation, layout)
+        if not clustered.clusters:
+            return clustered.overview
+        chart_id = secrets.token_hex(8)
+        self._charts[chart_id] = clustered
+        while len(self._charts) > self.max_charts:
+            self._charts.popitem(last=False)
+        return {**clustered.overview, "chart_id": chart_id, "clusters": clustered.clusters}
+
+    def get(self, chart_id: str) -> ClusteredChart:
+        clustered = self._charts.get(chart_id)
+        if clustered is None:
+            raise UnknownClusterError(f"Unknown chart '{chart_id}', request the chart again")
+        self._charts.move_to_end(chart_id)
+        return clustered
+
+cluster_store: Optional[ClusterStore] = None
+
+def get_cluster_store() -> ClusterStore:
+    """Get or create the collapsed-chart store (CLUSTER_CHARTS_MAX charts)."""
+    global cluster_store
+
+    if cluster_store is None:
+        cluster_store = ClusterStore(int(os.getenv("CLUSTER_CHARTS_MAX", DEFAULT_MAX_CHARTS)))
+    return cluster_store
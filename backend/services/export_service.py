@@ -1,83 +1,178 @@
 import base64
 from io import BytesIO
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
-from typing import List, Dict
+from xml.sax.saxutils import escape
+from typing import Dict, Iterator, List
 
-def export_to_png(nodes: List[Dict], edges: List[Dict]) -> str:
-    """Export flowchart as base64 PNG (placeholder - actual rendering done in frontend)."""
-    return "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+from services.graph import CompactGraph
+from services.metrics import instrumented, observe_size, timed_chunks
 
+# The PNG and PDF renderers (services.raster_export / pdf_export) load
+# numpy, Pillow and reportlab, so they are imported on first use. PNGs
+# render at DEFAULT_SCALE times the chart's coordinates.
+DEFAULT_SCALE = 2.0
+
+# Streamed exports are sent in pieces of about this size
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# SVG shapes are drawn around each node position: boxes are 120x60 and
+# decisions 120x80. They are defined once and placed with <use>.
+SVG_NODE_HALF_WIDTH = 60
+SVG_NODE_HALF_HEIGHT = 40
+SVG_PADDING = 20
+SVG_DEFS = (
+    '<defs>'
+    '<style>'
+    '.e line{stroke:#666;stroke-width:2;marker-end:url(#arrowhead)}'
+    '.l text{fill:#666;font-size:12px}'
+    '.n{fill:#fff;stroke:#333;stroke-width:2}'
+    '.t text{fill:#333;font-size:14px;text-anchor:middle}'
+    '</style>'
+    '<marker id="arrowhead" markerWidth="10" markerHeight="10" refX="9" refY="3" orient="auto">'
+    '<polygon points="0 0, 10 3, 0 6" fill="#666"/></marker>'
+    '<rect id="b" x="-60" y="-30" width="120" height="60" rx="10"/>'
+    '<polygon id="d" points="0,-40 60,0 0,40 -60,0"/>'
+    '</defs>'
+)
+
+@instrumented("export_png")
+def export_to_png(nodes: List[Dict], edges: List[Dict], scale: float = DEFAULT_SCALE) -> str:
+    """Export flowchart as a base64 PNG data URL, rendered server-side in bands."""
+    from services.raster_export import render_png
+    png_bytes = render_png(nodes, edges, scale)
+    observe_size("export_bytes", len(png_bytes))
+    return "data:image/png;base64," + base64.b64encode(png_bytes).decode('utf-8')
+
+def stream_png(nodes: List[Dict], edges: List[Dict], scale: float = DEFAULT_SCALE) -> Iterator[bytes]:
+    """Raw PNG bytes, produced band by band as the image renders."""
+    from services.raster_export import iter_png
+    return timed_chunks("export_png", iter_png(nodes, edges, scale), "export_bytes")
+
+@instrumented("export_svg")
 def export_to_svg(nodes: List[Dict], edges: List[Dict]) -> str:
     """Generate SVG representation of flowchart."""
-    svg_parts = ['<svg xmlns="http://www.w3.org/2000/svg" width="800" height="600" viewBox="0 0 800 600">']
+    svg = ''.join(_svg_chunks(nodes, edges))
+    observe_size("export_bytes", len(svg))
+    return svg
+
+def stream_svg(nodes: List[Dict], edges: List[Dict]) -> Iterator[str]:
+    """SVG markup in pieces of about STREAM_CHUNK_SIZE, written as elements are generated."""
+    return timed_chunks("export_svg", _svg_chunks(nodes, edges), "export_bytes")
+
+def _svg_chunks(nodes: List[Dict], edges: List[Dict]) -> Iterator[str]:
+    svg_parts = []
+    buffered = 0
+    for part in _svg_elements(nodes, edges):
+        svg_parts.append(part)
+        buffered += len(part)
+        if buffered >= STREAM_CHUNK_SIZE:
+            yield ''.join(svg_parts)
+            svg_parts = []
+            buffered = 0
+    if svg_parts:
+        yield ''.join(svg_parts)
+
+def _svg_elements(nodes: List[Dict], edges: List[Dict]) -> Iterator[str]:
+    """
+    SVG in one pass over edges and nodes. Shapes are <use> references to
+    symbols defined once, and styling lives in a stylesheet of short
+    classes, so each element carries only its coordinates.
+    """
+    graph = CompactGraph.from_flowchart(nodes, edges)
+    vertex_nodes = graph.vertex_nodes(nodes)
+    placed = [node for node in nodes if "position" in node]
     
-    # Draw edges
-    for edge in edges:
-        if len(edge) >= 2:
-            from_node = next((n for n in nodes if n["id"] == edge[0]), None)
-            to_node = next((n for n in nodes if n["id"] == edge[1]), None)
-            
-            if from_node and to_node and "position" in from_node and "position" in to_node:
-                x1 = from_node["position"]["x"]
-                y1 = from_node["position"]["y"] + 30
-                x2 = to_node["position"]["x"]
-                y2 = to_node["position"]["y"] - 30
-                
-                svg_parts.append(f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" stroke="#666" stroke-width="2" marker-end="url(#arrowhead)"/>')
-                
-                # Add label if exists
-                if len(edge) > 2:
-                    label = edge[2]
-                    mid_x = (x1 + x2) / 2
-                    mid_y = (y1 + y2) / 2
-                    svg_parts.append(f'<text x="{mid_x}" y="{mid_y}" fill="#666" font-size="12">{label}</text>')
+    # Canvas from the real bounds of the shapes
+    if placed:
+        min_x = min(node["position"]["x"] for node in placed) - SVG_NODE_HALF_WIDTH - SVG_PADDING
+        min_y = min(node["position"]["y"] for node in placed) - SVG_NODE_HALF_HEIGHT - SVG_PADDING
+        max_x = max(node["position"]["x"] for node in placed) + SVG_NODE_HALF_WIDTH + SVG_PADDING
+        max_y = max(node["position"]["y"] for node in placed) + SVG_NODE_HALF_HEIGHT + SVG_PADDING
+    else:
+        min_x, min_y, max_x, max_y = 0, 0, 800, 600
+    width = _svg_number(max_x - min_x)
+    height = _svg_number(max_y - min_y)
     
-    # Draw nodes
-    for node in nodes:
-        if "position" in node:
-            x = node["position"]["x"]
-            y = node["position"]["y"]
-            text = node["text"]
-            node_type = node.get("type", "process")
+    yield (f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+           f'width="{width}" height="{height}" viewBox="{_svg_number(min_x)} {_svg_number(min_y)} {width} {height}">')
+    yield SVG_DEFS
+    
+    # Draw edges
+    labels = []
+    yield '<g class="e">'
+    for k in range(graph.num_edges):
+        edge = edges[graph.edge_pos[k]]
+        from_node = vertex_nodes[graph.edge_src[k]]
+        to_node = vertex_nodes[graph.edge_dst[k]]
+        
+        if "position" in from_node and "position" in to_node:
+            x1 = from_node["position"]["x"]
+            y1 = from_node["position"]["y"] + 30
+            x2 = to_node["position"]["x"]
+            y2 = to_node["position"]["y"] - 30
             
-            if node_type == "decision":
-                svg_parts.append(f'<polygon points="{x},{y-40} {x+60},{y} {x},{y+40} {x-60},{y}" fill="#fff" stroke="#333" stroke-width="2"/>')
-            else:
-                svg_parts.append(f'<rect x="{x-60}" y="{y-30}" width="120" height="60" rx="10" fill="#fff" stroke="#333" stroke-width="2"/>')
+            yield f'<line x1="{_svg_number(x1)}" y1="{_svg_number(y1)}" x2="{_svg_number(x2)}" y2="{_svg_number(y2)}"/>'
             
-            svg_parts.append(f'<text x="{x}" y="{y+5}" text-anchor="middle" font-size="14" fill="#333">{text[:20]}</text>')
+            # Labels go in their own group, after all lines
+            if len(edge) > 2:
+                labels.append(((x1 + x2) / 2, (y1 + y2) / 2, edge[2]))
+    yield '</g>'
     
-    # Arrow marker
-    svg_parts.append('<defs><marker id="arrowhead" markerWidth="10" markerHeight="10" refX="9" refY="3" orient="auto"><polygon points="0 0, 10 3, 0 6" fill="#666"/></marker></defs>')
+    if labels:
+        yield '<g class="l">'
+        for mid_x, mid_y, label in labels:
+            yield f'<text x="{_svg_number(mid_x)}" y="{_svg_number(mid_y)}">{escape(str(label))}</text>'
+        yield '</g>'
     
-    svg_parts.append('</svg>')
+    # Draw nodes, then their text on top
+    yield '<g class="n">'
+    for node in placed:
+        symbol = "d" if node.get("type", "process") == "decision" else "b"
+        yield f'<use xlink:href="#{symbol}" x="{_svg_number(node["position"]["x"])}" y="{_svg_number(node["position"]["y"])}"/>'
+    yield '</g><g class="t">'
+    for node in placed:
+        x = node["position"]["x"]
+        y = node["position"]["y"]
+        yield f'<text x="{_svg_number(x)}" y="{_svg_number(y + 5)}">{escape(str(node.get("text", ""))[:20])}</text>'
+    yield '</g>'
     
-    return ''.join(svg_parts)
+    yield '</svg>'
+
+def _svg_number(value) -> str:
+    """Shortest form of a coordinate: integers without a decimal point, else at most 2 decimals."""
+    if value == int(value):
+        return str(int(value))
+    return f"{value:.2f}".rstrip("0").rstrip(".")
 
-def export_to_pdf(nodes: List[Dict], edges: List[Dict]) -> str:
-    """Generate PDF representation of flowchart."""
+@instrumented("export_pdf")
+def export_to_pdf(nodes: List[Dict], edges: List[Dict], mode: str = 'tile') -> str:
+    """Generate PDF of the laid-out flowchart, tiled over pages or fit to one ('tile' / 'fit')."""
+    from services.pdf_export import write_pdf
     buffer = BytesIO()
-    
-    # Create PDF
-    c = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-    
-    c.setFont("Helvetica", 12)
-    c.drawString(100, height - 50, "AI Flowchart")
-    
-    # Draw nodes
-    y_pos = height - 100
-    for node in nodes:
-        text = node.get("text", "")
-        c.drawString(100, y_pos, f"• {text}")
-        y_pos -= 30
-    
-    c.save()
+    write_pdf(buffer, nodes, edges, mode)
     
     # Convert to base64
     pdf_bytes = buffer.getvalue()
     buffer.close()
+    observe_size("export_bytes", len(pdf_bytes))
     
     return base64.b64encode(pdf_bytes).decode('utf-8')
+
+def stream_pdf(nodes: List[Dict], edges: List[Dict], mode: str = 'tile') -> Iterator[bytes]:
+    """
+    Raw PDF bytes in STREAM_CHUNK_SIZE pieces. reportlab assembles the
+    document in memory on save, so pieces are sliced from its buffer
+    without a getvalue() copy.
+    """
+    return timed_chunks("export_pdf", _pdf_chunks(nodes, edges, mode), "export_bytes")
+
+def _pdf_chunks(nodes: List[Dict], edges: List[Dict], mode: str) -> Iterator[bytes]:
+    from services.pdf_export import write_pdf
+    buffer = BytesIO()
+    write_pdf(buffer, nodes, edges, mode)
+    view = buffer.getbuffer()
+    try:
+        for offset in range(0, len(view), STREAM_CHUNK_SIZE):
+            yield bytes(view[offset:offset + STREAM_CHUNK_SIZE])
+    finally:
+        view.release()
+        buffer.close()
@@ -0,0 +1,158 @@
+import math
+from array import array
+from typing import Dict, List, Optional
+
+# Response encodings of a chart: 'json' is the usual {"nodes": [...], "edges":
+# [...]} shape; 'columnar' is FlowchartColumns.to_wire(), one array per field
+WIRE_FORMATS = ('json', 'columnar')
+
+_NO_POSITION = {"x": math.nan, "y": math.nan}
+
+class FlowchartColumns:
+    """
+    A flowchart held column-wise: parallel lists of node ids, texts and
+    types, node positions in ``array('d')`` buffers (NaN where a node has no
+    position), and edges as node indexes in ``array('i')`` buffers with a
+    parallel list of labels (None when unlabelled). ``integral`` records
+    that every position given was a whole int, so they go back out as ints
+    and a chart reads the same in both wire formats.
+
+    A 10k-node chart takes a handful of containers instead of three small
+    dicts and a list per node and edge. Edges refer to the first node with
+    their id; edges to unknown ids are dropped, as they cannot be drawn.
+    """
+
+    __slots__ = ("ids", "texts", "types", "x", "y", "edge_src", "edge_dst", "edge_labels", "integral")
+
+    def __init__(self, ids: List, texts: List[str], types: List[str], x: array, y: array,
+                 edge_src: array, edge_dst: array, edge_labels: List[Optional[str]], integral: bool = False):
+        self.ids = ids
+        self.texts = texts
+        self.types = types
+        self.x = x
+        self.y = y
+        self.edge_src = edge_src
+        self.edge_dst = edge_dst
+        self.edge_labels = edge_labels
+        self.integral = integral
+
+    @classmethod
+    def from_flowchart(cls, chart: Dict) -> "FlowchartColumns":
+        """Columns of a {"nodes", "edges"} chart, built with one comprehension per column."""
+        nodes = chart.get("nodes", [])
+        ids = [node["id"] for node in nodes]
+        texts = [node.get("text", "") for node in nodes]
+        types = [node.get("type", "process") for node in nodes]
+        positions = [node.get("position") or _NO_POSITION for node in nodes]
+        xs = [position["x"] for position in positions]
+        ys = [position["y"] for position in positions]
+        x = array('d', xs)
+        y = array('d', ys)
+
+        # Built back to front so the first node with an id wins
+        index = dict(zip(reversed(ids), range(len(ids) - 1, -1, -1)))
+        edges = [edge for edge in chart.get("edges", []) if len(edge) >= 2]
+        lookup = index.get
+        sources = [lookup(edge[0]) for edge in edges]
+        targets = [lookup(edge[1]) for edge in edges]
+        labels = [edge[2] if len(edge) > 2 else None for edge in edges]
+        if None in sources or None in targets:
+            kept = [k for k, (u, v) in enumerate(zip(sources, targets)) if u is not None and v is not None]
+            sources = [sources[k] for k in kept]
+            targets = [targets[k] for k in kept]
+            labels = [labels[k] for k in kept]
+        return cls(ids, texts, types, x, y, array('i', sources), array('i', targets), labels,
+                   _all_ints(xs) and _all_ints(ys))
+
+    @classmethod
+    def from_wire(cls, data: Dict) -> "FlowchartColumns":
+        """Columns from the to_wire() encoding. Raises ValueError when it is malformed."""
+        try:
+            ids = list(data["ids"])
+            texts = list(data["texts"])
+            types = list(data["types"])
+            xs = list(data["x"])
+            ys = list(data["y"])
+            x = array('d', (math.nan if value is None else value for value in xs))
+            y = array('d', (math.nan if value is None else value for value in ys))
+            edges = data["edges"]
+            edge_src = array('i', edges["source"])
+            edge_dst = array('i', edges["target"])
+            edge_labels = list(edges["label"])
+        except (KeyError, TypeError, OverflowError) as e:
+            raise ValueError(f"Malformed columnar chart: {e!r}")
+        n = len(ids)
+        if not len(texts) == len(types) == len(x) == len(y) == n:
+            raise ValueError("Malformed columnar chart: node columns differ in length")
+        if not len(edge_dst) == len(edge_labels) == len(edge_src):
+            raise ValueError("Malformed columnar chart: edge columns differ in length")
+        if any(not 0 <= v < n for v in edge_src) or any(not 0 <= v < n for v in edge_dst):
+            raise ValueError("Malformed columnar chart: edge endpoint out of range")
+        return cls(ids, texts, types, x, y, edge_src, edge_dst, edge_labels,
+                   _all_ints(value for value in xs if value is not None)
+                   and _all_ints(value for value in ys if value is not None))
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.ids)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.edge_src)
+
+    def to_wire(self) -> Dict:
+        """
+        The columnar wire encoding: {"ids", "texts", "types", "x", "y",
+        "edges": {"source", "target", "label"}}, with edge endpoints as node
+        indexes and null for missing labels. Missing positions stay NaN,
+        which orjson writes as null.
+        """
+        return {
+            "ids": self.ids,
+            "texts": self.texts,
+            "types": self.types,
+            "x": self._positions(self.x),
+            "y": self._positions(self.y),
+            "edges": {
+                "source": self.edge_src.tolist(),
+                "target": self.edge_dst.tolist(),
+                "label": self.edge_labels
+            }
+        }
+
+    def _positions(self, column: array) -> List:
+        if not self.integral:
+            return column.tolist()
+        return [int(value) if value == value else None for value in column]
+
+    def to_flowchart(self) -> Dict:
+        """The usual {"nodes", "edges"} chart that the services work on."""
+        nodes = []
+        xs, ys = self._positions(self.x), self._positions(self.y)
+        for node_id, text, node_type, x, y in zip(self.ids, self.texts, self.types, xs, ys):
+            node = {"id": node_id, "text": text, "type": node_type}
+            if x is not None and x == x and y is not None and y == y:
+                node["position"] = {"x": x, "y": y}
+            nodes.append(node)
+        ids = self.ids
+        edges = [
+            [ids[u], ids[v]] if label is None else [ids[u], ids[v], label]
+            for u, v, label in zip(self.edge_src, self.edge_dst, self.edge_labels)
+        ]
+        return {"nodes": nodes, "edges": edges}
+
+def _all_ints(values) -> bool:
+    """Whether every value is an int (True for none at all); NaN placeholders are skipped."""
+    return all(type(value) is int or value != value for value in values)
+
+def encode_chart(result: Dict, wire: str = 'json') -> Dict:
+    """``result`` in the given wire format; keys besides nodes and edges are kept as they are."""
+    if wire == 'json':
+        return result
+    if wire != 'columnar':
+        raise ValueError(f"Unknown wire format '{wire}', expected one of {', '.join(WIRE_FORMATS)}")
+    encoded = FlowchartColumns.from_flowchart(result).to_wire()
+    for key, value in result.items():
+        if key not in ("nodes", "edges"):
+            encoded[key] = value
+    return encoded
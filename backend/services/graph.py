@@ -0,0 +1,204 @@
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+class CompactGraph:
+    """
+    Directed flowchart graph with node ids interned to 0..n-1.
+
+    Adjacency is stored CSR-style in ``array('i')`` buffers: the successors
+    of vertex ``v`` are ``succ_targets[succ_offsets[v]:succ_offsets[v + 1]]``
+    (likewise for predecessors), in the order the edges were given. Edge
+    ``k`` of the input keeps its position in ``edge_src``/``edge_dst`` so
+    callers can get back to labels. Building is a single O(N + E) pass.
+    """
+
+    __slots__ = (
+        "ids", "index", "edge_src", "edge_dst", "edge_pos",
+        "succ_offsets", "succ_targets", "pred_offsets", "pred_targets",
+    )
+
+    def __init__(self, ids: List, index: Dict, edge_src: array, edge_dst: array, edge_pos: array):
+        self.ids = ids
+        self.index = index
+        self.edge_src = edge_src
+        self.edge_dst = edge_dst
+        self.edge_pos = edge_pos
+        n = len(ids)
+        self.succ_offsets, self.succ_targets = _csr(n, edge_src, edge_dst)
+        self.pred_offsets, self.pred_targets = _csr(n, edge_dst, edge_src)
+
+    @classmethod
+    def from_flowchart(cls, nodes: List[Dict], edges: Iterable, include_dangling: bool = False) -> "CompactGraph":
+        """
+        Intern node ids in order of first appearance and collect edges.
+
+        Edges whose endpoints are not nodes are skipped unless
+        ``include_dangling`` is set, in which case the unknown ids become
+        extra vertices after the real nodes.
+        """
+        index = {}
+        ids = []
+        for node in nodes:
+            node_id = node["id"]
+            if node_id not in index:
+                index[node_id] = len(ids)
+                ids.append(node_id)
+
+        edge_src = array('i')
+        edge_dst = array('i')
+        edge_pos = array('i')
+        for pos, edge in enumerate(edges):
+            if len(edge) < 2:
+                continue
+            if include_dangling:
+                for endpoint in (edge[0], edge[1]):
+                    if endpoint not in index:
+                        index[endpoint] = len(ids)
+                        ids.append(endpoint)
+            u = index.get(edge[0])
+            v = index.get(edge[1])
+            if u is None or v is None:
+                continue
+            edge_src.append(u)
+            edge_dst.append(v)
+            edge_pos.append(pos)
+
+        return cls(ids, index, edge_src, edge_dst, edge_pos)
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.ids)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.edge_src)
+
+    def successors(self, v: int) -> array:
+        return self.succ_targets[self.succ_offsets[v]:self.succ_offsets[v + 1]]
+
+    def predecessors(self, v: int) -> array:
+        return self.pred_targets[self.pred_offsets[v]:self.pred_offsets[v + 1]]
+
+    def out_degree(self, v: int) -> int:
+        return self.succ_offsets[v + 1] - self.succ_offsets[v]
+
+    def in_degree(self, v: int) -> int:
+        return self.pred_offsets[v + 1] - self.pred_offsets[v]
+
+    def vertex_nodes(self, nodes: List[Dict]) -> List[Dict]:
+        """The first node dict for each vertex (None for dangling-edge vertices)."""
+        lookup = [None] * len(self.ids)
+        for node in nodes:
+            vertex = self.index[node["id"]]
+            if lookup[vertex] is None:
+                lookup[vertex] = node
+        return lookup
+
+    def sources(self) -> List[int]:
+        """Vertices without incoming edges, in interning order."""
+        offsets = self.pred_offsets
+        return [v for v in range(len(self.ids)) if offsets[v] == offsets[v + 1]]
+
+    def components(self) -> Tuple[array, int]:
+        """
+        Weakly connected components: (label of each vertex, number of
+        components). Components are numbered in order of their first vertex,
+        so a connected graph is all 0. One traversal over both adjacencies.
+        """
+        n = len(self.ids)
+        label = array('i', [-1]) * n
+        succ_offsets, succ_targets = self.succ_offsets, self.succ_targets
+        pred_offsets, pred_targets = self.pred_offsets, self.pred_targets
+        count = 0
+        for root in range(n):
+            if label[root] >= 0:
+                continue
+            label[root] = count
+            stack = [root]
+            while stack:
+                v = stack.pop()
+                for w in succ_targets[succ_offsets[v]:succ_offsets[v + 1]]:
+                    if label[w] < 0:
+                        label[w] = count
+                        stack.append(w)
+                for w in pred_targets[pred_offsets[v]:pred_offsets[v + 1]]:
+                    if label[w] < 0:
+                        label[w] = count
+                        stack.append(w)
+            count += 1
+        return label, count
+
+    def strongly_connected_components(self) -> Tuple[array, int]:
+        """
+        Strongly connected components: (label of each vertex, number of
+        components), by Tarjan's algorithm with an explicit stack. Labels
+        come out in reverse topological order of the condensed graph.
+        """
+        n = len(self.ids)
+        # Plain lists: the search indexes them several times per edge, and
+        # list items need no boxing on every read as array items do
+        order = [-1] * n
+        low = [0] * n
+        label = [-1] * n
+        on_stack = [False] * n
+        stack = []
+        offsets = self.succ_offsets.tolist()
+        targets = self.succ_targets.tolist()
+        counter = 0
+        count = 0
+        for root in range(n):
+            if order[root] >= 0:
+                continue
+            order[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            # (vertex, next successor slot to look at)
+            work = [(root, offsets[root])]
+            while work:
+                v, i = work[-1]
+                end = offsets[v + 1]
+                while i < end:
+                    w = targets[i]
+                    i += 1
+                    if order[w] < 0:
+                        work[-1] = (v, i)
+                        order[w] = low[w] = counter
+                        counter += 1
+                        stack.append(w)
+                        on_stack[w] = True
+                        work.append((w, offsets[w]))
+                        break
+                    if on_stack[w] and order[w] < low[v]:
+                        low[v] = order[w]
+                else:
+                    work.pop()
+                    if low[v] == order[v]:
+                        while True:
+                            w = stack.pop()
+                            on_stack[w] = False
+                            label[w] = count
+                            if w == v:
+                                break
+                        count += 1
+                    if work:
+                        u = work[-1][0]
+                        if low[v] < low[u]:
+                            low[u] = low[v]
+        return array('i', label), count
+
+def _csr(n: int, keys: array, values: array):
+    """Counting-sort (keys, values) pairs into offsets/targets buffers, stable in input order."""
+    offsets = array('i', [0]) * (n + 1)
+    for k in keys:
+        offsets[k + 1] += 1
+    for v in range(n):
+        offsets[v + 1] += offsets[v]
+
+    cursor = offsets[:-1]
+    targets = array('i', [0]) * len(keys)
+    for k, value in zip(keys, values):
+        targets[cursor[k]] = value
+        cursor[k] += 1
+
+    return offsets, targets
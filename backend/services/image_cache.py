@@ -0,0 +1,31 @@
+import hashlib
+
+from services.cache import create_cache_from_env
+from services.image_preprocess import max_working_pixels
+
+# Extracted (not laid out) charts keyed by image content, configured from
+# IMAGE_CACHE_* environment variables. Bump the version whenever extraction
+# output (services.image_processor) changes so stale entries are never served.
+# Kept apart from image_processor so the API can check the cache without
+# loading OpenCV and tesseract.
+IMAGE_PIPELINE_VERSION = 1
+DEFAULT_IMAGE_CACHE_BYTES = 32 * 1024 * 1024
+image_cache = None
+_image_cache_ready = False
+
+def get_image_cache():
+    """Get or create the image result cache (None when disabled)."""
+    global image_cache, _image_cache_ready
+
+    if not _image_cache_ready:
+        image_cache = create_cache_from_env(
+            "IMAGE_CACHE", default_max_entries=4096, default_ttl=0,
+            default_max_bytes=DEFAULT_IMAGE_CACHE_BYTES
+        )
+        _image_cache_ready = True
+    return image_cache
+
+def image_cache_key(image_bytes: bytes) -> str:
+    """Cache key over the image content and the settings that change extraction."""
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    return f"{digest}:{IMAGE_PIPELINE_VERSION}:{max_working_pixels()}"
@@ -0,0 +1,95 @@
+import io
+import math
+import os
+import time
+from typing import TYPE_CHECKING, Dict, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Uploads above IMAGE_MAX_PIXELS are rejected from the header alone, before
+# any pixel is decoded. Anything larger than the working size is reduced:
+# tesseract gains nothing above ~300 DPI, and an A4 page at 300 DPI is
+# about 8.7 megapixels.
+DEFAULT_MAX_PIXELS = 50_000_000
+DEFAULT_WORKING_PIXELS = 8_000_000
+TARGET_DPI = 300
+
+class ImageTooLargeError(ValueError):
+    """Raised when an upload decodes to more pixels than allowed."""
+
+def max_image_pixels() -> int:
+    return int(os.getenv("IMAGE_MAX_PIXELS", DEFAULT_MAX_PIXELS))
+
+def max_working_pixels() -> int:
+    return int(os.getenv("IMAGE_WORKING_PIXELS", DEFAULT_WORKING_PIXELS))
+
+def working_size(size: Tuple[int, int], dpi=None, max_pixels: int = DEFAULT_WORKING_PIXELS) -> Tuple[int, int]:
+    """
+    Size to process an image at: scanned at more than TARGET_DPI it is
+    brought down to TARGET_DPI, and the area never exceeds ``max_pixels``
+    (aspect ratio kept). Never upscales.
+    """
+    width, height = size
+    scale = 1.0
+    if dpi:
+        try:
+            density = max(float(d) for d in dpi)
+        except (TypeError, ValueError):
+            density = 0
+        if density > TARGET_DPI:
+            scale = TARGET_DPI / density
+    scale = min(scale, math.sqrt(max_pixels / max(width * height, 1)))
+    if scale >= 1.0:
+        return width, height
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+def load_grayscale(image_bytes: bytes, timings: Dict[str, float] = None) -> "np.ndarray":
+    """
+    Decode an upload straight to a downscaled 8-bit grayscale array.
+
+    The header is checked against IMAGE_MAX_PIXELS before decoding. JPEGs
+    use draft mode, so the decoder itself scales by 1/2..1/8 and emits
+    luminance only; other formats are converted to "L" by Pillow without
+    an intermediate RGB array. Stage durations (ms) are added to ``timings``.
+    """
+    # Imported here so the limits above stay cheap to import for the API process
+    import numpy as np
+    from PIL import Image
+
+    if timings is None:
+        timings = {}
+
+    start = time.perf_counter()
+    image = Image.open(io.BytesIO(image_bytes))
+    width, height = image.size
+    limit = max_image_pixels()
+    if width * height > limit:
+        raise ImageTooLargeError(
+            f"Image is {width}x{height} ({width * height} pixels), the limit is {limit} pixels"
+        )
+    target = working_size(image.size, image.info.get("dpi"), max_working_pixels())
+    timings["open"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    if image.format == "JPEG":
+        image.draft("L", target)
+    image.load()
+    if image.mode == "P" and "transparency" in image.info:
+        image = image.convert("RGBA")
+    if "A" in image.getbands():
+        # Transparent background should read as paper, not ink
+        page = Image.new("L", image.size, 255)
+        page.paste(image.convert("L"), mask=image.getchannel("A"))
+        image = page
+    elif image.mode != "L":
+        image = image.convert("L")
+    timings["decode"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    if image.size != target:
+        image = image.resize(target, Image.Resampling.BOX, reducing_gap=2.0)
+    gray = np.asarray(image)
+    timings["resize"] = (time.perf_counter() - start) * 1000
+
+    return gray
@@ -1,69 +1,76 @@
 import cv2
 import pytesseract
 import numpy as np
-from PIL import Image
-import io
-from typing import Dict, List
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
 import re
 
+from services.image_preprocess import ImageTooLargeError, load_grayscale
+from services.node_types import classify_ocr_text
+
+# Closed shapes smaller than this (pixels, or fraction of the page) are
+# letter holes or noise; larger than MAX_REGION_FRACTION is the page frame.
+MIN_REGION_AREA = 400
+MIN_REGION_FRACTION = 0.0005
+MAX_REGION_FRACTION = 0.6
+DEFAULT_OCR_THREADS = 4
+
 def process_image_to_flowchart(image_bytes: bytes) -> Dict:
     """
     Process uploaded image to extract flowchart structure using OCR.
+
+    Closed shapes (box interiors) are found from the thresholded image and
+    classified by geometry; tesseract then runs only on each cropped box, in
+    parallel, and edges come from the connectors drawn between boxes.
+    Images without detectable boxes fall back to a whole-page pass.
+
+    The upload is decoded at a reduced working size (see
+    services.image_preprocess) and per-stage timings in milliseconds are
+    returned under "timings" (absent from the fallback chart). Raises
+    ImageTooLargeError for images over the pixel limit.
     """
+    timings = {}
     try:
-        # Convert bytes to image
-        image = Image.open(io.BytesIO(image_bytes))
-        img_array = np.array(image)
-        
-        # Convert to grayscale
-        if len(img_array.shape) == 3:
-            gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-        else:
-            gray = img_array
+        # Decode straight to a downscaled grayscale array
+        gray = load_grayscale(image_bytes, timings)
         
-        # Apply thresholding
-        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        # Apply thresholding (ink becomes foreground)
+        start = time.perf_counter()
+        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        timings["threshold"] = (time.perf_counter() - start) * 1000
         
         # Detect contours (potential flowchart boxes)
-        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        # Extract text from entire image
-        text = pytesseract.image_to_string(image)
-        
-        # Parse extracted text into nodes
-        nodes = []
-        edges = []
-        node_id = 1
-        
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
-        
-        # Filter out noise and short fragments
-        lines = [line for line in lines if len(line) > 2]
-        
-        last_node_id = None
+        start = time.perf_counter()
+        regions = detect_shape_regions(thresh)
+        timings["regions"] = (time.perf_counter() - start) * 1000
         
-        for line in lines:
-            # Clean up OCR artifacts
-            line = re.sub(r'[^\w\s\-\?\.]', '', line)
+        if regions:
+            start = time.perf_counter()
+            texts = ocr_regions(gray, regions)
+            timings["ocr"] = (time.perf_counter() - start) * 1000
+            nodes = []
+            for i, (region, text) in enumerate(zip(regions, texts)):
+                nodes.append({
+                    "id": str(i + 1),
+                    "text": text or region["shape"].capitalize(),
+                    "type": node_type_for_region(region["shape"], text)
+                })
             
-            if not line:
-                continue
-            
-            # Determine node type
-            node_type = get_node_type_from_text(line)
-            
-            nodes.append({
-                "id": str(node_id),
-                "text": line,
-                "type": node_type
-            })
-            
-            # Create sequential edges
-            if last_node_id:
-                edges.append([last_node_id, str(node_id)])
-            
-            last_node_id = str(node_id)
-            node_id += 1
+            # Real edges from the connectors between boxes
+            start = time.perf_counter()
+            edges = [[str(u + 1), str(v + 1)] for u, v in detect_connectors(thresh, regions)]
+            timings["connectors"] = (time.perf_counter() - start) * 1000
+            if not edges:
+                # No usable connectors: chain the boxes in reading order
+                edges = [[str(i), str(i + 1)] for i in range(1, len(nodes))]
+        else:
+            # Extract text from entire image
+            start = time.perf_counter()
+            text = pytesseract.image_to_string(gray)
+            timings["ocr"] = (time.perf_counter() - start) * 1000
+            nodes, edges = text_lines_to_flowchart(text)
         
         # Ensure we have at least start and end
         if not nodes:
@@ -79,9 +86,12 @@ def process_image_to_flowchart(image_bytes: bytes) -> Dict:
         
         return {
             "nodes": nodes,
-            "edges": edges
+            "edges": edges,
+            "timings": {stage: round(ms, 2) for stage, ms in timings.items()}
         }
         
+    except ImageTooLargeError:
+        raise
     except Exception as e:
         print(f"Image processing error: {e}")
         # Return basic fallback structure
@@ -94,17 +104,296 @@ def process_image_to_flowchart(image_bytes: bytes) -> Dict:
             "edges": [["1", "2"], ["2", "3"]]
         }
 
-def get_node_type_from_text(text: str) -> str:
-    """Determine node type from OCR text."""
-    text_lower = text.lower()
+def text_lines_to_flowchart(text: str) -> Tuple[List[Dict], List[List[str]]]:
+    """Turn whole-page OCR text into one node per line, chained in order."""
+    nodes = []
+    edges = []
+    node_id = 1
+    
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    
+    # Filter out noise and short fragments
+    lines = [line for line in lines if len(line) > 2]
+    
+    last_node_id = None
+    
+    for line in lines:
+        # Clean up OCR artifacts
+        line = clean_ocr_text(line)
+        
+        if not line:
+            continue
+        
+        # Determine node type
+        node_type = get_node_type_from_text(line)
+        
+        nodes.append({
+            "id": str(node_id),
+            "text": line,
+            "type": node_type
+        })
+        
+        # Create sequential edges
+        if last_node_id:
+            edges.append([last_node_id, str(node_id)])
+        
+        last_node_id = str(node_id)
+        node_id += 1
+    
+    return nodes, edges
+
+def clean_ocr_text(text: str) -> str:
+    """Strip OCR artifacts and join wrapped lines."""
+    text = re.sub(r'[^\w\s\-\?\.]', '', text)
+    return ' '.join(text.split())
+
+def detect_shape_regions(binary: np.ndarray) -> List[Dict]:
+    """
+    Find flowchart boxes as the interiors (holes) of closed ink outlines.
+
+    Connectors touch the box outlines, so outer contours merge whole
+    diagrams; the hole inside each outline stays one clean contour per box.
+    Returns regions sorted in reading order, each with its contour, bounding
+    box (x, y, w, h) and shape.
+    """
+    contours, hierarchy = cv2.findContours(binary, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE)
+    if hierarchy is None:
+        return []
+    
+    page_area = binary.shape[0] * binary.shape[1]
+    min_area = max(MIN_REGION_AREA, MIN_REGION_FRACTION * page_area)
+    max_area = MAX_REGION_FRACTION * page_area
+    
+    regions = []
+    for contour, (_, _, _, parent) in zip(contours, hierarchy[0]):
+        # Holes are the contours that have a parent outline
+        if parent < 0:
+            continue
+        area = cv2.contourArea(contour)
+        if area < min_area or area > max_area:
+            continue
+        x, y, w, h = cv2.boundingRect(contour)
+        regions.append({
+            "contour": contour,
+            "bbox": (x, y, w, h),
+            "area": area,
+            "shape": classify_shape(contour, area)
+        })
+    
+    if regions:
+        regions = _drop_connector_loops(binary, regions)
+        
+        # Reading order: rows (tolerance of half a typical box height), then x
+        row_height = max(1, int(np.median([r["bbox"][3] for r in regions]) // 2))
+        regions.sort(key=lambda r: ((r["bbox"][1] + r["bbox"][3] // 2) // row_height, r["bbox"][0]))
+    
+    return regions
+
+def _drop_connector_loops(binary: np.ndarray, regions: List[Dict]) -> List[Dict]:
+    """
+    Connectors routed around boxes enclose areas that look like box holes
+    too. Such a loop is bounded by the outlines of several boxes, while a
+    real box touches no other region, so regions touching two or more
+    others (through a band around their contour, or by enclosing them) are
+    dropped, most-connected first.
+    """
+    if len(regions) < 3:
+        return regions
     
-    if any(kw in text_lower for kw in ['start', 'begin']):
-        return 'start'
-    elif any(kw in text_lower for kw in ['end', 'finish', 'stop']):
-        return 'end'
-    elif '?' in text or any(kw in text_lower for kw in ['if', 'check', 'decision']):
+    band = 2 * (estimate_stroke_width(binary) + 3)
+    height, width = binary.shape
+    
+    # Interior labels; smaller regions drawn last so nested ones stay visible
+    interiors = np.zeros(binary.shape, dtype=np.int32)
+    for i in sorted(range(len(regions)), key=lambda i: -regions[i]["area"]):
+        cv2.drawContours(interiors, [regions[i]["contour"]], -1, i + 1, thickness=cv2.FILLED)
+    
+    neighbours = []
+    for i, region in enumerate(regions):
+        x, y, w, h = region["bbox"]
+        x0, y0 = max(0, x - band), max(0, y - band)
+        x1, y1 = min(width, x + w + band), min(height, y + h + band)
+        mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+        cv2.drawContours(mask, [region["contour"] - [x0, y0]], -1, 255, thickness=band)
+        # Everything labelled inside the region's bounding box other than
+        # itself is either touched or enclosed
+        window = interiors[y0:y1, x0:x1]
+        touched = set(np.unique(window[mask > 0]).tolist())
+        enclosed = set(np.unique(interiors[y:y + h, x:x + w]).tolist())
+        inside = {
+            j + 1 for j in (label - 1 for label in enclosed if label and label != i + 1)
+            if cv2.pointPolygonTest(region["contour"], _bbox_center(regions[j]), False) > 0
+        }
+        neighbours.append((touched | inside) - {0, i + 1})
+    
+    alive = set(range(1, len(regions) + 1))
+    while True:
+        degree = {label: len(neighbours[label - 1] & alive) for label in alive}
+        worst = max(degree, key=degree.get)
+        if degree[worst] < 2:
+            break
+        alive.remove(worst)
+    
+    return [region for i, region in enumerate(regions) if i + 1 in alive]
+
+def _bbox_center(region: Dict) -> Tuple[float, float]:
+    x, y, w, h = region["bbox"]
+    return (x + w / 2.0, y + h / 2.0)
+
+def classify_shape(contour: np.ndarray, area: float = None) -> str:
+    """
+    Classify a box contour as 'diamond', 'rectangle', 'parallelogram' or
+    'rounded' from its polygon approximation and how much of its bounding
+    box it fills.
+    """
+    if area is None:
+        area = cv2.contourArea(contour)
+    _, _, w, h = cv2.boundingRect(contour)
+    fill = area / float(max(1, w * h))
+    approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+    
+    if len(approx) == 4:
+        if fill < 0.65:
+            return 'diamond'
+        if fill < 0.9:
+            return 'parallelogram'
+        return 'rectangle'
+    if len(approx) < 4:
+        return 'diamond' if fill < 0.65 else 'rectangle'
+    return 'rounded'
+
+def estimate_stroke_width(binary: np.ndarray) -> int:
+    """
+    Typical ink stroke width, from the distance transform of the ink sampled
+    on its ridges (local maxima), where it is half the stroke width.
+    """
+    dist = cv2.distanceTransform(binary, cv2.DIST_L2, 3)
+    ridge = dist[(dist > 0) & (dist >= cv2.dilate(dist, np.ones((3, 3), dtype=np.uint8)))]
+    if not ridge.size:
+        return 1
+    return max(1, int(round(2 * float(np.median(ridge)))))
+
+def detect_connectors(binary: np.ndarray, regions: List[Dict]) -> List[Tuple[int, int]]:
+    """
+    Recover directed edges (pairs of region indices) from the connectors.
+
+    Boxes (outline and contents) are erased from the ink; each remaining
+    connected component is a connector. The boxes it touches are found
+    through a thin band painted around every box. Arrowheads are what
+    survives a morphological opening wider than the stroke (a filled
+    triangle template): boxes touched by a head are targets, the others
+    sources. Connectors without a detectable head link their boxes in
+    reading order. All pixel passes are whole-image OpenCV/NumPy operations.
+    """
+    if len(regions) < 2:
+        return []
+    
+    stroke = estimate_stroke_width(binary)
+    body_pad = stroke + 2
+    ring_pad = body_pad + 2 * stroke + 4
+    
+    # Box bodies (interior + outline) and a contact band just outside them,
+    # both labelled with region index + 1
+    body = np.zeros(binary.shape, dtype=np.int32)
+    ring = np.zeros(binary.shape, dtype=np.int32)
+    for i, region in enumerate(regions):
+        contour = [region["contour"]]
+        cv2.drawContours(ring, contour, -1, i + 1, thickness=2 * ring_pad)
+        cv2.drawContours(body, contour, -1, i + 1, thickness=cv2.FILLED)
+        cv2.drawContours(body, contour, -1, i + 1, thickness=2 * body_pad)
+    ring[body > 0] = 0
+    
+    connectors = binary.copy()
+    connectors[body > 0] = 0
+    num_components, components = cv2.connectedComponents(connectors, connectivity=8)
+    if num_components <= 1:
+        return []
+    
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * stroke + 1, 2 * stroke + 1))
+    heads = cv2.morphologyEx(connectors, cv2.MORPH_OPEN, kernel)
+    
+    num_boxes = len(regions) + 1
+    touched = _component_box_pairs(components, ring, (connectors > 0) & (ring > 0), num_boxes)
+    headed = _component_box_pairs(components, ring, (heads > 0) & (ring > 0), num_boxes)
+    
+    edges = []
+    seen = set()
+    for component, boxes in touched.items():
+        if len(boxes) < 2:
+            continue
+        targets = headed.get(component, set()) & boxes
+        sources = boxes - targets
+        if targets and sources:
+            pairs = [(u, v) for u in sorted(sources) for v in sorted(targets)]
+        else:
+            ordered = sorted(boxes)
+            pairs = list(zip(ordered, ordered[1:]))
+        for u, v in pairs:
+            if (u, v) not in seen:
+                seen.add((u, v))
+                edges.append((u - 1, v - 1))
+    
+    edges.sort()
+    return edges
+
+def _component_box_pairs(components: np.ndarray, ring: np.ndarray, where: np.ndarray, num_boxes: int) -> Dict[int, set]:
+    """Map each connector component to the set of box labels it touches within ``where``."""
+    keys = np.unique(components[where].astype(np.int64) * num_boxes + ring[where])
+    pairs = {}
+    for component, box in zip((keys // num_boxes).tolist(), (keys % num_boxes).tolist()):
+        if component:
+            pairs.setdefault(component, set()).add(box)
+    return pairs
+
+def node_type_for_region(shape: str, text: str) -> str:
+    """Combine box geometry with the OCR text to pick a node type."""
+    text_type = get_node_type_from_text(text) if text else 'process'
+    if shape == 'diamond':
         return 'decision'
-    elif any(kw in text_lower for kw in ['input', 'output', 'read', 'write', 'print']):
+    if shape == 'parallelogram':
         return 'io'
-    else:
-        return 'process'
+    if shape == 'rounded':
+        return text_type if text_type in ('start', 'end') else 'start'
+    return text_type
+
+def ocr_regions(gray: np.ndarray, regions: List[Dict]) -> List[str]:
+    """
+    OCR each region's crop (outside of the shape masked to white) on a
+    thread pool; every tesseract call is its own subprocess, so threads run
+    them in parallel.
+    """
+    crops = [_region_crop(gray, region) for region in regions]
+    workers = min(len(crops), int(os.getenv("OCR_THREADS", DEFAULT_OCR_THREADS))) or 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        texts = list(executor.map(_ocr_crop, crops))
+    return texts
+
+def _region_crop(gray: np.ndarray, region: Dict) -> np.ndarray:
+    x, y, w, h = region["bbox"]
+    crop = gray[y:y + h, x:x + w].copy()
+    
+    # Keep only the shape interior, shrunk a little to drop the outline
+    mask = np.zeros((h, w), dtype=np.uint8)
+    cv2.drawContours(mask, [region["contour"] - [x, y]], -1, 255, thickness=cv2.FILLED)
+    mask = cv2.erode(mask, np.ones((5, 5), dtype=np.uint8))
+    crop[mask == 0] = 255
+    
+    # Tesseract works best with a white border around the text
+    return cv2.copyMakeBorder(crop, 10, 10, 10, 10, cv2.BORDER_CONSTANT, value=255)
+
+def _ocr_crop(crop: np.ndarray) -> str:
+    return clean_ocr_text(pytesseract.image_to_string(crop, config='--psm 6'))
+
+def warm_tesseract() -> str:
+    """
+    Run tesseract once on a blank crop, so its binary and language data are
+    loaded (and in the page cache) before the first upload. Returns the
+    tesseract version; raises when tesseract is missing.
+    """
+    version = str(pytesseract.get_tesseract_version())
+    _ocr_crop(np.full((32, 96), 255, dtype=np.uint8))
+    return version
+
+def get_node_type_from_text(text: str) -> str:
+    """Determine node type from OCR text."""
+    return classify_ocr_text(text)
@@ -0,0 +1,231 @@
+import heapq
+import itertools
+from collections import deque
+from typing import Dict, List, Optional
+
+from services.graph import CompactGraph
+from services.layout_engine import compute_levels, level_position
+from services.metrics import instrumented
+
+@instrumented("incremental_layout")
+def apply_incremental_layout(flowchart_data: Dict, diff: Dict, orientation: str = 'horizontal') -> Dict:
+    """
+    Apply an edit to an already positioned flowchart and only lay out what it touches.
+
+    The chart arrives whole, so reading it into an IncrementalLayout is
+    O(N + E); the edit itself costs what IncrementalLayout.apply costs.
+    Levels are taken from each node's ``level`` (set by apply_auto_layout
+    and by this function), so nodes can be dragged freely; nodes without
+    one get the level a full layout would give them.
+
+    Args:
+        flowchart_data: Previous chart with positioned nodes and edges
+        diff: Dictionary with optional added_nodes, removed_nodes (ids),
+            added_edges and removed_edges ([from_id, to_id, ...])
+        orientation: 'horizontal' (left-to-right) or 'vertical' (top-to-bottom)
+    """
+    layout = IncrementalLayout(flowchart_data, orientation)
+    moved = layout.apply(diff)
+    return {**layout.chart(), "moved_nodes": moved}
+
+class IncrementalLayout:
+    """
+    A positioned chart kept ready for edits: nodes and adjacency by id,
+    each node's level, and per level the cross-axis coordinates in use.
+
+    ``apply`` touches only the affected set (every added node, every node
+    that gained or lost an incoming edge, and everything downstream of
+    those) plus their edges: affected nodes get a new level from their
+    nearest placed predecessor and are appended after the nodes left on
+    that level; all other nodes keep their coordinates. Editor sessions
+    (services.nested_parser) keep one per document, so an edit never
+    walks the whole chart.
+    """
+
+    def __init__(self, flowchart_data: Dict, orientation: str = 'horizontal'):
+        self.orientation = orientation
+        horizontal = orientation == 'horizontal'
+        self.cross_key = "y" if horizontal else "x"
+        self.cross_step = 200 if horizontal else 250
+
+        # First node with an id wins; edges are grouped by (from, to)
+        self.nodes = {}
+        for node in flowchart_data.get("nodes", []):
+            self.nodes.setdefault(node["id"], node)
+        self.edges = {}
+        self.successors = {}
+        self.predecessors = {}
+        for edge in flowchart_data.get("edges", []):
+            if len(edge) >= 2:
+                self._add_edge(edge)
+
+        if any("level" not in node for node in self.nodes.values() if "position" in node):
+            self._compute_levels(flowchart_data.get("edges", []))
+
+        # Nodes without a position are placed by the first edit
+        self._unplaced = []
+        self._rows = {}
+        self._row_heaps = {}
+        for node_id, node in self.nodes.items():
+            if "position" in node:
+                self._enter_row(node_id, node["level"], node["position"][self.cross_key])
+            else:
+                self._unplaced.append(node_id)
+
+    def _compute_levels(self, edges: List) -> None:
+        """Levels of a full hierarchical layout for the placed nodes that carry none."""
+        graph = CompactGraph.from_flowchart(list(self.nodes.values()), edges, include_dangling=True)
+        for vertex, level in compute_levels(graph, graph.sources()).items():
+            node = self.nodes.get(graph.ids[vertex])
+            if node is not None and "position" in node:
+                node.setdefault("level", level)
+
+    def chart(self) -> Dict:
+        return {
+            "nodes": list(self.nodes.values()),
+            "edges": [edge for group in self.edges.values() for edge in group]
+        }
+
+    def apply(self, diff: Dict) -> List[str]:
+        """Apply a diff (see apply_incremental_layout); returns the ids of the nodes that were placed."""
+        seeds = self._unplaced
+        self._unplaced = []
+        removed_nodes = set(diff.get("removed_nodes") or [])
+
+        for node_id in removed_nodes:
+            node = self.nodes.pop(node_id, None)
+            if node is not None:
+                self._leave_row(node_id, node)
+            for succ in list(self.successors.get(node_id, ())):
+                # Target lost a predecessor, so its level may change
+                self._remove_edges(node_id, succ)
+                seeds.append(succ)
+            for pred in list(self.predecessors.get(node_id, ())):
+                self._remove_edges(pred, node_id)
+
+        for node in diff.get("added_nodes") or []:
+            existing = self.nodes.get(node["id"])
+            if existing is None:
+                self.nodes[node["id"]] = node
+                seeds.append(node["id"])
+            else:
+                # Re-adding an existing id only updates its content
+                existing.update({k: v for k, v in node.items() if k not in ("position", "level")})
+
+        for edge in diff.get("removed_edges") or []:
+            if len(edge) >= 2 and (edge[0], edge[1]) in self.edges:
+                self._remove_edges(edge[0], edge[1])
+                seeds.append(edge[1])
+
+        for edge in diff.get("added_edges") or []:
+            if len(edge) >= 2 and edge[0] not in removed_nodes and edge[1] not in removed_nodes:
+                self._add_edge(edge)
+                seeds.append(edge[1])
+
+        affected = self._downstream(seeds)
+        levels = self._affected_levels(affected)
+        self._place(levels)
+        return list(levels)
+
+    def _add_edge(self, edge: List) -> None:
+        self.edges.setdefault((edge[0], edge[1]), []).append(edge)
+        self.successors.setdefault(edge[0], {})[edge[1]] = None
+        self.predecessors.setdefault(edge[1], {})[edge[0]] = None
+
+    def _remove_edges(self, source: str, target: str) -> None:
+        """Drop every edge from ``source`` to ``target``."""
+        self.edges.pop((source, target), None)
+        for adjacency, key, other in ((self.successors, source, target), (self.predecessors, target, source)):
+            neighbours = adjacency.get(key)
+            if neighbours is not None:
+                neighbours.pop(other, None)
+                if not neighbours:
+                    del adjacency[key]
+
+    def _downstream(self, seeds: List[str]) -> Dict[str, None]:
+        """Seeds plus every node reachable from them, in discovery order."""
+        affected = {}
+        queue = deque()
+        for seed in seeds:
+            if seed in self.nodes and seed not in affected:
+                affected[seed] = None
+                queue.append(seed)
+
+        while queue:
+            node_id = queue.popleft()
+            for succ in self.successors.get(node_id, ()):
+                if succ not in affected and succ in self.nodes:
+                    affected[succ] = None
+                    queue.append(succ)
+
+        return affected
+
+    def _affected_levels(self, affected: Dict[str, None]) -> Dict[str, int]:
+        """
+        Shortest-distance levels for the affected nodes, anchored on the levels of
+        their fixed predecessors. Costs O(k log k) in the size of the affected set.
+        """
+        nodes = self.nodes
+        levels = {}
+        heap = []
+        tiebreak = itertools.count()
+        for node_id in affected:
+            preds = [p for p in self.predecessors.get(node_id, ()) if p in nodes]
+            if not preds:
+                start = 0
+            else:
+                fixed = [nodes[p]["level"] + 1 for p in preds if p not in affected]
+                if not fixed:
+                    continue
+                start = min(fixed)
+            heapq.heappush(heap, (start, next(tiebreak), node_id))
+
+        while heap:
+            level, _, node_id = heapq.heappop(heap)
+            if node_id in levels:
+                continue
+            levels[node_id] = level
+            for succ in self.successors.get(node_id, ()):
+                if succ in affected and succ not in levels:
+                    heapq.heappush(heap, (level + 1, next(tiebreak), succ))
+
+        # Affected cycles with no placed entry point start a new root level
+        for node_id in affected:
+            levels.setdefault(node_id, 0)
+
+        return levels
+
+    def _place(self, levels: Dict[str, int]) -> None:
+        """Append each affected node after the fixed nodes left on its level."""
+        for node_id in levels:
+            self._leave_row(node_id, self.nodes[node_id])
+
+        cross_key = self.cross_key
+        for node_id, level in sorted(levels.items(), key=lambda item: item[1]):
+            position = level_position(self.orientation, level, 0, 1)
+            end = self._row_end(level)
+            if end is not None:
+                position[cross_key] = end + self.cross_step
+            node = self.nodes[node_id]
+            node["position"] = position
+            node["level"] = level
+            self._enter_row(node_id, level, position[cross_key])
+
+    # Each level's row maps node id -> cross-axis coordinate, with a max-heap
+    # of the coordinates whose stale entries are dropped when they surface
+    def _enter_row(self, node_id: str, level: int, cross: float) -> None:
+        self._rows.setdefault(level, {})[node_id] = cross
+        heapq.heappush(self._row_heaps.setdefault(level, []), (-cross, node_id))
+
+    def _leave_row(self, node_id: str, node: Dict) -> None:
+        row = self._rows.get(node.get("level"))
+        if row is not None:
+            row.pop(node_id, None)
+
+    def _row_end(self, level: int) -> Optional[float]:
+        """Furthest cross-axis coordinate in use on a level (None when it is empty)."""
+        row = self._rows.get(level)
+        heap = self._row_heaps.get(level)
+        while heap and row.get(heap[0][1]) != -heap[0][0]:
+            heapq.heappop(heap)
+        return -heap[0][0] if heap else None
@@ -1,106 +1,81 @@
-import networkx as nx
+from array import array
+from collections import deque
 from typing import Dict, List
 
-def apply_auto_layout(flowchart_data: Dict, orientation: str = 'horizontal') -> Dict:
+from services.graph import CompactGraph
+from services.metrics import count_error, instrumented, observe_size
+
+ORIENTATIONS = ('horizontal', 'vertical')
+LAYOUTS = ('hierarchical', 'layered')
+
+@instrumented("layout")
+def apply_auto_layout(flowchart_data: Dict, orientation: str = 'horizontal', layout: str = 'hierarchical') -> Dict:
     """
     Apply automatic layout to flowchart nodes using hierarchical positioning.
-    
+
+    Runs in O(N + E): node ids are interned into a CompactGraph once, levels
+    come from a single BFS that never re-expands a visited node, and
+    positions are written through the id index instead of searching the
+    node list. Disconnected parts of the chart are laid out side by side
+    (across the flow direction) rather than overlapping.
+
     Args:
         flowchart_data: Dictionary containing nodes and edges
         orientation: 'horizontal' (left-to-right) or 'vertical' (top-to-bottom)
+        layout: 'hierarchical' (BFS levels) or 'layered' (Sugiyama-style with
+            crossing reduction, see services.layered_layout)
     """
     nodes = flowchart_data.get("nodes", [])
     edges = flowchart_data.get("edges", [])
-    
+
     if not nodes:
         return flowchart_data
-    
-    # Create directed graph
-    G = nx.DiGraph()
-    
-    # Add nodes
-    for node in nodes:
-        G.add_node(node["id"])
-    
-    # Add edges
-    for edge in edges:
-        if len(edge) >= 2:
-            G.add_edge(edge[0], edge[1])
-    
-    # Try to use hierarchical layout
+    observe_size("nodes", len(nodes))
+    observe_size("edges", len(edges))
+
+    if layout == 'layered':
+        # Imported here: it loads numpy, which hierarchical layouts never need
+        from services.layered_layout import apply_layered_layout
+        try:
+            return apply_layered_layout(flowchart_data, orientation)
+        except Exception as e:
+            print(f"Layered layout error: {e}")
+            count_error("layout")
+
     try:
-        # Find root nodes (nodes with no incoming edges)
-        root_nodes = [n for n in G.nodes() if G.in_degree(n) == 0]
-        if not root_nodes:
-            root_nodes = [nodes[0]["id"]]
-        
-        # Calculate levels using BFS
-        levels = {}
-        visited = set()
-        current_level = root_nodes
-        level = 0
-        
-        while current_level:
-            next_level = []
-            for node in current_level:
-                if node not in visited:
-                    levels[node] = level
-                    visited.add(node)
-                    next_level.extend(G.successors(node))
-            current_level = next_level
-            level += 1
-        
-        # Assign positions based on levels and orientation
-        level_counts = {}
-        for node_id, node_level in levels.items():
-            if node_level not in level_counts:
-                level_counts[node_level] = 0
-            level_counts[node_level] += 1
-        
-        level_positions = {}
-        for node_id, node_level in levels.items():
-            if node_level not in level_positions:
-                level_positions[node_level] = 0
-            
-            total_at_level = level_counts[node_level]
-            position_at_level = level_positions[node_level]
-            
-            if orientation == 'horizontal':
-                # HORIZONTAL LAYOUT (Left to Right)
-                # X increases with level, Y for multiple nodes at same level
-                x = 150 + node_level * 300
-                
-                if total_at_level == 1:
-                    y = 250  # Center single nodes
-                else:
-                    # Distribute multiple nodes vertically
-                    y = 150 + (position_at_level * 200)
-            else:
-                # VERTICAL LAYOUT (Top to Bottom)
-                # Y increases with level, X for multiple nodes at same level
-                y = 100 + node_level * 150
-                
-                if total_at_level == 1:
-                    x = 400  # Center single nodes
-                else:
-                    # Distribute multiple nodes horizontally
-                    x = 200 + (position_at_level * 250)
-            
-            # Update node with position
-            for node in nodes:
-                if node["id"] == node_id:
-                    node["position"] = {"x": x, "y": y}
-                    break
-            
-            level_positions[node_level] += 1
-        
-        # Handle nodes not in levels (disconnected)
+        # Edges to unknown ids still take part in levelling, as they always have
+        graph = CompactGraph.from_flowchart(nodes, edges, include_dangling=True)
+
+        # Levels start at the sources; compute_levels also reaches loops
+        # that nothing enters. Each connected component gets its own band.
+        levels = compute_levels(graph, graph.sources())
+        component = None
+        # Everything levelled from a single root is one component
+        if list(levels.values()).count(0) > 1:
+            component, num_components = graph.components()
+            if num_components == 1:
+                component = None
+        positions = assign_level_positions(levels, orientation, component)
+
+        # Update nodes with positions (first node with an id wins)
+        node_index = {}
+        for node in nodes:
+            node_index.setdefault(node["id"], node)
+        for vertex, position in positions.items():
+            node = node_index.get(graph.ids[vertex])
+            if node is not None:
+                node["position"] = position
+                # Kept with the node so incremental edits need not infer it
+                node["level"] = levels[vertex]
+
+        # Repeated ids are not part of the graph (normalize_flowchart renames them)
         for node in nodes:
             if "position" not in node:
                 node["position"] = {"x": 250, "y": 100}
-    
+
     except Exception as e:
         print(f"Layout error: {e}")
+        count_error("layout")
         # Fallback to simple layout based on orientation
         for i, node in enumerate(nodes):
             if orientation == 'horizontal':
@@ -113,8 +88,116 @@ def apply_auto_layout(flowchart_data: Dict, orientation: str = 'horizontal') ->
                     "x": 400,
                     "y": 100 + i * 150
                 }
-    
+
     return {
         "nodes": nodes,
         "edges": edges
     }
+
+def compute_levels(graph: CompactGraph, root_nodes: List[int]) -> Dict[int, int]:
+    """
+    Assign a BFS level to every vertex: first everything reachable from the
+    roots, then each vertex still unvisited (in interning order, e.g. a loop
+    that no root enters) starts a BFS of its own at level 0.
+
+    Vertices are marked as visited when they are enqueued, so each vertex and
+    each edge is looked at once. The returned dict is ordered by visit order,
+    which decides a node's slot within its level.
+    """
+    levels = {}
+    offsets = graph.succ_offsets
+    targets = graph.succ_targets
+
+    def visit(roots):
+        queue = deque()
+        for root in roots:
+            if root not in levels:
+                levels[root] = 0
+                queue.append(root)
+        while queue:
+            vertex = queue.popleft()
+            next_level = levels[vertex] + 1
+            for i in range(offsets[vertex], offsets[vertex + 1]):
+                succ = targets[i]
+                if succ not in levels:
+                    levels[succ] = next_level
+                    queue.append(succ)
+
+    visit(root_nodes)
+    if len(levels) < graph.num_nodes:
+        for vertex in range(graph.num_nodes):
+            if vertex not in levels:
+                visit((vertex,))
+
+    return levels
+
+def level_position(orientation: str, level: int, slot: int, total_at_level: int) -> Dict:
+    """Return the canvas position of the slot-th node out of total_at_level on a level."""
+    if orientation == 'horizontal':
+        # HORIZONTAL LAYOUT (Left to Right)
+        # X increases with level, Y for multiple nodes at same level
+        x = 150 + level * 300
+
+        if total_at_level == 1:
+            y = 250  # Center single nodes
+        else:
+            # Distribute multiple nodes vertically
+            y = 150 + (slot * 200)
+    else:
+        # VERTICAL LAYOUT (Top to Bottom)
+        # Y increases with level, X for multiple nodes at same level
+        y = 100 + level * 150
+
+        if total_at_level == 1:
+            x = 400  # Center single nodes
+        else:
+            # Distribute multiple nodes horizontally
+            x = 200 + (slot * 250)
+
+    return {"x": x, "y": y}
+
+def assign_level_positions(levels: Dict, orientation: str, component: array = None) -> Dict:
+    """
+    Place nodes on their levels in the order they appear in ``levels``.
+
+    With ``component`` labels (see CompactGraph.components) every component
+    is laid out on its own and the components sit next to each other across
+    the flow direction, one empty slot apart, in label order. Component 0
+    keeps the positions it would have alone.
+    """
+    if component is None:
+        keys = levels
+    else:
+        keys = {vertex: (component[vertex], node_level) for vertex, node_level in levels.items()}
+
+    level_counts = {}
+    for key in keys.values():
+        level_counts[key] = level_counts.get(key, 0) + 1
+
+    offsets = None
+    if component is not None:
+        # Band of each component across the flow: its widest level plus a gap,
+        # in the slot spacing of level_position
+        widest = {}
+        for (label, _), count in level_counts.items():
+            widest[label] = max(widest.get(label, 0), count)
+        step = 200 if orientation == 'horizontal' else 250
+        axis = "y" if orientation == 'horizontal' else "x"
+        offsets = {}
+        offset = 0
+        for label in sorted(widest):
+            offsets[label] = offset
+            offset += (widest[label] + 1) * step
+
+    level_slots = {}
+    positions = {}
+    for vertex, node_level in levels.items():
+        key = keys[vertex]
+        slot = level_slots.get(key, 0)
+        position = level_position(orientation, node_level, slot, level_counts[key])
+        if offsets is not None:
+            position[axis] += offsets[key[0]]
+        positions[vertex] = position
+        level_slots[key] = slot + 1
+
+    return positions
@@ -0,0 +1,332 @@
+import functools
+import glob
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import orjson
+
+# Prometheus histograms of pipeline stage latency (parse, llm, image_*,
+# layout, export_*) and payload sizes, kept per process and rendered by
+# GET /metrics. Recording is a bisect and two adds, cheap enough to stay on
+# in production (see benchmarks/bench_metrics.py).
+# METRICS_ENABLED=0 turns recording off; SERVER_TIMING=1 also reports each
+# request's stages in a Server-Timing response header. With several web
+# workers, METRICS_DIR (set up by main.py) holds each worker's snapshot,
+# written at most every METRICS_FLUSH_SECONDS, and /metrics on any worker
+# reports the sum of all of them.
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+COUNT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 10000, 50000)
+BYTE_BUCKETS = tuple(1024 * 4 ** i for i in range(11))  # 1 KB .. 1 GB
+SIZE_BUCKETS = {
+    "nodes": COUNT_BUCKETS,
+    "edges": COUNT_BUCKETS,
+    "image_bytes": BYTE_BUCKETS,
+    "export_bytes": BYTE_BUCKETS,
+}
+METRICS_FLUSH_SECONDS = 1.0
+
+class Histogram:
+    """
+    Fixed-bucket histogram; counts are per bucket and made cumulative on
+    render. Observations take no lock: a lock costs more than the rest of
+    observe(), and the worst a thread switch between the read and write of
+    an add can do is drop one observation from a monitoring counter.
+    """
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        return list(self.counts), self.sum
+
+    def add(self, counts: List[int], total: float) -> None:
+        """Add another process's snapshot of a histogram with the same bounds."""
+        if len(counts) == len(self.counts):
+            self.counts = [a + b for a, b in zip(self.counts, counts)]
+            self.sum += total
+
+class Metrics:
+    """
+    Per-process registry: stage latencies, payload sizes, request latencies
+    and error counts. Given a ``directory`` shared by the web workers, it
+    writes its snapshot there after requests (at most every
+    METRICS_FLUSH_SECONDS) and renders the sum over every snapshot in it.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.stages: Dict[str, Histogram] = {}
+        self.sizes: Dict[str, Histogram] = {}
+        self.requests: Dict[str, Histogram] = {}
+        self.errors: Dict[str, int] = {}
+        self.directory = directory
+        self._flushed = 0.0
+        self._flush_timer = None
+        self._lock = threading.Lock()
+
+    def _create(self, family: Dict[str, Histogram], name: str, bounds: Tuple[float, ...]) -> Histogram:
+        with self._lock:
+            return family.setdefault(name, Histogram(bounds))
+
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        histogram = self.stages.get(stage) or self._create(self.stages, stage, LATENCY_BUCKETS)
+        histogram.observe(seconds)
+
+    def observe_size(self, kind: str, value: float) -> None:
+        histogram = self.sizes.get(kind) or self._create(self.sizes, kind, SIZE_BUCKETS.get(kind, COUNT_BUCKETS))
+        histogram.observe(value)
+
+    def observe_request(self, endpoint: str, seconds: float) -> None:
+        histogram = self.requests.get(endpoint) or self._create(self.requests, endpoint, LATENCY_BUCKETS)
+        histogram.observe(seconds)
+        if self.directory is not None:
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        """Flush now, or once the interval is up, so a worker that goes idle is never left stale."""
+        wait = METRICS_FLUSH_SECONDS - (time.monotonic() - self._flushed)
+        if wait <= 0:
+            self.flush()
+        elif self._flush_timer is None:
+            self._flush_timer = threading.Timer(wait, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def count_error(self, stage: str) -> None:
+        with self._lock:
+            self.errors[stage] = self.errors.get(stage, 0) + 1
+
+    def snapshot(self) -> Dict:
+        return {
+            "stages": {name: h.snapshot() for name, h in list(self.stages.items())},
+            "sizes": {name: h.snapshot() for name, h in list(self.sizes.items())},
+            "requests": {name: h.snapshot() for name, h in list(self.requests.items())},
+            "errors": dict(self.errors)
+        }
+
+    def flush(self) -> None:
+        """Write this process's snapshot to the shared directory (replacing the last one)."""
+        self._flushed = time.monotonic()
+        self._flush_timer = None
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        try:
+            with open(path + ".tmp", "wb") as f:
+                f.write(orjson.dumps(self.snapshot()))
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"⚠️ Could not write metrics snapshot to {path}: {e}")
+
+    def _merged(self):
+        """(stages, sizes, requests, errors) summed over every worker's snapshot in the directory."""
+        self.flush()
+        stages, sizes, requests, errors = {}, {}, {}, {}
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            try:
+                with open(path, "rb") as f:
+                    snapshot = orjson.loads(f.read())
+            except (OSError, orjson.JSONDecodeError):
+                continue
+            for family, merged in (("stages", stages), ("sizes", sizes), ("requests", requests)):
+                for name, (counts, total) in snapshot.get(family, {}).items():
+                    if name not in merged:
+                        bounds = SIZE_BUCKETS.get(name, COUNT_BUCKETS) if family == "sizes" else LATENCY_BUCKETS
+                        merged[name] = Histogram(bounds)
+                    merged[name].add(counts, total)
+            for stage, count in snapshot.get("errors", {}).items():
+                errors[stage] = errors.get(stage, 0) + count
+        return stages, sizes, requests, errors
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        if self.directory is None:
+            stages, sizes, requests, errors = self.stages, self.sizes, self.requests, self.errors
+        else:
+            stages, sizes, requests, errors = self._merged()
+        lines = []
+        _render_family(lines, "flowchart_stage_seconds", "Latency of each pipeline stage.", "stage", stages)
+        _render_family(lines, "flowchart_payload_size", "Nodes, edges and bytes per payload.", "kind", sizes)
+        _render_family(lines, "flowchart_request_seconds", "HTTP request latency by endpoint.", "endpoint",
+                       requests)
+        lines.append("# HELP flowchart_errors_total Errors answered with a fallback; stage http counts 5xx responses.")
+        lines.append("# TYPE flowchart_errors_total counter")
+        for stage, count in sorted(errors.items()):
+            lines.append(f'flowchart_errors_total{{stage="{stage}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+def _render_family(lines: List[str], name: str, help_text: str, label: str, family: Dict[str, Histogram]) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for value, histogram in sorted(family.items()):
+        counts, total = histogram.snapshot()
+        cumulative = 0
+        for bound, count in zip(histogram.bounds, counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{label}="{value}",le="{bound:g}"}} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'{name}_bucket{{{label}="{value}",le="+Inf"}} {cumulative}')
+        lines.append(f'{name}_sum{{{label}="{value}"}} {total}')
+        lines.append(f'{name}_count{{{label}="{value}"}} {cumulative}')
+
+metrics: Optional[Metrics] = None
+_metrics_ready = False
+
+def get_metrics() -> Optional[Metrics]:
+    """Get or create the process metrics registry (None when METRICS_ENABLED=0)."""
+    global metrics, _metrics_ready
+
+    if not _metrics_ready:
+        metrics = Metrics(os.getenv("METRICS_DIR") or None) if os.getenv("METRICS_ENABLED", "1") != "0" else None
+        _metrics_ready = True
+    return metrics
+
+def server_timing_enabled() -> bool:
+    return os.getenv("SERVER_TIMING", "0") == "1"
+
+# Stage durations (ms) of the current request, set by MetricsMiddleware
+# when Server-Timing is on
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Record a stage duration measured elsewhere (e.g. in a worker process)."""
+    registry = get_metrics()
+    if registry is not None:
+        registry.observe_stage(stage, seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds * 1000
+
+def observe_size(kind: str, value: float) -> None:
+    registry = get_metrics()
+    if registry is not None:
+        registry.observe_size(kind, value)
+
+def count_error(stage: str) -> None:
+    registry = get_metrics()
+    if registry is not None:
+        registry.count_error(stage)
+
+class _StageTimer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record_stage(self.stage, time.perf_counter() - self.start)
+        return False
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+def timed(stage: str):
+    """Context manager recording the duration of ``stage``."""
+    if get_metrics() is None and _request_timings.get() is None:
+        return _NULL_TIMER
+    return _StageTimer(stage)
+
+def instrumented(stage: str) -> Callable:
+    """Decorator: time every call of the function as ``stage``."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def timed_chunks(stage: str, chunks: Iterator, size_kind: str = None) -> Iterator:
+    """
+    Pass ``chunks`` through, recording the time spent producing them as one
+    ``stage`` observation (and their total length as ``size_kind``) once the
+    iterator is exhausted. Time the consumer spends between chunks is not
+    counted. An error here is counted, as the response has already started.
+    """
+    elapsed = 0.0
+    total = 0
+    chunks = iter(chunks)
+    while True:
+        start = time.perf_counter()
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            break
+        except Exception:
+            count_error(stage)
+            raise
+        finally:
+            elapsed += time.perf_counter() - start
+        total += len(chunk)
+        yield chunk
+    record_stage(stage, elapsed)
+    if size_kind is not None:
+        observe_size(size_kind, total)
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing each HTTP request by endpoint function, counting
+    5xx responses and, with SERVER_TIMING=1, adding a Server-Timing header
+    listing the stages the request ran before its response started
+    (streamed bodies keep running after).
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.server_timing = server_timing_enabled()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        registry = get_metrics()
+        if registry is None and not self.server_timing:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings = {} if self.server_timing else None
+        token = _request_timings.set(timings)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                if message["status"] >= 500:
+                    count_error("http")
+                if timings is not None:
+                    timings["total"] = (time.perf_counter() - start) * 1000
+                    header = ", ".join(f"{stage};dur={ms:.2f}" for stage, ms in timings.items())
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", header.encode("latin-1")))
+                    message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            if registry is not None:
+                endpoint = scope.get("endpoint")
+                registry.observe_request(getattr(endpoint, "__name__", "unmatched"), time.perf_counter() - start)
@@ -0,0 +1,617 @@
+import os
+import re
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from services.incremental_layout import IncrementalLayout
+from services.layout_engine import apply_auto_layout
+from services.metrics import timed
+from services.node_types import classify_text
+
+# Indentation-aware grammar ("nested" syntax). Lines more indented than a
+# header form its body:
+#
+#   Start
+#   Get order
+#   if in stock:
+#       while items left:
+#           Pack item
+#       Ship order
+#   else if backordered:
+#       Notify customer
+#   else:
+#       Cancel order
+#       goto Get order
+#   repeat:
+#       Send invoice
+#   until paid
+#   End
+#
+# "cond -> action" and "else -> action" from the flat syntax still work,
+# "repeat until cond:" is a repeat block with the condition in the header,
+# and "goto N" / "goto <step text>" jumps to a numbered ("N.") or named step.
+# A step that starts with end/stop/exit/finish ends its path.
+TAB_SIZE = 4
+DEFAULT_MAX_DOCUMENTS = 256
+
+_BULLET = re.compile(r'^[-*•]\s*')
+_NUMBERING = re.compile(r'^(\d+)\.\s*')
+_ELIF = re.compile(r'^(?:else\s+if|elif)\s+(.+?)\s*:?$', re.IGNORECASE)
+_ELSE = re.compile(r'^(?:else|otherwise)\b[\s,:]*(?:->)?\s*(.*)$', re.IGNORECASE)
+_IF = re.compile(r'^(?:if|when)\s+\S', re.IGNORECASE)
+_WHILE = re.compile(r'^while\s+\S', re.IGNORECASE)
+_REPEAT_UNTIL = re.compile(r'^repeat\s+until\s+(.+?)\s*:?$', re.IGNORECASE)
+_REPEAT = re.compile(r'^(?:repeat|do|loop)\s*:?$', re.IGNORECASE)
+_UNTIL = re.compile(r'^until\s+\S', re.IGNORECASE)
+_TERMINAL = re.compile(r'^(?:end|stop|exit|finish)\b', re.IGNORECASE)
+_GOTO = re.compile(r'^(?:go\s*to|jump\s+to)\s+(?:step\s+)?(.+?)\.?$', re.IGNORECASE)
+
+def parse_nested_text(text: Union[str, Iterable[str]]) -> Dict:
+    """Parse a spec in the nested syntax into flowchart nodes and edges."""
+    return NestedDocument(text).chart()
+
+def _tokenize(line: str):
+    """(indent, kind, a, b, number) for one line, or None if it is blank."""
+    expanded = line.expandtabs(TAB_SIZE).rstrip()
+    content = _BULLET.sub('', expanded.lstrip(), count=1)
+    number = None
+    match = _NUMBERING.match(content)
+    if match:
+        number = match.group(1)
+        content = content[match.end():]
+    if not content:
+        return None
+    indent = len(expanded) - len(expanded.lstrip())
+
+    match = _ELIF.match(content)
+    if match:
+        return indent, 'elif', f"If {match.group(1)}", None, number
+    match = _ELSE.match(content)
+    if match:
+        return indent, 'else', match.group(1).strip(), None, number
+    if '->' in content:
+        parts = content.split('->', 2)
+        return indent, 'branch', parts[0].strip(), parts[1].strip(), number
+    if _IF.match(content):
+        return indent, 'if', content.rstrip(':').strip(), None, number
+    if _WHILE.match(content):
+        return indent, 'while', content.rstrip(':').strip(), None, number
+    match = _REPEAT_UNTIL.match(content)
+    if match:
+        return indent, 'repeat', f"Until {match.group(1)}", None, number
+    if _REPEAT.match(content):
+        return indent, 'repeat', None, None, number
+    if _UNTIL.match(content):
+        return indent, 'until', content.rstrip(':').strip(), None, number
+    match = _GOTO.match(content)
+    if match:
+        return indent, 'goto', _reference_key(match.group(1)), None, number
+    return indent, 'step', content, None, number
+
+def _reference_key(reference: str) -> str:
+    reference = reference.strip()
+    return f"#{reference}" if reference.isdigit() else f"t:{reference.lower()}"
+
+def _labels(text: str, number: Optional[str]) -> List[str]:
+    labels = [f"t:{text.lower()}"]
+    if number:
+        labels.append(f"#{number}")
+    return labels
+
+def _skip_blank(records: List, pos: int) -> int:
+    while pos < len(records) and records[pos] is None:
+        pos += 1
+    return pos
+
+def _body(records: List, pos: int, indent: int):
+    """Statements on the lines after a header that are indented deeper than it."""
+    statements = []
+    pos = _skip_blank(records, pos)
+    while pos < len(records) and records[pos][0] > indent:
+        statement, pos = _statement(records, pos)
+        statements.append(statement)
+    return statements, pos
+
+def _statement(records: List, pos: int):
+    """
+    Parse the statement starting at records[pos] (not blank). Returns the
+    statement and the position of the next non-blank line after it.
+    """
+    indent, kind, a, b, number = records[pos]
+    if kind == 'goto':
+        return ('goto', a), _skip_blank(records, pos + 1)
+    if kind in ('step', 'until'):
+        return ('step', a, _labels(a, number)), _skip_blank(records, pos + 1)
+    if kind == 'else':
+        # An else without an if: its action and body are ordinary steps
+        body, pos = _body(records, pos + 1, indent)
+        if a or not body:
+            body = [('step', a or "Else", _labels(a or "Else", number))] + body
+        return ('seq', body), pos
+    if kind == 'while':
+        body, pos = _body(records, pos + 1, indent)
+        return ('while', a, _labels(a, number), body), pos
+    if kind == 'repeat':
+        body, pos = _body(records, pos + 1, indent)
+        until = a
+        if until is None and pos < len(records) and records[pos][0] == indent and records[pos][1] == 'until':
+            until = records[pos][2]
+            pos = _skip_blank(records, pos + 1)
+        if until is None and not body:
+            # Nothing to repeat: keep the line as a step so no statement is empty
+            return ('step', "Repeat", _labels("Repeat", number)), pos
+        labels = _labels(until, number) if until else []
+        return ('repeat', until, labels, body), pos
+
+    # if / elif / "cond -> action": a decision with yes and no branches
+    then, pos = _body(records, pos + 1, indent)
+    if kind == 'branch' and b:
+        then = [('step', b, _labels(b, None))] + then
+    otherwise = None
+    if pos < len(records) and records[pos][0] == indent:
+        follow = records[pos]
+        if follow[1] == 'elif':
+            statement, pos = _statement(records, pos)
+            otherwise = [statement]
+        elif follow[1] == 'else':
+            body, pos = _body(records, pos + 1, indent)
+            otherwise = ([('step', follow[2], _labels(follow[2], None))] if follow[2] else []) + body
+    return ('if', a, _labels(a, number), then, otherwise), pos
+
+class _Fragment:
+    """One compiled top-level statement: its nodes and edges plus how it joins its neighbours."""
+    __slots__ = ('nodes', 'edges', 'gotos', 'entry', 'exits', 'labels', 'position')
+
+    def __init__(self):
+        self.nodes = []
+        self.edges = []
+        self.gotos = []   # (source id, label, reference key), resolved document-wide
+        self.entry = None  # node id, ('ref', key) for a leading goto, or None if empty
+        self.exits = []   # (source id, label) pairs that continue into the next statement
+        self.labels = {}  # reference key -> first node id carrying it
+        self.position = 0  # index in the document's fragment list
+
+    def rename(self, ids: Dict[str, str]) -> None:
+        """Swap node ids everywhere they appear in the fragment."""
+        def new(node_id):
+            return ids.get(node_id, node_id)
+
+        for node in self.nodes:
+            node["id"] = new(node["id"])
+        self.edges = [[new(edge[0]), new(edge[1])] + edge[2:] for edge in self.edges]
+        self.gotos = [(new(source), label, key) for source, label, key in self.gotos]
+        if isinstance(self.entry, str):
+            self.entry = new(self.entry)
+        self.exits = [(new(source), label) for source, label in self.exits]
+        self.labels = {key: new(node_id) for key, node_id in self.labels.items()}
+
+class _Compiler:
+    """
+    Turns statements into fragments. Node ids come from ``reuse`` (text,
+    type) -> ids when the same node existed before, else from ``new_id``.
+    """
+
+    def __init__(self, new_id, reuse: Optional[Dict] = None):
+        self.new_id = new_id
+        self.reuse = reuse or {}
+        self.fragment = None
+
+    def compile(self, statement) -> _Fragment:
+        self.fragment = _Fragment()
+        entry, exits = self._statement(statement)
+        self.fragment.entry = entry
+        self.fragment.exits = exits or []
+        return self.fragment
+
+    def _node(self, text: str, node_type: str, labels: List[str]) -> str:
+        ids = self.reuse.get((text, node_type))
+        node_id = ids.pop() if ids else self.new_id()
+        self.fragment.nodes.append({"id": node_id, "text": text, "type": node_type})
+        for key in labels:
+            self.fragment.labels.setdefault(key, node_id)
+        return node_id
+
+    def _link(self, exits: List[Tuple], entry) -> None:
+        for source, label in exits:
+            if isinstance(entry, tuple):
+                self.fragment.gotos.append((source, label, entry[1]))
+            else:
+                self.fragment.edges.append([source, entry, label] if label else [source, entry])
+
+    def _block(self, statements: List):
+        """(entry, exits) of a statement list; (None, None) when it has no nodes."""
+        entry = None
+        pending = None
+        for statement in statements:
+            statement_entry, exits = self._statement(statement)
+            if statement_entry is None:
+                continue
+            if pending is None:
+                entry = statement_entry
+            else:
+                self._link(pending, statement_entry)
+            pending = exits
+        return entry, pending
+
+    def _branch(self, source: str, label: str, statements: List) -> List[Tuple]:
+        entry, exits = self._block(statements)
+        if entry is None:
+            return [(source, label)]
+        self._link([(source, label)], entry)
+        return exits
+
+    def _statement(self, statement):
+        kind = statement[0]
+        if kind == 'step':
+            _, text, labels = statement
+            node_type = classify_text(text)
+            node_id = self._node(text, node_type, labels)
+            return node_id, ([] if _TERMINAL.match(text) else [(node_id, None)])
+        if kind == 'goto':
+            return ('ref', statement[1]), []
+        if kind == 'seq':
+            return self._block(statement[1])
+        if kind == 'if':
+            _, text, labels, then, otherwise = statement
+            decision = self._node(text, 'decision', labels)
+            exits = self._branch(decision, "yes", then) + self._branch(decision, "no", otherwise or [])
+            return decision, exits
+        if kind == 'while':
+            _, text, labels, body = statement
+            decision = self._node(text, 'decision', labels)
+            self._link(self._branch(decision, "yes", body), decision)
+            return decision, [(decision, "no")]
+
+        # repeat: the body runs first, then the until check loops back on "no"
+        _, until, labels, body = statement
+        entry, exits = self._block(body)
+        if until is None:
+            if entry is not None:
+                self._link(exits, entry)
+            return entry, []
+        decision = self._node(until, 'decision', labels)
+        if entry is None:
+            entry = decision
+        else:
+            self._link(exits, decision)
+        self._link([(decision, "no")], entry)
+        return entry, [(decision, "yes")]
+
+class NestedDocument:
+    """
+    A spec in the nested syntax, kept parsed so edits only re-parse what
+    they touch.
+
+    Each top-level statement compiles to its own fragment. An edit re-parses
+    from the fragment before the changed lines until the parser is back in
+    step with an old fragment boundary after them; everything else is only
+    shifted. Nodes whose text and type survive an edit keep their ids, and
+    ``edit`` returns the change as a layout diff (added/removed nodes and
+    edges) ready for ``IncrementalLayout.apply``. A fresh parse of the
+    edited text gives the same chart, up to node ids.
+    """
+
+    def __init__(self, text: Union[str, Iterable[str]] = ""):
+        self.lines = text.split('\n') if isinstance(text, str) else [line.rstrip('\r\n') for line in text]
+        self.version = 0
+        self._next_id = 1
+        self._records = [_tokenize(line) for line in self.lines]
+        statements, self._starts, _ = self._statements(0)
+        compiler = _Compiler(self._new_id)
+        self._fragments = [compiler.compile(statement) for statement in statements]
+        for position, fragment in enumerate(self._fragments):
+            fragment.position = position
+        self._owners = {}     # reference key -> fragments carrying it, in document order
+        self._jumps = {}      # fragment -> (unresolved jumps, jump edges)
+        self._referrers = {}  # reference key -> fragments jumping to it, as an ordered set
+        self._jump_pairs = Counter()  # (from, to) pairs of jump edges
+        self._index(self._fragments)
+        for index, fragment in enumerate(self._fragments):
+            self._set_jumps(fragment, self._pending(index))
+
+    def _new_id(self) -> str:
+        node_id = str(self._next_id)
+        self._next_id += 1
+        return node_id
+
+    def _statements(self, pos: int, resume_after: Optional[int] = None,
+                    old_starts: Optional[List[int]] = None, delta: int = 0):
+        """
+        Top-level statements from line ``pos`` and the line each starts on.
+        With ``resume_after`` set, stop at the first statement at or after
+        that line which starts where an old fragment did (``old_starts``,
+        shifted by ``delta``) and also return that fragment's index.
+        """
+        records = self._records
+        statements = []
+        starts = []
+        pos = _skip_blank(records, pos)
+        while pos < len(records):
+            if resume_after is not None and pos >= resume_after:
+                old_index = bisect_left(old_starts, pos - delta)
+                if old_index < len(old_starts) and old_starts[old_index] == pos - delta:
+                    return statements, starts, old_index
+            statement, next_pos = _statement(records, pos)
+            statements.append(statement)
+            starts.append(pos)
+            pos = next_pos
+        return statements, starts, None
+
+    def _boundary(self, index: int) -> Tuple[List, List]:
+        """Edges and unresolved jumps from fragment ``index`` into the next one."""
+        edges, gotos = [], []
+        if 0 <= index < len(self._fragments) - 1:
+            entry = self._fragments[index + 1].entry
+            for source, label in self._fragments[index].exits:
+                if isinstance(entry, tuple):
+                    gotos.append((source, label, entry[1]))
+                else:
+                    edges.append([source, entry, label] if label else [source, entry])
+        return edges, gotos
+
+    def _index(self, fragments: List[_Fragment], remove: bool = False) -> None:
+        """Add (or remove) fragments in the reference-key index, owners kept in document order."""
+        for fragment in fragments:
+            for key in fragment.labels:
+                owners = self._owners.setdefault(key, [])
+                if remove:
+                    owners.remove(fragment)
+                    if not owners:
+                        del self._owners[key]
+                else:
+                    owners.insert(bisect_left([owner.position for owner in owners], fragment.position), fragment)
+
+    def _target(self, key: str) -> Optional[str]:
+        """The first step in the document carrying reference ``key``."""
+        owners = self._owners.get(key)
+        return owners[0].labels[key] if owners else None
+
+    def _pending(self, index: int) -> List[Tuple]:
+        """Unresolved jumps out of fragment ``index``, including those into it from the one before."""
+        fragment = self._fragments[index]
+        pending = list(fragment.gotos)
+        if isinstance(fragment.entry, tuple) and index > 0:
+            pending.extend(self._boundary(index - 1)[1])
+        return pending
+
+    def _set_jumps(self, fragment: _Fragment, pending: List[Tuple]) -> List[List]:
+        """Resolve ``pending`` as the jumps of ``fragment``; returns its previous jump edges."""
+        old_pending, old_edges = self._jumps.pop(fragment, ((), []))
+        for key in {key for _, _, key in old_pending}:
+            referrers = self._referrers[key]
+            del referrers[fragment]
+            if not referrers:
+                del self._referrers[key]
+        for edge in old_edges:
+            pair = (edge[0], edge[1])
+            self._jump_pairs[pair] -= 1
+            if not self._jump_pairs[pair]:
+                del self._jump_pairs[pair]
+        if pending:
+            # References to steps that do not exist are dropped
+            targets = {key: self._target(key) for _, _, key in pending}
+            edges = [[source, targets[key], label] if label else [source, targets[key]]
+                     for source, label, key in pending if targets[key] is not None]
+            self._jumps[fragment] = (pending, edges)
+            for key in targets:
+                self._referrers.setdefault(key, {})[fragment] = None
+            self._jump_pairs.update((edge[0], edge[1]) for edge in edges)
+        return old_edges
+
+    def chart(self) -> Dict:
+        """The whole flowchart, nodes in document order."""
+        nodes = [dict(node) for fragment in self._fragments for node in fragment.nodes]
+        return {"nodes": nodes, "edges": [list(edge) for edge in self._edges()]}
+
+    def _edges(self) -> Iterator[List]:
+        for index, fragment in enumerate(self._fragments):
+            yield from fragment.edges
+            yield from self._boundary(index)[0]
+        for fragment in self._fragments:
+            if fragment in self._jumps:
+                yield from self._jumps[fragment][1]
+
+    def edit(self, start: int, end: int, new_lines: List[str]) -> Dict:
+        """
+        Replace lines ``start:end`` with ``new_lines`` and re-parse the
+        statements they touch. Returns the layout diff.
+        """
+        if not 0 <= start <= end <= len(self.lines):
+            raise ValueError(f"Edit range {start}:{end} is outside the document ({len(self.lines)} lines)")
+
+        # The statement before the edit may absorb the new lines (a deeper
+        # indent joins its body, an else joins its if), so start there
+        first = max(0, bisect_right(self._starts, start - 1) - 1)
+        parse_from = min(self._starts[first], start) if self._starts else 0
+        delta = len(new_lines) - (end - start)
+        self.lines[start:end] = new_lines
+        self._records[start:end] = [_tokenize(line) for line in new_lines]
+
+        old_starts = self._starts
+        statements, starts, resume = self._statements(parse_from, start + len(new_lines), old_starts, delta)
+        last = len(self._fragments) if resume is None else resume
+        replaced = self._fragments[first:last]
+        following = self._fragments[last:last + 1]
+        old_owned = self._owned_edges(first, last)
+
+        # Nodes keep their ids (and so their positions) when their text and
+        # type are unchanged; other new nodes take the remaining old ids in
+        # order, so retyping a step updates it in place
+        old_nodes = {node["id"]: node for fragment in replaced for node in fragment.nodes}
+        reuse = {}
+        for node in reversed(list(old_nodes.values())):
+            reuse.setdefault((node["text"], node["type"]), []).append(node["id"])
+        placeholders = []
+
+        def placeholder() -> str:
+            placeholders.append(f"~{len(placeholders)}")
+            return placeholders[-1]
+
+        compiler = _Compiler(placeholder, reuse)
+        fragments = [compiler.compile(statement) for statement in statements]
+        if placeholders:
+            unused = {node_id for ids in reuse.values() for node_id in ids}
+            leftover = iter([node_id for node_id in old_nodes if node_id in unused])
+            ids = {temp: next(leftover, None) or self._new_id() for temp in placeholders}
+            for fragment in fragments:
+                fragment.rename(ids)
+
+        keys = {key for fragment in replaced + fragments for key in fragment.labels}
+        old_targets = {key: self._target(key) for key in keys}
+        self._index(replaced, remove=True)
+        self._fragments[first:last] = fragments
+        # Positions only shift when the number of fragments changes
+        stop = first + len(fragments) if len(fragments) == last - first else len(self._fragments)
+        for position in range(first, stop):
+            self._fragments[position].position = position
+        self._index(fragments)
+        if delta:
+            self._starts = old_starts[:first] + starts + [s + delta for s in old_starts[last:]]
+        else:
+            self._starts[first:last] = starts
+
+        # Re-resolve only the jumps that can have changed: those out of the
+        # re-parsed fragments and the one after them (its incoming jumps
+        # hang off its new neighbour), and those to keys whose target moved
+        old_jumps = {fragment: self._set_jumps(fragment, []) for fragment in replaced}
+        for index in range(first, first + len(fragments) + len(following)):
+            fragment = self._fragments[index]
+            old_jumps[fragment] = self._set_jumps(fragment, self._pending(index))
+        for key in keys:
+            if self._target(key) != old_targets[key]:
+                for fragment in list(self._referrers.get(key, ())):
+                    if fragment not in old_jumps:
+                        old_jumps[fragment] = self._set_jumps(fragment, self._jumps[fragment][0])
+        old_gotos = [edge for edges in old_jumps.values() for edge in edges]
+        new_gotos = [edge for fragment in old_jumps if fragment in self._jumps for edge in self._jumps[fragment][1]]
+        new_owned = self._owned_edges(first, first + len(fragments))
+        self.version += 1
+
+        removed_edges, added_edges = _edge_diff(old_owned + old_gotos, new_owned + new_gotos)
+        # Layout removes edges by (from, to) pair, and a jump can share its pair
+        # with an edge outside the re-parsed range: re-add every edge of such pairs
+        old_pairs = {(edge[0], edge[1]) for edge in old_gotos}
+        shared = {(edge[0], edge[1]) for edge in removed_edges
+                  if (edge[0], edge[1]) in old_pairs or self._jump_pairs[(edge[0], edge[1])] > 0}
+        if shared:
+            added_edges = [edge for edge in added_edges if (edge[0], edge[1]) not in shared]
+            added_edges += [list(edge) for edge in self._edges() if (edge[0], edge[1]) in shared]
+
+        new_nodes = [node for fragment in fragments for node in fragment.nodes]
+        new_ids = {node["id"] for node in new_nodes}
+        return {
+            # Includes kept ids with new text, which layout updates in place
+            "added_nodes": [dict(node) for node in new_nodes if old_nodes.get(node["id"]) != node],
+            "removed_nodes": [node_id for node_id in old_nodes if node_id not in new_ids],
+            "added_edges": added_edges,
+            "removed_edges": removed_edges
+        }
+
+    def _owned_edges(self, first: int, last: int) -> List[List]:
+        """Edges inside fragments first:last and across their boundaries."""
+        edges = []
+        for index in range(first, last):
+            edges.extend(self._fragments[index].edges)
+        for index in range(first - 1, last):
+            edges.extend(self._boundary(index)[0])
+        return edges
+
+    @property
+    def text(self) -> str:
+        return '\n'.join(self.lines)
+
+def _edge_diff(old: List[List], new: List[List]) -> Tuple[List, List]:
+    """
+    (removed, added) edges between two edge lists. Incremental layout removes
+    edges by (from, to) pair, so a pair whose labels changed in any way is
+    removed whole and all its new edges are added back.
+    """
+    def by_pair(edges):
+        pairs = {}
+        for edge in edges:
+            pairs.setdefault((edge[0], edge[1]), Counter())[edge[2] if len(edge) > 2 else None] += 1
+        return pairs
+
+    old_pairs, new_pairs = by_pair(old), by_pair(new)
+    changed = {pair for pair in old_pairs.keys() | new_pairs.keys() if old_pairs.get(pair) != new_pairs.get(pair)}
+    removed = [list(pair) for pair in old_pairs if pair in changed]
+    added = [list(edge) for edge in new if (edge[0], edge[1]) in changed]
+    return removed, added
+
+class UnknownDocumentError(Exception):
+    """Raised when an edit names a document this process has no session for."""
+
+class StaleDocumentError(Exception):
+    """Raised when an edit was made against an older version of the document."""
+
+class DocumentStore:
+    """
+    Parsed and laid-out documents of open editor sessions, by document id,
+    with LRU eviction. Sessions live in this process only; a client whose
+    edit is refused (evicted, another worker, or out of step) sends the full
+    text again.
+    """
+
+    def __init__(self, max_documents: int = DEFAULT_MAX_DOCUMENTS):
+        self.max_documents = max_documents
+        self._sessions = OrderedDict()
+
+    def open(self, document_id: str, text: str, orientation: str = 'horizontal',
+             layout: str = 'hierarchical') -> Dict:
+        """Parse and lay out the whole text; returns the chart and its version."""
+        with timed("parse"):
+            document = NestedDocument(text)
+        chart = apply_auto_layout(document.chart(), orientation, layout)
+        self._sessions[document_id] = {
+            "document": document,
+            "layout": IncrementalLayout(chart, orientation)
+        }
+        self._sessions.move_to_end(document_id)
+        while len(self._sessions) > self.max_documents:
+            self._sessions.popitem(last=False)
+        return {**chart, "version": document.version}
+
+    def edit(self, document_id: str, version: int, start: int, end: int, lines: List[str]) -> Dict:
+        """
+        Apply a line edit made against ``version``. Returns the new version,
+        the layout diff and the positions of every node that was placed.
+        """
+        session = self._sessions.get(document_id)
+        if session is None:
+            raise UnknownDocumentError(f"Unknown document '{document_id}', send the full text")
+        self._sessions.move_to_end(document_id)
+        document = session["document"]
+        if version != document.version:
+            raise StaleDocumentError(f"Document is at version {document.version}, send the full text")
+
+        with timed("parse"):
+            diff = document.edit(start, end, lines)
+        layout = session["layout"]
+        index = layout.nodes
+        if diff["removed_nodes"] or diff["removed_edges"] or diff["added_edges"] or any(
+                node["id"] not in index for node in diff["added_nodes"]):
+            # Layout takes ownership of the added node dicts; keep the diff clean
+            placed = {**diff, "added_nodes": [dict(node) for node in diff["added_nodes"]]}
+            with timed("incremental_layout"):
+                moved = layout.apply(placed)
+        else:
+            # Only text changed: update the nodes in place, nothing moves
+            for node in diff["added_nodes"]:
+                index[node["id"]].update(node)
+            moved = []
+        return {
+            "version": document.version,
+            "diff": diff,
+            "positions": {node_id: index[node_id]["position"] for node_id in moved}
+        }
+
+document_store: Optional[DocumentStore] = None
+
+def get_document_store() -> DocumentStore:
+    """Get or create the editor session store (TEXT_DOCUMENTS_MAX sessions)."""
+    global document_store
+
+    if document_store is None:
+        document_store = DocumentStore(int(os.getenv("TEXT_DOCUMENTS_MAX", DEFAULT_MAX_DOCUMENTS)))
+    return document_store
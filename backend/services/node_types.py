@@ -0,0 +1,39 @@
+from typing import List, Tuple
+
+# Priority-ordered (node type, keywords): the first type with a keyword
+# anywhere in the lowercased text wins, otherwise 'process'.
+TEXT_KEYWORDS = [
+    ('start', ['start', 'begin']),
+    ('end', ['end', 'finish', 'stop', 'exit']),
+    ('decision', ['if', 'check', 'validate', 'verify', '?', 'decision']),
+    ('io', ['input', 'output', 'print', 'display', 'show', 'read', 'get']),
+]
+
+# OCR text is noisier, so the image pipeline keeps its own shorter lists
+OCR_KEYWORDS = [
+    ('start', ['start', 'begin']),
+    ('end', ['end', 'finish', 'stop']),
+    ('decision', ['?', 'if', 'check', 'decision']),
+    ('io', ['input', 'output', 'read', 'write', 'print']),
+]
+
+class KeywordClassifier:
+    """
+    Node type from keywords, built once per keyword table. The table is
+    flattened to (keyword, type) pairs in priority order, so classifying is
+    one loop of C substring searches that stops at the first hit.
+    """
+
+    def __init__(self, keywords: List[Tuple[str, List[str]]], default: str = 'process'):
+        self.default = default
+        self._pairs = tuple((word, node_type) for node_type, words in keywords for word in words)
+
+    def __call__(self, text: str) -> str:
+        text = text.lower()
+        for word, node_type in self._pairs:
+            if word in text:
+                return node_type
+        return self.default
+
+classify_text = KeywordClassifier(TEXT_KEYWORDS)
+classify_ocr_text = KeywordClassifier(OCR_KEYWORDS)
@@ -0,0 +1,186 @@
+from array import array
+from typing import Dict, List, Tuple
+
+from services.graph import CompactGraph
+from services.metrics import count_error, instrumented
+from services.node_types import classify_text
+
+NODE_TYPES = frozenset(('start', 'end', 'process', 'decision', 'io'))
+
+@instrumented("normalize")
+def normalize_flowchart(flowchart_data: Dict) -> Tuple[Dict, Dict]:
+    """
+    Repair and check a chart from any input path (text, LLM or OCR) before
+    layout: one pass over the nodes, one over the edges, then the checks on
+    a CompactGraph of the result (components and one search), O(N + E).
+    The input is not modified; nodes and edges that need no repair are
+    reused as they are.
+
+    Nodes: entries that are not objects are dropped, ids become strings
+    (a missing id gets a fresh one), text a string, and unknown types are
+    classified from the text. The first node with an id keeps it; a later
+    one with the same text is dropped, with other text it gets a fresh id.
+
+    Edges: [source, target, label?] lists or {"source"/"from",
+    "target"/"to", "label"?} objects become lists; malformed edges, edges to
+    unknown ids and exact repeats are dropped.
+
+    Returns (chart, report). The report has the chart's connected
+    ``components``, whether it is ``cyclic``, how many nodes are
+    ``unreachable`` from its entry points (start nodes, else nodes without
+    incoming edges), and how many ``duplicate_ids``, ``dropped_nodes`` and
+    ``dropped_edges`` were repaired.
+    """
+    raw_nodes = flowchart_data.get("nodes") or []
+    raw_edges = flowchart_data.get("edges") or []
+
+    fresh = _fresh_ids(raw_nodes)
+
+    # Ids are interned to 0..n-1 as the nodes are read
+    nodes = []
+    index = {}
+    duplicate_ids = 0
+    dropped_nodes = 0
+    for node in raw_nodes:
+        if not isinstance(node, dict):
+            dropped_nodes += 1
+            continue
+        node_id = node.get("id")
+        text = node.get("text")
+        node_type = node.get("type")
+        clean = type(node_id) is str and type(text) is str and node_type in NODE_TYPES
+        if not clean:
+            node_id = next(fresh) if node_id is None else str(node_id)
+            text = "" if text is None else str(text)
+            if node_type not in NODE_TYPES:
+                node_type = classify_text(text)
+        if node_id in index:
+            duplicate_ids += 1
+            if nodes[index[node_id]]["text"] == text:
+                continue
+            node_id = next(fresh)
+            clean = False
+        index[node_id] = len(nodes)
+        nodes.append(node if clean else {**node, "id": node_id, "text": text, "type": node_type})
+
+    # Edges are checked against the interned ids, collecting the graph's
+    # edge buffers in the same loop
+    n = len(nodes)
+    edges = []
+    edge_src = array('i')
+    edge_dst = array('i')
+    seen = set()
+    dropped_edges = 0
+    lookup = index.get
+    for edge in raw_edges:
+        # Fast path: a list of 2 or 3 strings is already in shape
+        if (type(edge) is list and 2 <= len(edge) <= 3 and type(edge[0]) is str
+                and type(edge[1]) is str and type(edge[-1]) is str):
+            key = (edge[0], edge[1], edge[2] if len(edge) == 3 else None)
+        else:
+            key = _edge_parts(edge)
+            if key is not None:
+                edge = [key[0], key[1]] if key[2] is None else list(key)
+        u = v = None
+        if key is not None and key not in seen:
+            u = lookup(key[0])
+            v = lookup(key[1])
+        if u is None or v is None:
+            dropped_edges += 1
+            continue
+        seen.add(key)
+        edges.append(edge)
+        edge_src.append(u)
+        edge_dst.append(v)
+
+    graph = CompactGraph([node["id"] for node in nodes], index, edge_src, edge_dst,
+                         array('i', range(len(edges))))
+    _, num_components = graph.components()
+    entries = [v for v, node in enumerate(nodes) if node["type"] == 'start']
+    if not entries:
+        entries = graph.sources() or [0]
+    unreachable, cyclic = _check_paths(graph, entries) if nodes else (0, False)
+
+    if duplicate_ids or dropped_nodes or dropped_edges:
+        count_error("normalize")
+    report = {
+        "components": num_components,
+        "cyclic": cyclic,
+        "unreachable": unreachable,
+        "duplicate_ids": duplicate_ids,
+        "dropped_nodes": dropped_nodes,
+        "dropped_edges": dropped_edges
+    }
+    return {"nodes": nodes, "edges": edges}, report
+
+def _fresh_ids(raw_nodes: List):
+    """
+    Ids "n1", "n2", ... that no node of the input uses; the input's ids
+    are only collected once the first one is needed.
+    """
+    taken = {str(node["id"]) for node in raw_nodes if isinstance(node, dict) and node.get("id") is not None}
+    k = 0
+    while True:
+        k += 1
+        candidate = f"n{k}"
+        if candidate not in taken:
+            taken.add(candidate)
+            yield candidate
+
+def _edge_parts(edge) -> Tuple:
+    """(source, target, label) of an edge as strings (label None when absent), or None when malformed."""
+    if isinstance(edge, dict):
+        source = edge.get("source", edge.get("from"))
+        target = edge.get("target", edge.get("to"))
+        label = edge.get("label")
+    elif isinstance(edge, (list, tuple)) and 2 <= len(edge) <= 3:
+        source, target = edge[0], edge[1]
+        label = edge[2] if len(edge) == 3 else None
+    else:
+        return None
+    if source is None or target is None:
+        return None
+    return (str(source), str(target), None if label is None else str(label))
+
+def _check_paths(graph: CompactGraph, entries: List[int]) -> Tuple[int, bool]:
+    """
+    (vertices not reachable from ``entries``, whether the graph has a
+    cycle), from one iterative depth-first search: first from the entries,
+    then from every vertex still unvisited. A cycle is an edge back to a
+    vertex on the search stack.
+    """
+    n = graph.num_nodes
+    offsets = graph.succ_offsets.tolist()
+    targets = graph.succ_targets.tolist()
+    state = bytearray(n)  # 0 = unseen, 1 = on the stack, 2 = finished
+    cyclic = False
+    reached = 0
+
+    def search(root: int) -> int:
+        nonlocal cyclic
+        found = 1
+        state[root] = 1
+        stack = [(root, iter(targets[offsets[root]:offsets[root + 1]]))]
+        while stack:
+            v, pending = stack[-1]
+            for w in pending:
+                if state[w] == 1:
+                    cyclic = True
+                elif state[w] == 0:
+                    state[w] = 1
+                    found += 1
+                    stack.append((w, iter(targets[offsets[w]:offsets[w + 1]])))
+                    break
+            else:
+                state[v] = 2
+                stack.pop()
+        return found
+
+    for root in entries:
+        if not state[root]:
+            reached += search(root)
+    if not cyclic:
+        for root in range(n):
+            if not state[root]:
+                search(root)
+    return n - reached, cyclic
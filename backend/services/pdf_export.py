@@ -0,0 +1,286 @@
+import math
+import threading
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, List, Tuple
+
+from reportlab import rl_config
+from reportlab.lib.colors import Color, white
+from reportlab.lib.pagesizes import landscape, letter
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+from services.graph import CompactGraph
+from services.raster_export import (
+    ARROW_SIZE, EDGE_COLOR, EDGE_WIDTH, LABEL_COLOR, NODE_STYLES, border_point
+)
+
+# Chart units are CSS pixels; tiles print them at 96 DPI (0.75 pt each).
+# 'tile' splits the chart over as many letter pages as it needs, 'fit'
+# scales it onto a single page.
+PDF_MODES = ('tile', 'fit')
+TILE_SCALE = 0.75
+PAGE_MARGIN = 36
+FOOTER_SIZE = 8
+CHART_PADDING = 20
+FONT = "Helvetica-Bold"
+LABEL_FONT = "Helvetica"
+MIN_FONT_SIZE = 4
+
+# Edges are drawn with an arrowhead and a label box within this many chart
+# units of their segment
+EDGE_REACH = 20
+
+# Binary Flate streams: the default ASCII85 wrapping adds 25% to every page.
+# reportlab reads the switch from its global config, so it is turned off only
+# while one of our PDFs is being written and restored after the last one.
+_a85_lock = threading.Lock()
+_a85_writers = 0
+_a85_saved = None
+
+@contextmanager
+def _binary_streams():
+    global _a85_writers, _a85_saved
+    with _a85_lock:
+        if _a85_writers == 0:
+            _a85_saved = rl_config.useA85
+            rl_config.useA85 = 0
+        _a85_writers += 1
+    try:
+        yield
+    finally:
+        with _a85_lock:
+            _a85_writers -= 1
+            if _a85_writers == 0:
+                rl_config.useA85 = _a85_saved
+
+def write_pdf(out: BinaryIO, nodes: List[Dict], edges: List, mode: str = 'tile') -> None:
+    """
+    Draw a positioned flowchart into ``out`` as a PDF.
+
+    Each node shape and the arrowhead are defined once as form XObjects
+    and placed by reference, so a shape costs a few bytes of content
+    stream however many times it appears. In 'tile' mode items are
+    bucketed by the tiles they overlap (an edge by the tiles its segment
+    crosses, not every tile of its bounding box), so each page only draws
+    its own edges and nodes, and tiles with nothing on them are left out.
+    """
+    if mode not in PDF_MODES:
+        raise ValueError(f"Unknown PDF mode '{mode}', expected one of {', '.join(PDF_MODES)}")
+    with _binary_streams():
+        _write_pdf(out, nodes, edges, mode)
+
+def _write_pdf(out: BinaryIO, nodes: List[Dict], edges: List, mode: str) -> None:
+    bounds, items = _scene(nodes, edges)
+    min_x, min_y, max_x, max_y = bounds
+    chart_w, chart_h = max_x - min_x, max_y - min_y
+
+    pagesize = landscape(letter) if chart_w > chart_h else letter
+    usable_w, usable_h = _usable(pagesize)
+    if mode == 'fit':
+        # Shrink to fit, but never print larger than the tiles would
+        scale = min(TILE_SCALE, usable_w / chart_w, usable_h / chart_h)
+    else:
+        scale = TILE_SCALE
+    tile_w, tile_h = usable_w / scale, usable_h / scale
+    columns = max(1, math.ceil(chart_w / tile_w))
+    rows = max(1, math.ceil(chart_h / tile_h))
+
+    # Bucket every item into the tiles it overlaps; empty tiles get no page
+    tiles = {}
+    for box, draw, segment in items:
+        first_row = max(0, int((box[1] - min_y) // tile_h))
+        last_row = min(rows - 1, int((box[3] - min_y) // tile_h))
+        for row in range(first_row, last_row + 1):
+            if segment is None:
+                left, right = box[0], box[2]
+            else:
+                left, right = _segment_span(segment, min_y + row * tile_h, min_y + (row + 1) * tile_h)
+            first_column = max(0, int((left - min_x) // tile_w))
+            last_column = min(columns - 1, int((right - min_x) // tile_w))
+            for column in range(first_column, last_column + 1):
+                tiles.setdefault((row, column), []).append(draw)
+    if not tiles:
+        tiles[(0, 0)] = []
+
+    c = canvas.Canvas(out, pagesize=pagesize)
+    c.setTitle("AI Flowchart")
+    _define_forms(c, scale)
+    page_h = pagesize[1]
+
+    pages = sorted(tiles)
+    for page, (row, column) in enumerate(pages, start=1):
+        tile_x = min_x + column * tile_w
+        tile_y = min_y + row * tile_h
+
+        def to_page(x: float, y: float) -> Tuple[float, float]:
+            return PAGE_MARGIN + (x - tile_x) * scale, page_h - PAGE_MARGIN - (y - tile_y) * scale
+
+        c.saveState()
+        clip = c.beginPath()
+        clip.rect(PAGE_MARGIN, PAGE_MARGIN, usable_w, usable_h)
+        c.clipPath(clip, stroke=0, fill=0)
+        for draw in tiles[(row, column)]:
+            draw(c, to_page, scale)
+        c.restoreState()
+
+        c.setFont(LABEL_FONT, FOOTER_SIZE)
+        c.setFillColor(_rgb(LABEL_COLOR))
+        footer = "AI Flowchart"
+        if rows * columns > 1:
+            footer += f" - page {page} of {len(pages)} (row {row + 1} of {rows}, column {column + 1} of {columns})"
+        c.drawString(PAGE_MARGIN, PAGE_MARGIN / 2, footer)
+        c.showPage()
+
+    c.save()
+
+def _segment_span(segment, top: float, bottom: float) -> Tuple[float, float]:
+    """x range of an edge's segment between two heights, widened by EDGE_REACH on every side."""
+    (x1, y1), (x2, y2) = segment
+    if y1 == y2:
+        return min(x1, x2) - EDGE_REACH, max(x1, x2) + EDGE_REACH
+    t1 = min(1.0, max(0.0, (top - EDGE_REACH - y1) / (y2 - y1)))
+    t2 = min(1.0, max(0.0, (bottom + EDGE_REACH - y1) / (y2 - y1)))
+    xa = x1 + (x2 - x1) * t1
+    xb = x1 + (x2 - x1) * t2
+    return min(xa, xb) - EDGE_REACH, max(xa, xb) + EDGE_REACH
+
+def _usable(pagesize) -> Tuple[float, float]:
+    return pagesize[0] - 2 * PAGE_MARGIN, pagesize[1] - 2 * PAGE_MARGIN
+
+def _rgb(color) -> Color:
+    return Color(color[0] / 255, color[1] / 255, color[2] / 255)
+
+def _style(node_type: str):
+    return NODE_STYLES.get(node_type, NODE_STYLES["process"])
+
+def _form_name(node_type: str) -> str:
+    return f"node-{node_type if node_type in NODE_STYLES else 'process'}"
+
+def _define_forms(c: canvas.Canvas, scale: float) -> None:
+    """One form XObject per node shape plus the arrowhead, centred on the origin."""
+    for node_type, (fill, border, half_w, half_h) in NODE_STYLES.items():
+        w, h = half_w * scale, half_h * scale
+        pad = 2 * scale
+        c.beginForm(_form_name(node_type), -w - pad, -h - pad, w + pad, h + pad)
+        c.setFillColor(_rgb(fill))
+        c.setStrokeColor(_rgb(border))
+        c.setLineWidth(2 * scale)
+        if node_type in ("decision", "io"):
+            path = c.beginPath()
+            if node_type == "decision":
+                points = [(0, h), (w, 0), (0, -h), (-w, 0)]
+            else:
+                slant = 10 * scale
+                points = [(-w + slant, h), (w, h), (w - slant, -h), (-w, -h)]
+            path.moveTo(*points[0])
+            for point in points[1:]:
+                path.lineTo(*point)
+            path.close()
+            c.drawPath(path, stroke=1, fill=1)
+        else:
+            radius = h if node_type in ("start", "end") else 10 * scale
+            c.roundRect(-w, -h, 2 * w, 2 * h, radius, stroke=1, fill=1)
+        c.endForm()
+
+    # Arrowhead pointing along +x with its tip at the origin
+    size = ARROW_SIZE * scale
+    c.beginForm("arrow", -size, -size, 0, size)
+    c.setFillColor(_rgb(EDGE_COLOR))
+    path = c.beginPath()
+    path.moveTo(0, 0)
+    path.lineTo(-size * math.cos(math.pi / 6), size * math.sin(math.pi / 6))
+    path.lineTo(-size * math.cos(math.pi / 6), -size * math.sin(math.pi / 6))
+    path.close()
+    c.drawPath(path, stroke=0, fill=1)
+    c.endForm()
+
+def _scene(nodes: List[Dict], edges: List):
+    """
+    Chart bounds and (bbox, draw, segment) items in chart units; edges
+    first, with their (start, end) segment (None for nodes).
+    """
+    placed = [node for node in nodes if "position" in node]
+    if not placed:
+        return (0, 0, 400, 300), []
+
+    reach_x = max(style[2] for style in NODE_STYLES.values()) + CHART_PADDING
+    reach_y = max(style[3] for style in NODE_STYLES.values()) + CHART_PADDING
+    bounds = (
+        min(node["position"]["x"] for node in placed) - reach_x,
+        min(node["position"]["y"] for node in placed) - reach_y,
+        max(node["position"]["x"] for node in placed) + reach_x,
+        max(node["position"]["y"] for node in placed) + reach_y,
+    )
+
+    items = []
+    graph = CompactGraph.from_flowchart(nodes, edges)
+    vertex_nodes = graph.vertex_nodes(nodes)
+    for k in range(graph.num_edges):
+        source = vertex_nodes[graph.edge_src[k]]
+        target = vertex_nodes[graph.edge_dst[k]]
+        if "position" not in source or "position" not in target:
+            continue
+        edge = edges[graph.edge_pos[k]]
+        label = str(edge[2]) if len(edge) > 2 and edge[2] else None
+        source_center = (source["position"]["x"], source["position"]["y"])
+        target_center = (target["position"]["x"], target["position"]["y"])
+        start = border_point(source_center, target_center, source.get("type"), 1.0)
+        end = border_point(target_center, source_center, target.get("type"), 1.0)
+        box = (min(start[0], end[0]) - EDGE_REACH, min(start[1], end[1]) - EDGE_REACH,
+               max(start[0], end[0]) + EDGE_REACH, max(start[1], end[1]) + EDGE_REACH)
+        items.append((box, _edge_drawer(start, end, label), (start, end)))
+
+    for node in placed:
+        x, y = node["position"]["x"], node["position"]["y"]
+        half_w, half_h = _style(node.get("type"))[2:]
+        box = (x - half_w - 2, y - half_h - 2, x + half_w + 2, y + half_h + 2)
+        items.append((box, _node_drawer(x, y, node.get("type"), str(node.get("text", ""))), None))
+
+    return bounds, items
+
+def _edge_drawer(start, end, label):
+    angle = math.degrees(math.atan2(-(end[1] - start[1]), end[0] - start[0]))
+
+    def draw(c: canvas.Canvas, to_page, scale: float) -> None:
+        x1, y1 = to_page(*start)
+        x2, y2 = to_page(*end)
+        c.setStrokeColor(_rgb(EDGE_COLOR))
+        c.setLineWidth(EDGE_WIDTH * scale)
+        c.setLineCap(1)
+        c.line(x1, y1, x2, y2)
+        c.saveState()
+        c.translate(x2, y2)
+        c.rotate(angle)
+        c.doForm("arrow")
+        c.restoreState()
+        if label:
+            mid_x, mid_y = (x1 + x2) / 2, (y1 + y2) / 2
+            c.setFillColor(white)
+            c.rect(mid_x - 20 * scale, mid_y - 10 * scale, 40 * scale, 20 * scale, stroke=0, fill=1)
+            c.setFillColor(_rgb(LABEL_COLOR))
+            c.setFont(LABEL_FONT, 12 * scale)
+            c.drawCentredString(mid_x, mid_y - 4 * scale, label)
+
+    return draw
+
+def _node_drawer(x: float, y: float, node_type: str, text: str):
+    half_w = _style(node_type)[2]
+
+    def draw(c: canvas.Canvas, to_page, scale: float) -> None:
+        px, py = to_page(x, y)
+        c.saveState()
+        c.translate(px, py)
+        c.doForm(_form_name(node_type))
+        c.restoreState()
+        if text:
+            # Shrink long text to fit inside the shape
+            size = 14 * scale
+            room = (2 * half_w - 16) * scale
+            width = stringWidth(text, FONT, size)
+            if width > room:
+                size = max(MIN_FONT_SIZE * scale, size * room / width)
+            c.setFillColor(white)
+            c.setFont(FONT, size)
+            c.drawCentredString(px, py - size * 0.35, text)
+
+    return draw
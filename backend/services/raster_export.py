@@ -0,0 +1,247 @@
+import math
+import struct
+import zlib
+from functools import lru_cache
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from services.export_service import DEFAULT_SCALE
+from services.graph import CompactGraph
+
+# Same look as the browser export (ExportPanel.jsx): canvas bounds are each
+# node's position +/- (150, 100) plus padding, rendered at DEFAULT_SCALE (2x).
+PADDING = 50
+NODE_MARGIN_X = 150
+NODE_MARGIN_Y = 100
+EDGE_COLOR = (100, 116, 139)
+LABEL_COLOR = (71, 85, 105)
+EDGE_WIDTH = 2.5
+ARROW_SIZE = 10
+
+# type -> (fill, border, half width, half height)
+NODE_STYLES = {
+    "start": ((16, 185, 129), (5, 150, 105), 60, 25),
+    "end": ((16, 185, 129), (5, 150, 105), 60, 25),
+    "decision": ((245, 158, 11), (217, 119, 6), 60, 60),
+    "io": ((139, 92, 246), (124, 58, 237), 70, 25),
+    "process": ((59, 130, 246), (37, 99, 235), 70, 30),
+}
+
+# Rows are rendered in bands of about this many bytes, so memory stays flat
+# however tall the canvas is; MAX_PNG_PIXELS bounds the output itself.
+BAND_BYTES = 8 * 1024 * 1024
+MAX_PNG_PIXELS = 400_000_000
+
+def iter_png(nodes: List[Dict], edges: List, scale: float = DEFAULT_SCALE,
+             band_bytes: int = BAND_BYTES) -> Iterator[bytes]:
+    """
+    Render a positioned flowchart to PNG, yielding the encoded file in pieces.
+
+    The canvas is drawn in horizontal bands: each band only draws the edges
+    and nodes that overlap it, its rows are filtered and fed to a running
+    zlib stream, and the band buffer is dropped before the next one. Peak
+    memory is one band, never the full canvas.
+    """
+    # Everything that can fail is checked before the first piece is yielded,
+    # so a streamed export fails before its response starts
+    if not 0 < scale < math.inf:
+        raise ValueError(f"PNG scale must be a positive number, got {scale}")
+    width, height, items = _scene(nodes, edges, scale)
+    if width <= 0 or height <= 0:
+        raise ValueError(f"PNG would be {width}x{height} pixels at scale {scale}")
+    if width * height > MAX_PNG_PIXELS:
+        raise ValueError(f"PNG would be {width}x{height} pixels, the limit is {MAX_PNG_PIXELS}")
+    band_height = max(16, min(height, band_bytes // (width * 3)))
+
+    yield b"\x89PNG\r\n\x1a\n"
+    yield _chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+    compressor = zlib.compressobj(6)
+    items.sort(key=lambda item: item[0])
+    active = []
+    next_item = 0
+    previous_row = np.zeros((1, width, 3), dtype=np.uint8)
+
+    for top in range(0, height, band_height):
+        bottom = min(height, top + band_height)
+        while next_item < len(items) and items[next_item][0] < bottom:
+            active.append(items[next_item])
+            next_item += 1
+        active = [item for item in active if item[1] >= top]
+
+        # Pillow fills a polygon cut by the top image edge slightly differently,
+        # so the band starts above every polygon that overlaps it (bottom cuts
+        # are exact). Polygons are at most a node or an arrowhead tall, so this
+        # never reaches far above the band; an arrowhead outside the band is
+        # not drawn at all.
+        exact = [item[4] < bottom and item[5] >= top for item in active]
+        origin = max(0, min([top] + [int(math.floor(item[4])) for item, inside in zip(active, exact) if inside]))
+        band = Image.new("RGB", (width, bottom - origin), "white")
+        draw = ImageDraw.Draw(band)
+        for item, inside in sorted(zip(active, exact), key=lambda pair: pair[0][2]):
+            item[3](draw, origin, inside)
+
+        # PNG "Up" filter: each row minus the row above it (mod 256)
+        pixels = np.asarray(band)[top - origin:]
+        filtered = np.empty((pixels.shape[0], width * 3 + 1), dtype=np.uint8)
+        filtered[:, 0] = 2
+        rows_above = np.concatenate((previous_row, pixels[:-1]))
+        filtered[:, 1:] = (pixels - rows_above).reshape(pixels.shape[0], -1)
+        previous_row = pixels[-1:].copy()
+
+        data = compressor.compress(filtered.tobytes())
+        if data:
+            yield _chunk(b"IDAT", data)
+
+    yield _chunk(b"IDAT", compressor.flush())
+    yield _chunk(b"IEND", b"")
+
+def render_png(nodes: List[Dict], edges: List, scale: float = DEFAULT_SCALE) -> bytes:
+    """The whole PNG file as bytes."""
+    return b"".join(iter_png(nodes, edges, scale))
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+@lru_cache(maxsize=8)
+def _font(size: int):
+    try:
+        return ImageFont.load_default(size=size)
+    except ImportError:
+        # Pillow built without FreeType only has the fixed bitmap font
+        return ImageFont.load_default()
+
+def _scene(nodes: List[Dict], edges: List, scale: float) -> Tuple[int, int, List]:
+    """
+    Canvas size and draw items (top, bottom, order, draw(draw, band_top, polygon),
+    polygon_top, polygon_bottom) in device pixels. The polygon rows (a node's
+    outline, an edge's arrowhead) are drawn only when ``polygon`` says they
+    overlap the band, and then must all be in it from polygon_top down to
+    draw exactly. Edges come before nodes in draw order.
+    """
+    placed = [node for node in nodes if "position" in node]
+    if not placed:
+        side = int(2 * PADDING * scale)
+        return side, side, []
+
+    min_x = min(node["position"]["x"] for node in placed) - NODE_MARGIN_X
+    min_y = min(node["position"]["y"] for node in placed) - NODE_MARGIN_Y
+    max_x = max(node["position"]["x"] for node in placed) + NODE_MARGIN_X
+    max_y = max(node["position"]["y"] for node in placed) + NODE_MARGIN_Y
+    width = int(math.ceil((max_x - min_x + 2 * PADDING) * scale))
+    height = int(math.ceil((max_y - min_y + 2 * PADDING) * scale))
+
+    def device(position):
+        return ((position["x"] - min_x + PADDING) * scale, (position["y"] - min_y + PADDING) * scale)
+
+    items = []
+    graph = CompactGraph.from_flowchart(nodes, edges)
+    vertex_nodes = graph.vertex_nodes(nodes)
+    for k in range(graph.num_edges):
+        source = vertex_nodes[graph.edge_src[k]]
+        target = vertex_nodes[graph.edge_dst[k]]
+        if "position" not in source or "position" not in target:
+            continue
+        edge = edges[graph.edge_pos[k]]
+        label = str(edge[2]) if len(edge) > 2 and edge[2] else None
+        start = border_point(device(source["position"]), device(target["position"]), source.get("type"), scale)
+        end = border_point(device(target["position"]), device(source["position"]), target.get("type"), scale)
+        reach = (ARROW_SIZE + 12) * scale
+        items.append((
+            min(start[1], end[1]) - reach, max(start[1], end[1]) + reach, len(items),
+            _edge_painter(start, end, label, scale), end[1] - reach, end[1] + reach
+        ))
+
+    for node in placed:
+        center = device(node["position"])
+        half_height = _style(node.get("type"))[3] * scale + 2 * scale
+        items.append((
+            center[1] - half_height, center[1] + half_height, len(items),
+            _node_painter(center, node.get("type"), str(node.get("text", "")), scale),
+            center[1] - half_height, center[1] + half_height
+        ))
+
+    return width, height, items
+
+def _style(node_type: str):
+    return NODE_STYLES.get(node_type, NODE_STYLES["process"])
+
+def border_point(center, towards, node_type: str, scale: float) -> Tuple[float, float]:
+    """Where the segment center->towards leaves the node's outline."""
+    (x, y), (tx, ty) = center, towards
+    dx, dy = tx - x, ty - y
+    if dx == 0 and dy == 0:
+        return x, y
+    half_w = _style(node_type)[2] * scale
+    half_h = _style(node_type)[3] * scale
+    if node_type == "decision":
+        t = 1 / (abs(dx) / half_w + abs(dy) / half_h)
+    else:
+        t = min(half_w / abs(dx) if dx else math.inf, half_h / abs(dy) if dy else math.inf)
+    t = min(t, 1.0)
+    return x + dx * t, y + dy * t
+
+def _snap(value: float) -> float:
+    """
+    Round to 1/8 px. Band offsets are whole pixels, so snapped coordinates
+    shift exactly and a shape rasterizes the same in every band.
+    """
+    return round(value * 8) / 8
+
+def _shifted(points, top: int):
+    return [(x, y - top) for x, y in points]
+
+def _edge_painter(start, end, label, scale: float):
+    angle = math.atan2(end[1] - start[1], end[0] - start[0])
+    size = ARROW_SIZE * scale
+    line_width = max(1, round(EDGE_WIDTH * scale))
+    (x1, y1), (x2, y2) = start, end
+    line = [(_snap(x1), _snap(y1)), (_snap(x2), _snap(y2))]
+    head = [(_snap(x), _snap(y)) for x, y in (
+        (x2, y2),
+        (x2 - size * math.cos(angle - math.pi / 6), y2 - size * math.sin(angle - math.pi / 6)),
+        (x2 - size * math.cos(angle + math.pi / 6), y2 - size * math.sin(angle + math.pi / 6)),
+    )]
+    mid_x, mid_y = _snap((x1 + x2) / 2), _snap((y1 + y2) / 2)
+    box = [(mid_x - 20 * scale, mid_y - 10 * scale), (mid_x + 20 * scale, mid_y + 10 * scale)]
+
+    def paint(draw: ImageDraw.ImageDraw, top: int, polygon: bool) -> None:
+        draw.line(_shifted(line, top), fill=EDGE_COLOR, width=line_width)
+        if polygon:
+            draw.polygon(_shifted(head, top), fill=EDGE_COLOR)
+        if label:
+            draw.rectangle(_shifted(box, top), fill="white")
+            draw.text((mid_x, mid_y - top), label, fill=LABEL_COLOR, font=_font(round(12 * scale)), anchor="mm")
+
+    return paint
+
+def _node_painter(center, node_type: str, text: str, scale: float):
+    fill, border, half_w, half_h = _style(node_type)
+    half_w *= scale
+    half_h *= scale
+    outline_width = max(1, round(2 * scale))
+    x, y = _snap(center[0]), _snap(center[1])
+    if node_type == "decision":
+        outline = [(x, y - half_h), (x + half_w, y), (x, y + half_h), (x - half_w, y)]
+    elif node_type == "io":
+        slant = 10 * scale
+        outline = [(x - half_w + slant, y - half_h), (x + half_w, y - half_h),
+                   (x + half_w - slant, y + half_h), (x - half_w, y + half_h)]
+    else:
+        outline = [(x - half_w, y - half_h), (x + half_w, y + half_h)]
+    outline = [(_snap(px), _snap(py)) for px, py in outline]
+    radius = half_h if node_type in ("start", "end") else 10 * scale
+
+    def paint(draw: ImageDraw.ImageDraw, top: int, polygon: bool) -> None:
+        # A node's item and polygon rows are the same, so it is always drawn
+        if node_type in ("decision", "io"):
+            draw.polygon(_shifted(outline, top), fill=fill, outline=border, width=outline_width)
+        else:
+            draw.rounded_rectangle(_shifted(outline, top), radius=radius,
+                                   fill=fill, outline=border, width=outline_width)
+        if text:
+            draw.text((x, y - top), text, fill="white", font=_font(round(14 * scale)), anchor="mm")
+
+    return paint
@@ -0,0 +1,168 @@
+import asyncio
+import os
+import time
+from io import BytesIO
+from typing import Callable, Dict, List, Optional
+
+# Subsystems loaded when a worker starts instead of by the first request that
+# needs them, chosen with WARMUP: comma-separated names of WARMUP_HOOKS,
+# "all" or "none". Anything not warmed up is imported on first use.
+DEFAULT_WARMUP = "image"
+
+# Small chart pushed through the layered layout and the renderers by warm-up
+_SAMPLE_CHART = {
+    "nodes": [
+        {"id": "1", "text": "Start", "type": "start"},
+        {"id": "2", "text": "Valid?", "type": "decision"},
+        {"id": "3", "text": "Save", "type": "process"},
+        {"id": "4", "text": "End", "type": "end"}
+    ],
+    "edges": [["1", "2"], ["2", "3", "yes"], ["2", "4", "no"], ["3", "4"]]
+}
+
+def web_workers() -> int:
+    """Web worker processes serving the API (WEB_WORKERS; set it under gunicorn too)."""
+    return max(1, int(os.getenv("WEB_WORKERS", 1)))
+
+def worker_state_reliable() -> bool:
+    """
+    Whether a client always reaches the worker that holds its live-edit
+    document or collapsed chart: with one web worker, or with
+    STICKY_SESSIONS=1 behind a proxy that pins each client to a worker.
+    """
+    return web_workers() == 1 or os.getenv("STICKY_SESSIONS", "0") == "1"
+
+# Since the import of main began (perf_counter), and what happened since
+_import_started: Optional[float] = None
+_report = {"import_ms": None, "warmup_ms": {}, "ready_ms": None, "first_requests": {}}
+
+async def _warm_image():
+    """Start the image worker processes (they import OpenCV and tesseract)."""
+    from services.workers import get_image_pool
+    await get_image_pool().start()
+
+async def _warm_tesseract():
+    """Run tesseract once where OCR runs (a worker, or this process with IMAGE_WORKERS=0)."""
+    from services.workers import get_image_pool, tesseract_version
+    version = await get_image_pool().submit(tesseract_version)
+    print(f"✅ tesseract {version} loaded")
+
+def _warm_groq():
+    """Create the Groq clients (they report their own failures)."""
+    from services.ai_generator import get_async_groq_client, get_groq_client
+    get_async_groq_client()
+    get_groq_client()
+
+def _sample_layout() -> Dict:
+    from services.layered_layout import apply_layered_layout
+    return apply_layered_layout({
+        "nodes": [dict(node) for node in _SAMPLE_CHART["nodes"]],
+        "edges": _SAMPLE_CHART["edges"]
+    })
+
+def _warm_layout():
+    """Load the layered layout (numpy)."""
+    _sample_layout()
+
+def _warm_export():
+    """Load the PNG and PDF renderers (numpy, Pillow, fonts, reportlab)."""
+    from services.pdf_export import write_pdf
+    from services.raster_export import render_png
+    chart = _sample_layout()
+    render_png(chart["nodes"], chart["edges"])
+    write_pdf(BytesIO(), chart["nodes"], chart["edges"])
+
+WARMUP_HOOKS: Dict[str, Callable] = {
+    "image": _warm_image,
+    "tesseract": _warm_tesseract,
+    "groq": _warm_groq,
+    "layout": _warm_layout,
+    "export": _warm_export,
+}
+
+def warmup_names() -> List[str]:
+    """Hooks selected by WARMUP, in the order given; unknown names are reported and skipped."""
+    value = os.getenv("WARMUP", DEFAULT_WARMUP).strip().lower()
+    if value == "all":
+        return list(WARMUP_HOOKS)
+    if value in ("", "none"):
+        return []
+    names = []
+    for name in (part.strip() for part in value.split(",")):
+        if name in WARMUP_HOOKS:
+            names.append(name)
+        elif name:
+            print(f"⚠️ Unknown WARMUP hook '{name}', expected {', '.join(WARMUP_HOOKS)}")
+    return names
+
+async def run_warmup(names: List[str]) -> None:
+    """
+    Run the given hooks one after the other and mark the worker ready. A
+    failing hook is reported and skipped; the subsystem then loads on first
+    use as usual.
+    """
+    for name in names:
+        start = time.perf_counter()
+        try:
+            result = WARMUP_HOOKS[name]()
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            print(f"⚠️ Warm-up '{name}' failed: {e}")
+        _report["warmup_ms"][name] = round((time.perf_counter() - start) * 1000, 1)
+    _mark_ready()
+
+def mark_imported(started: float) -> None:
+    """Record the import of main, which began at ``started`` (perf_counter)."""
+    global _import_started
+    _import_started = started
+    _report["import_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+def _since_import_ms() -> Optional[float]:
+    if _import_started is None:
+        return None
+    return round((time.perf_counter() - _import_started) * 1000, 1)
+
+def _mark_ready() -> None:
+    _report["ready_ms"] = _since_import_ms()
+    warmed = ", ".join(f"{name} {ms} ms" for name, ms in _report["warmup_ms"].items()) or "none"
+    print(f"Worker {os.getpid()}: imported in {_report['import_ms']} ms, "
+          f"ready {_report['ready_ms']} ms after import start (warm-up: {warmed})")
+
+def _record_first_request(endpoint: str, start: float) -> None:
+    first_requests = _report["first_requests"]
+    duration_ms = round((time.perf_counter() - start) * 1000, 1)
+    first_requests[endpoint] = {"after_import_ms": _since_import_ms(), "duration_ms": duration_ms}
+    if len(first_requests) == 1:
+        print(f"Worker {os.getpid()}: first request ({endpoint}) answered "
+              f"{first_requests[endpoint]['after_import_ms']} ms after import start, took {duration_ms} ms")
+
+def startup_report() -> Dict:
+    """
+    This worker's startup timings in ms: import of main, each warm-up hook,
+    ready (startup done) and, per endpoint, when its first request finished
+    and how long it took, both counted from the start of the import.
+    """
+    return {"pid": os.getpid(), **_report}
+
+class StartupMiddleware:
+    """
+    ASGI middleware recording the first request of each endpoint, so the
+    cost of lazy imports (or its absence after warm-up) shows in
+    startup_report(). Later requests only pay a dict lookup.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            endpoint = getattr(scope.get("endpoint"), "__name__", None)
+            if endpoint is not None and endpoint not in _report["first_requests"]:
+                _record_first_request(endpoint, start)
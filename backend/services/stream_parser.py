@@ -0,0 +1,105 @@
+import json
+from typing import List, Tuple
+
+class FlowchartStreamParser:
+    """
+    Incremental parser for a flowchart JSON object arriving in chunks.
+
+    Scans each character once, tracking string/escape state and nesting
+    depth, and emits every element of the top-level "nodes" and "edges"
+    arrays as soon as its closing bracket arrives. Anything before the
+    first '{' (e.g. a markdown fence) is skipped.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = None
+        self._last_key = None
+        self._array = None
+        self._element_start = None
+        self._started = False
+        self._done = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, object]]:
+        """Consume a chunk and return completed ("node", dict) / ("edge", list) items."""
+        if self._done or not chunk:
+            return []
+
+        self._text += chunk
+        text = self._text
+        events = []
+        i = self._pos
+
+        while i < len(text):
+            ch = text[i]
+
+            if not self._started:
+                if ch == '{':
+                    self._started = True
+                    self._depth = 1
+                i += 1
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == '\\':
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = text[self._string_start + 1:i]
+                i += 1
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in '{[':
+                self._depth += 1
+                if self._depth == 2 and ch == '[':
+                    self._array = self._last_key
+                elif self._depth == 3 and self._array in ("nodes", "edges"):
+                    self._element_start = i
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 2 and self._element_start is not None:
+                    events.extend(self._emit(text[self._element_start:i + 1]))
+                    self._element_start = None
+                elif self._depth == 1:
+                    self._array = None
+                elif self._depth == 0:
+                    self._done = True
+                    i += 1
+                    break
+            i += 1
+
+        # Drop text that can no longer be part of a pending element
+        keep_from = i
+        if self._element_start is not None:
+            keep_from = self._element_start
+        elif self._in_string and self._depth == 1:
+            keep_from = self._string_start
+        self._text = text[keep_from:]
+        self._pos = i - keep_from
+        if self._element_start is not None:
+            self._element_start -= keep_from
+        if self._string_start is not None:
+            self._string_start -= keep_from
+
+        return events
+
+    def _emit(self, raw: str) -> List[Tuple[str, object]]:
+        try:
+            item = json.loads(raw)
+        except ValueError:
+            return []
+        if self._array == "nodes" and isinstance(item, dict):
+            return [("node", item)]
+        if self._array == "edges" and isinstance(item, list):
+            return [("edge", item)]
+        return []
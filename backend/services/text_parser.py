@@ -1,7 +1,29 @@
 import re
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, Iterator, Tuple, Union
 
-def parse_text_to_flowchart(text: str) -> Dict:
+from services.metrics import timed
+from services.nested_parser import parse_nested_text
+from services.node_types import classify_text
+
+# 'flat' is the original one-level syntax below; 'nested' is the
+# indentation-aware grammar in services.nested_parser
+TEXT_SYNTAXES = ('flat', 'nested')
+
+_BULLET = re.compile(r'^[-*•]\s*')
+_NUMBERING = re.compile(r'^\d+\.\s*')
+_ELSE_PREFIX = re.compile(r'^(else|otherwise|no)[:\s]*', re.IGNORECASE)
+_DECISION_WORDS = ('if', 'check', 'validate', '?')
+
+def parse_text(text: Union[str, Iterable[str]], syntax: str = 'flat') -> Dict:
+    """Parse a spec written in one of TEXT_SYNTAXES."""
+    if syntax not in TEXT_SYNTAXES:
+        raise ValueError(f"Unknown syntax '{syntax}', expected one of {', '.join(TEXT_SYNTAXES)}")
+    with timed("parse"):
+        if syntax == 'nested':
+            return parse_nested_text(text)
+        return parse_text_to_flowchart(text)
+
+def parse_text_to_flowchart(text: Union[str, Iterable[str]]) -> Dict:
     """
     Parse structured text into flowchart nodes and edges.
     Supports formats like:
@@ -11,108 +33,104 @@ def parse_text_to_flowchart(text: str) -> Dict:
     - If valid -> Save to DB
     - Else -> Error
     - End
+
+    ``text`` may also be any iterable of lines (e.g. an open file), which is
+    read in one pass without holding the whole spec in memory.
     """
-    lines = [line.strip() for line in text.split('\n') if line.strip()]
-    
+    lines = _split_lines(text) if isinstance(text, str) else text
+
     nodes = []
     edges = []
     node_id = 1
-    node_map = {}
+    seen_texts = set()
     last_node_id = None
     condition_stack = []
-    
-    for line in lines:
-        # Remove bullet points and numbering
-        line = re.sub(r'^[-*•]\s*', '', line)
-        line = re.sub(r'^\d+\.\s*', '', line)
-        
-        # Check for conditional branches
-        if '->' in line:
-            parts = line.split('->')
-            condition = parts[0].strip()
-            action = parts[1].strip() if len(parts) > 1 else ""
-            
+
+    def add_node(node_text: str, node_type: str) -> str:
+        nonlocal node_id
+        new_id = str(node_id)
+        nodes.append({
+            "id": new_id,
+            "text": node_text,
+            "type": node_type
+        })
+        seen_texts.add(node_text.lower())
+        node_id += 1
+        return new_id
+
+    for kind, first, second in _tokens(lines):
+        if kind == 'branch':
+            condition, action = first, second
+
             # Create condition node if not exists
-            if condition.lower() not in [n['text'].lower() for n in nodes]:
-                node_type = 'decision' if any(kw in condition.lower() for kw in ['if', 'check', 'validate', '?']) else 'process'
-                nodes.append({
-                    "id": str(node_id),
-                    "text": condition,
-                    "type": node_type
-                })
-                node_map[condition.lower()] = str(node_id)
-                
+            condition_lower = condition.lower()
+            if condition_lower not in seen_texts:
+                node_type = 'decision' if any(kw in condition_lower for kw in _DECISION_WORDS) else 'process'
+                new_id = add_node(condition, node_type)
                 if last_node_id:
-                    edges.append([last_node_id, str(node_id)])
-                
-                condition_stack.append(str(node_id))
-                last_node_id = str(node_id)
-                node_id += 1
-            
+                    edges.append([last_node_id, new_id])
+                condition_stack.append(new_id)
+                last_node_id = new_id
+
             # Create action node
             if action:
-                node_type = get_node_type(action)
-                nodes.append({
-                    "id": str(node_id),
-                    "text": action,
-                    "type": node_type
-                })
-                
+                new_id = add_node(action, classify_text(action))
                 if condition_stack:
-                    edges.append([condition_stack[-1], str(node_id), "yes"])
-                
-                last_node_id = str(node_id)
-                node_id += 1
-        
-        elif line.lower().startswith(('else', 'otherwise', 'no')):
+                    edges.append([condition_stack[-1], new_id, "yes"])
+                last_node_id = new_id
+
+        elif kind == 'else':
             # Handle else branch
-            action = re.sub(r'^(else|otherwise|no)[:\s]*', '', line, flags=re.IGNORECASE).strip()
-            if action:
-                node_type = get_node_type(action)
-                nodes.append({
-                    "id": str(node_id),
-                    "text": action,
-                    "type": node_type
-                })
-                
+            if first:
+                new_id = add_node(first, classify_text(first))
                 if condition_stack:
-                    edges.append([condition_stack[-1], str(node_id), "no"])
+                    edges.append([condition_stack[-1], new_id, "no"])
                     condition_stack.pop()
-                
-                last_node_id = str(node_id)
-                node_id += 1
-        
+                last_node_id = new_id
+
         else:
             # Regular node
-            node_type = get_node_type(line)
-            nodes.append({
-                "id": str(node_id),
-                "text": line,
-                "type": node_type
-            })
-            
+            new_id = add_node(first, classify_text(first))
             if last_node_id:
-                edges.append([last_node_id, str(node_id)])
-            
-            last_node_id = str(node_id)
-            node_id += 1
-    
+                edges.append([last_node_id, new_id])
+            last_node_id = new_id
+
     return {
         "nodes": nodes,
         "edges": edges
     }
 
+def _split_lines(text: str) -> Iterator[str]:
+    """Lines of ``text`` one at a time, without building the list of all of them."""
+    start = 0
+    while True:
+        end = text.find('\n', start)
+        if end < 0:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
+
+def _tokens(lines: Iterable[str]) -> Iterator[Tuple[str, str, str]]:
+    """
+    One (kind, first, second) token per non-blank line, bullets and numbering
+    removed: ('branch', condition, action) for "a -> b", ('else', action, '')
+    for else/otherwise/no lines and ('step', text, '') for anything else.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        line = _NUMBERING.sub('', _BULLET.sub('', line, count=1), count=1)
+
+        if '->' in line:
+            parts = line.split('->', 2)
+            yield 'branch', parts[0].strip(), parts[1].strip()
+        elif line[:9].lower().startswith(('else', 'otherwise', 'no')):
+            yield 'else', _ELSE_PREFIX.sub('', line, count=1).strip(), ''
+        else:
+            yield 'step', line, ''
+
 def get_node_type(text: str) -> str:
     """Determine node type based on text content."""
-    text_lower = text.lower()
-    
-    if any(kw in text_lower for kw in ['start', 'begin']):
-        return 'start'
-    elif any(kw in text_lower for kw in ['end', 'finish', 'stop', 'exit']):
-        return 'end'
-    elif any(kw in text_lower for kw in ['if', 'check', 'validate', 'verify', '?', 'decision']):
-        return 'decision'
-    elif any(kw in text_lower for kw in ['input', 'output', 'print', 'display', 'show', 'read', 'get']):
-        return 'io'
-    else:
-        return 'process'
+    return classify_text(text)
@@ -0,0 +1,133 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional
+
+# Image jobs: IMAGE_WORKERS processes (0 runs jobs on the default thread pool;
+# by default up to 4, with the cores divided among the web workers) with at
+# most IMAGE_QUEUE_SIZE jobs waiting behind the running ones.
+DEFAULT_IMAGE_QUEUE_SIZE = 8
+
+class QueueFullError(Exception):
+    """Raised when a worker pool cannot accept more jobs."""
+
+class WorkerCrashedError(Exception):
+    """Raised when a worker process died during a job; the pool is rebuilt for the next one."""
+
+def _warm_worker():
+    """Process initializer: pay the OpenCV/tesseract imports once per worker."""
+    import services.image_processor  # noqa: F401
+
+def _ping() -> int:
+    return os.getpid()
+
+# Job functions are submitted by reference, so the API process only imports
+# this module; OpenCV and tesseract are loaded where the job runs.
+def process_image(image_bytes: bytes) -> Dict:
+    """Extract the chart of an upload (see services.image_processor)."""
+    from services.image_processor import process_image_to_flowchart
+    return process_image_to_flowchart(image_bytes)
+
+def tesseract_version() -> str:
+    """Run tesseract once so its binary and language data are loaded."""
+    from services.image_processor import warm_tesseract
+    try:
+        return warm_tesseract()
+    except Exception as e:
+        # pytesseract's errors do not unpickle, and one that cannot be sent
+        # back marks the whole pool as broken
+        raise RuntimeError(str(e)) from None
+
+class ImageWorkerPool:
+    """
+    Process pool for CPU-bound image jobs with a bounded queue.
+
+    Jobs are admitted while fewer than ``max_workers + max_queue`` are
+    pending; beyond that ``submit`` raises QueueFullError so the API can
+    answer 503 instead of piling up uploads in memory. Image bytes are
+    passed to the worker as-is (one pickle, no intermediate buffers).
+
+    A worker that dies (crash, OOM kill) breaks the whole executor: the
+    jobs it took down raise WorkerCrashedError and the next job starts a
+    fresh executor.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int = DEFAULT_IMAGE_QUEUE_SIZE):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.pending = 0
+        self.rejected = 0
+        self.restarts = 0
+        self._executor = None
+
+    @classmethod
+    def from_env(cls) -> "ImageWorkerPool":
+        from services.startup import web_workers
+        # Every web worker runs its own pool, so the cores are shared out between them
+        workers = int(os.getenv("IMAGE_WORKERS", max(1, min(4, (os.cpu_count() or 1) // web_workers()))))
+        queue_size = int(os.getenv("IMAGE_QUEUE_SIZE", DEFAULT_IMAGE_QUEUE_SIZE))
+        return cls(workers, queue_size)
+
+    @property
+    def capacity(self) -> int:
+        return max(1, self.max_workers) + self.max_queue
+
+    async def start(self) -> None:
+        """Create the worker processes and wait until each one has loaded its imports."""
+        if self._executor is not None or self.max_workers <= 0:
+            return
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_warm_worker)
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, _ping) for _ in range(self.max_workers)))
+
+    async def submit(self, fn: Callable, *args):
+        """Run ``fn(*args)`` in a worker and await its result."""
+        if self.pending >= self.capacity:
+            self.rejected += 1
+            raise QueueFullError(f"Image queue is full ({self.pending} jobs pending), retry later")
+
+        self.pending += 1
+        executor = None
+        try:
+            if self.max_workers > 0 and self._executor is None:
+                await self.start()
+            executor = self._executor
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool as e:
+            self._discard(executor)
+            raise WorkerCrashedError(f"Image worker crashed, retry later ({e})") from None
+        finally:
+            self.pending -= 1
+
+    def _discard(self, executor) -> None:
+        """Drop a broken executor, unless an earlier failed job already replaced it."""
+        if executor is None or executor is self._executor:
+            print("⚠️ Image worker pool broken, restarting it")
+            self.restarts += 1
+            self.shutdown()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "queue_size": self.max_queue,
+            "pending": self.pending,
+            "rejected": self.rejected,
+            "restarts": self.restarts
+        }
+
+image_pool: Optional[ImageWorkerPool] = None
+
+def get_image_pool() -> ImageWorkerPool:
+    """Get or create the shared image worker pool (configured from the environment)."""
+    global image_pool
+
+    if image_pool is None:
+        image_pool = ImageWorkerPool.from_env()
+    return image_pool
@@ -0,0 +1,36 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+client = TestClient(main.app)
+
+@pytest.mark.parametrize("field, value", [("layout", "foo"), ("orientation", "diagonal"), ("syntax", "yaml")])
+def test_unknown_text_options_are_rejected(field, value):
+    response = client.post("/api/text-to-flowchart", json={"text": "Start\nEnd", field: value})
+    assert response.status_code == 422
+
+@pytest.mark.parametrize("layout", ["hierarchical", "layered"])
+@pytest.mark.parametrize("orientation", ["horizontal", "vertical"])
+def test_known_text_options_are_accepted(layout, orientation):
+    response = client.post("/api/text-to-flowchart",
+                           json={"text": "Start\nWork\nEnd", "layout": layout, "orientation": orientation})
+    assert response.status_code == 200
+    assert all("position" in node for node in response.json()["nodes"])
+
+def test_nested_syntax_is_accepted():
+    response = client.post("/api/text-to-flowchart",
+                           json={"text": "Start\nif ok:\n    Ship\nEnd", "syntax": "nested"})
+    assert response.status_code == 200
+    assert len(response.json()["nodes"]) == 4
+
+def test_unknown_image_option_is_rejected():
+    response = client.post("/api/image-to-flowchart?layout=foo",
+                           files={"file": ("chart.png", b"not an image", "image/png")})
+    assert response.status_code == 422
+
+@pytest.mark.parametrize("path", ["/api/export/pdf", "/api/export/pdf/stream"])
+def test_unknown_pdf_mode_is_rejected(path):
+    chart = {"nodes": [{"id": "1", "text": "Start", "position": {"x": 0, "y": 0}}], "edges": []}
+    assert client.post(f"{path}?mode=poster", json=chart).status_code == 422
+    assert client.post(f"{path}?mode=fit", json=chart).status_code == 200
@@ -0,0 +1,68 @@
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from services.batch import BatchWorkerPool, iter_batch, read_jsonl
+from services.workers import QueueFullError
+
+def _frames(response):
+    return [orjson.loads(line) for line in response.content.splitlines()]
+
+def test_bad_lines_fail_only_their_document():
+    lines = [b'"Start\\nEnd"', b"123", b"[]", b"{not json", b'{"id": "ok", "text": "A\\nB"}']
+    results = {result["id"]: result for result in iter_batch(read_jsonl(lines), workers=0)}
+    assert "error" not in results["0"]
+    assert "error" not in results["ok"]
+    assert results["1"]["error"] == results["2"]["error"] == "Document is not a JSON object or string"
+    assert results["3"]["error"].startswith("Invalid JSON")
+
+def test_bad_options_fail_only_their_document():
+    lines = [b'{"id": "a", "text": "A\\nB", "orientation": "diagonal"}', b'{"id": "b", "text": "A\\nB", "layout": 3}',
+             b'{"id": "c", "text": "A\\nB", "layout": "layered", "orientation": "vertical"}']
+    results = {result["id"]: result for result in iter_batch(read_jsonl(lines), workers=0)}
+    assert results["a"]["error"] == "Unknown orientation 'diagonal', expected one of horizontal, vertical"
+    assert results["b"]["error"].startswith("Unknown layout '3'")
+    assert "error" not in results["c"]
+
+def test_unknown_export_format_is_rejected():
+    response = TestClient(main.app).post("/api/batch/text-to-flowchart?format=gif", content=b'"Start\\nEnd"\n')
+    assert response.status_code == 422
+
+def test_endpoint_answers_bad_lines_with_error_frames(monkeypatch):
+    monkeypatch.setattr(main, "get_batch_pool", lambda: BatchWorkerPool(max_workers=0))
+    body = b'"Start\\nEnd"\n123\n{"text": "A\\nB"}\n'
+    response = TestClient(main.app).post("/api/batch/text-to-flowchart", content=body)
+    frames = _frames(response)
+    assert response.status_code == 200
+    assert sorted(frame["type"] for frame in frames[:-1]) == ["error", "result", "result"]
+    assert [frame["id"] for frame in frames if frame["type"] == "error"] == ["1"]
+    assert (frames[-1]["type"], frames[-1]["documents"], frames[-1]["failed"]) == ("done", 3, 1)
+
+def test_full_pool_is_refused_with_503(monkeypatch):
+    pool = BatchWorkerPool(max_workers=0, max_batches=1)
+    monkeypatch.setattr(main, "get_batch_pool", lambda: pool)
+    release = pool.admit()
+    with pytest.raises(QueueFullError):
+        pool.admit()
+    client = TestClient(main.app)
+    response = client.post("/api/batch/text-to-flowchart", content=b'"Start\\nEnd"\n')
+    assert response.status_code == 503
+    release()
+    release()
+    assert pool.running == 0
+    response = client.post("/api/batch/text-to-flowchart", content=b'"Start\\nEnd"\n')
+    assert response.status_code == 200
+    assert pool.running == 0
+
+def test_shared_pool_runs_several_batches():
+    pool = BatchWorkerPool(max_workers=1)
+    try:
+        for _ in range(2):
+            release = pool.admit()
+            results = list(pool.run([{"text": "Start\nEnd"}] * 5))
+            release()
+            assert len(results) == 5 and not any("error" in result for result in results)
+        assert pool.stats()["restarts"] == 0
+    finally:
+        pool.shutdown()
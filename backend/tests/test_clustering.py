@@ -0,0 +1,30 @@
+from services.clustering import find_clusters
+from services.graph import CompactGraph
+
+def _graph(num_nodes, edges):
+    nodes = [{"id": str(i)} for i in range(num_nodes)]
+    return CompactGraph.from_flowchart(nodes, [[str(u), str(v)] for u, v in edges])
+
+def _loop(num_nodes):
+    return [(i, (i + 1) % num_nodes) for i in range(num_nodes)]
+
+def test_small_loop_is_one_cycle_cluster():
+    assert find_clusters(_graph(5, _loop(5)), max_size=10) == [("cycle", [0, 1, 2, 3, 4])]
+
+def test_oversized_bare_loop_collapses_as_chains():
+    clusters = find_clusters(_graph(25, _loop(25)), max_size=10)
+    assert [kind for kind, _ in clusters] == ["chain", "chain", "chain"]
+    assert [members for _, members in clusters] == [list(range(0, 10)), list(range(10, 20)), list(range(20, 25))]
+
+def test_oversized_loop_with_an_entry_is_walked_from_the_entry():
+    # 25 -> 3 gives the loop a second way into 3, so its chain starts there
+    clusters = find_clusters(_graph(26, _loop(25) + [(25, 3)]), max_size=30)
+    assert clusters == [("cycle", list(range(25)))]
+    clusters = find_clusters(_graph(26, _loop(25) + [(25, 3)]), max_size=10)
+    assert [members[0] for _, members in clusters] == [3, 13, 23]
+    assert sorted(v for _, members in clusters for v in members) == list(range(25))
+
+def test_long_chain_is_cut_and_short_ones_stay():
+    chain = [(i, i + 1) for i in range(22)]
+    assert [len(members) for _, members in find_clusters(_graph(23, chain), max_size=10)] == [10, 10, 3]
+    assert find_clusters(_graph(2, [(0, 1)])) == []
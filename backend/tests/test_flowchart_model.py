@@ -0,0 +1,39 @@
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from services.flowchart_model import FlowchartColumns, encode_chart
+
+CHART = {
+    "nodes": [
+        {"id": "a", "text": "Start", "type": "start", "position": {"x": 0, "y": 150}},
+        {"id": "b", "text": "Work", "type": "process", "position": {"x": 300, "y": -20}},
+        {"id": "c", "text": "Later", "type": "process"},
+    ],
+    "edges": [["a", "b"], ["b", "c", "next"]],
+}
+
+def test_integer_positions_round_trip_as_integers():
+    wire = orjson.loads(orjson.dumps(encode_chart(CHART, 'columnar')))
+    assert wire["x"] == [0, 300, None]
+    assert all(type(value) is int for value in wire["y"][:2])
+    assert FlowchartColumns.from_wire(wire).to_flowchart() == CHART
+
+def test_float_positions_stay_floats():
+    chart = {"nodes": [{"id": "a", "text": "A", "type": "process", "position": {"x": 12.5, "y": 3}}], "edges": []}
+    wire = orjson.loads(orjson.dumps(encode_chart(chart, 'columnar')))
+    assert wire["x"] == [12.5] and type(wire["y"][0]) is float
+    assert FlowchartColumns.from_wire(wire).to_flowchart()["nodes"][0]["position"] == {"x": 12.5, "y": 3.0}
+
+@pytest.mark.parametrize("field, value", [("x", [10 ** 400]), ("source", [2 ** 40])])
+def test_huge_numbers_are_malformed(field, value):
+    wire = encode_chart({"nodes": CHART["nodes"][:1], "edges": [["a", "a"]]}, 'columnar')
+    if field == "source":
+        wire["edges"]["source"] = value
+    else:
+        wire[field] = value
+    with pytest.raises(ValueError):
+        FlowchartColumns.from_wire(wire)
+    response = TestClient(main.app).post("/api/export/svg", json={"columns": wire})
+    assert response.status_code == 400
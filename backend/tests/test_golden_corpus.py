@@ -0,0 +1,14 @@
+import pytest
+
+from benchmarks.bench_connectors import score_case
+from benchmarks.golden_corpus import iter_cases
+
+# Connector detection is exact on every corpus case today; any regression fails here
+CORPUS = list(iter_cases())
+
+@pytest.mark.parametrize("name, image, truth", CORPUS, ids=[case[0] for case in CORPUS])
+def test_connector_detection_on_golden_corpus(name, image, truth):
+    score = score_case(image, truth)
+    assert score["boxes"] == len(truth["centers"])
+    assert score["precision"] == 1.0
+    assert score["recall"] == 1.0
@@ -0,0 +1,39 @@
+import asyncio
+import os
+
+import pytest
+
+from services.workers import ImageWorkerPool, QueueFullError, WorkerCrashedError
+
+def _square(x: int) -> int:
+    return x * x
+
+def _die() -> None:
+    # What an OOM kill looks like from the pool's side
+    os._exit(1)
+
+def test_crashed_worker_fails_its_job_and_the_pool_recovers():
+    async def scenario():
+        pool = ImageWorkerPool(max_workers=1, max_queue=2)
+        try:
+            assert await pool.submit(_square, 3) == 9
+            with pytest.raises(WorkerCrashedError):
+                await pool.submit(_die)
+            assert await pool.submit(_square, 4) == 16
+            return pool.stats()
+        finally:
+            pool.shutdown()
+
+    stats = asyncio.run(scenario())
+    assert stats["restarts"] == 1
+    assert stats["pending"] == 0
+
+def test_full_queue_is_rejected():
+    async def scenario():
+        pool = ImageWorkerPool(max_workers=0, max_queue=0)
+        pool.pending = pool.capacity
+        with pytest.raises(QueueFullError):
+            await pool.submit(_square, 2)
+        return pool.stats()
+
+    assert asyncio.run(scenario())["rejected"] == 1
@@ -0,0 +1,90 @@
+import random
+
+import pytest
+
+from services.incremental_layout import IncrementalLayout, apply_incremental_layout
+from services.layout_engine import apply_auto_layout
+
+def make_dag(num_nodes: int, rng: random.Random):
+    """Nodes "1".."n" with edges only from lower to higher numbers, so every node is below a source."""
+    nodes = [{"id": str(i), "text": f"Step {i}", "type": "process"} for i in range(1, num_nodes + 1)]
+    edges = []
+    for i in range(2, num_nodes + 1):
+        for _ in range(rng.randint(0, 2)):
+            edges.append([str(rng.randint(1, i - 1)), str(i)])
+    return {"nodes": nodes, "edges": edges}
+
+def random_edit(chart, rng: random.Random, next_id: int):
+    """A diff that keeps the chart acyclic: edges always go from a lower to a higher number."""
+    ids = [node["id"] for node in chart["nodes"]]
+    kind = rng.choice(["add_node", "remove_node", "add_edge", "remove_edge"])
+    if kind == "add_node" or len(ids) < 3:
+        new = str(next_id)
+        edges = [[rng.choice(ids), new]] if ids and rng.random() < 0.8 else []
+        return {"added_nodes": [{"id": new, "text": f"New {new}", "type": "process"}], "added_edges": edges}
+    if kind == "remove_node":
+        return {"removed_nodes": [rng.choice(ids)]}
+    if kind == "remove_edge" and chart["edges"]:
+        return {"removed_edges": [list(rng.choice(chart["edges"])[:2])]}
+    a, b = sorted(rng.sample(ids, 2), key=int)
+    return {"added_edges": [[a, b]]}
+
+def full_levels(chart, orientation):
+    fresh = {"nodes": [{k: v for k, v in node.items() if k not in ("position", "level")} for node in chart["nodes"]],
+             "edges": [list(edge) for edge in chart["edges"]]}
+    return {node["id"]: node["level"] for node in apply_auto_layout(fresh, orientation)["nodes"]}
+
+def assert_no_overlaps(chart):
+    positions = [(node["position"]["x"], node["position"]["y"]) for node in chart["nodes"]]
+    assert len(positions) == len(set(positions))
+
+@pytest.mark.parametrize("orientation", ["horizontal", "vertical"])
+@pytest.mark.parametrize("seed", range(8))
+def test_session_edits_match_full_layout_levels(seed, orientation):
+    rng = random.Random(seed)
+    chart = apply_auto_layout(make_dag(60, rng), orientation)
+    layout = IncrementalLayout(chart, orientation)
+    for step in range(40):
+        layout.apply(random_edit(layout.chart(), rng, 1000 + step))
+        current = layout.chart()
+        assert {node["id"]: node["level"] for node in current["nodes"]} == full_levels(current, orientation)
+        assert_no_overlaps(current)
+
+@pytest.mark.parametrize("seed", range(4))
+def test_stateless_edits_match_full_layout_levels(seed):
+    rng = random.Random(seed)
+    chart = apply_auto_layout(make_dag(40, rng))
+    for step in range(20):
+        result = apply_incremental_layout(chart, random_edit(chart, rng, 1000 + step))
+        chart = {"nodes": result["nodes"], "edges": result["edges"]}
+        assert {node["id"]: node["level"] for node in chart["nodes"]} == full_levels(chart, 'horizontal')
+        assert_no_overlaps(chart)
+
+def test_levels_are_carried_not_read_from_coordinates():
+    chart = apply_auto_layout({"nodes": [{"id": "a", "text": "A"}, {"id": "b", "text": "B"}],
+                               "edges": [["a", "b"]]})
+    # Dragged far away: a coordinate-based guess would put "b" on a much later level
+    chart["nodes"][1]["position"] = {"x": 5000, "y": 40}
+    result = apply_incremental_layout(chart, {"added_nodes": [{"id": "c", "text": "C"}],
+                                              "added_edges": [["b", "c"]]})
+    placed = {node["id"]: node for node in result["nodes"]}
+    assert result["moved_nodes"] == ["c"]
+    assert placed["c"]["level"] == 2
+    assert placed["b"]["position"] == {"x": 5000, "y": 40}
+
+def test_layered_levels_are_kept():
+    chart = apply_auto_layout(make_dag(30, random.Random(1)), 'horizontal', 'layered')
+    layout = IncrementalLayout(chart)
+    before = {node["id"]: node["level"] for node in chart["nodes"]}
+    layout.apply({"added_nodes": [{"id": "new", "text": "New"}], "added_edges": [["30", "new"]]})
+    after = {node["id"]: node["level"] for node in layout.chart()["nodes"]}
+    assert after.pop("new") == before["30"] + 1
+    assert after == before
+
+def test_edit_only_touches_the_affected_set():
+    chart = apply_auto_layout(make_dag(2000, random.Random(2)))
+    layout = IncrementalLayout(chart)
+    untouched = {node["id"]: dict(node["position"]) for node in chart["nodes"]}
+    moved = layout.apply({"added_nodes": [{"id": "leaf", "text": "Leaf"}], "added_edges": [["7", "leaf"]]})
+    assert moved == ["leaf"]
+    assert all(layout.nodes[node_id]["position"] == position for node_id, position in untouched.items())
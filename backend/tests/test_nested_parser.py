@@ -0,0 +1,130 @@
+import random
+
+import pytest
+
+from services.nested_parser import NestedDocument, parse_nested_text
+
+def shape(chart):
+    """Nodes as (text, type) in document order and edges between their positions, so ids don't matter."""
+    order = {node["id"]: i for i, node in enumerate(chart["nodes"])}
+    nodes = [(node["text"], node["type"]) for node in chart["nodes"]]
+    edges = sorted((order[edge[0]], order[edge[1]], edge[2] if len(edge) > 2 else None) for edge in chart["edges"])
+    return nodes, edges
+
+def edges_by_text(chart):
+    text = {node["id"]: node["text"] for node in chart["nodes"]}
+    return sorted((text[edge[0]], text[edge[1]], edge[2] if len(edge) > 2 else None) for edge in chart["edges"])
+
+def by_id(chart):
+    nodes = sorted((node["id"], node["text"], node["type"]) for node in chart["nodes"])
+    return nodes, sorted(tuple(edge) for edge in chart["edges"])
+
+def apply_diff(chart, diff):
+    """What a layout client does with an edit's diff: edges are removed by (from, to) pair."""
+    removed = set(diff["removed_nodes"])
+    added = {node["id"]: node for node in diff["added_nodes"]}
+    nodes = [added.pop(node["id"], node) for node in chart["nodes"] if node["id"] not in removed]
+    pairs = {(edge[0], edge[1]) for edge in diff["removed_edges"]}
+    edges = [edge for edge in chart["edges"] if (edge[0], edge[1]) not in pairs]
+    return {"nodes": nodes + list(added.values()), "edges": edges + diff["added_edges"]}
+
+def test_nested_if_elif_else():
+    chart = parse_nested_text("Start\nif in stock:\n    if express:\n        Ship today\n    Pack order\n"
+                              "else if backordered:\n    Notify customer\nelse:\n    Cancel order\nEnd")
+    assert edges_by_text(chart) == [
+        ("Cancel order", "End", None),
+        ("If backordered", "Cancel order", "no"),
+        ("If backordered", "Notify customer", "yes"),
+        ("Notify customer", "End", None),
+        ("Pack order", "End", None),
+        ("Ship today", "Pack order", None),
+        ("Start", "if in stock", None),
+        ("if express", "Pack order", "no"),
+        ("if express", "Ship today", "yes"),
+        ("if in stock", "If backordered", "no"),
+        ("if in stock", "if express", "yes"),
+    ]
+    types = {node["text"]: node["type"] for node in chart["nodes"]}
+    assert types["if in stock"] == types["If backordered"] == types["if express"] == "decision"
+
+def test_while_loops_back_to_its_condition():
+    chart = parse_nested_text("Start\nwhile items left:\n    Pick item\n    Pack item\nShip order")
+    assert edges_by_text(chart) == [
+        ("Pack item", "while items left", None),
+        ("Pick item", "Pack item", None),
+        ("Start", "while items left", None),
+        ("while items left", "Pick item", "yes"),
+        ("while items left", "Ship order", "no"),
+    ]
+
+@pytest.mark.parametrize("text, until", [
+    ("Start\nrepeat:\n    Send invoice\n    Wait a week\nuntil paid\nClose account", "until paid"),
+    ("Start\nrepeat until paid:\n    Send invoice\n    Wait a week\nClose account", "Until paid"),
+])
+def test_repeat_until_runs_the_body_first(text, until):
+    chart = parse_nested_text(text)
+    assert edges_by_text(chart) == sorted([
+        ("Start", "Send invoice", None),
+        ("Send invoice", "Wait a week", None),
+        ("Wait a week", until, None),
+        (until, "Send invoice", "no"),
+        (until, "Close account", "yes"),
+    ])
+
+@pytest.mark.parametrize("reference", ["2", "step 2", "Get order", "get order."])
+def test_goto_by_step_number_and_text(reference):
+    chart = parse_nested_text(f"1. Start\n2. Get order\nif in stock:\n    Ship order\nelse:\n"
+                              f"    Wait a day\n    goto {reference}\nEnd")
+    assert ("Wait a day", "Get order", None) in edges_by_text(chart)
+    assert len(chart["nodes"]) == 6
+
+def test_goto_goes_to_the_first_matching_step_and_drops_unknown_ones():
+    chart = parse_nested_text("Retry\nLoad\nRetry\nif failed:\n    goto retry\nelse:\n    goto nowhere\n")
+    ids = [node["id"] for node in chart["nodes"]]
+    assert [edge for edge in chart["edges"] if edge[0] == ids[3]] == [[ids[3], ids[0], "yes"]]
+
+def make_spec(num_lines: int, rng: random.Random):
+    """Random nested spec with gotos to numbered and named steps, some of them repeated."""
+    lines = []
+    while len(lines) < num_lines:
+        i = len(lines)
+        roll = rng.random()
+        if roll < 0.15:
+            lines += [f"if check {i % 7}:", f"    Step {i % 5}", "else:", f"    goto {rng.choice(['Step 1', 'Step 3', '4', 'Missing'])}"]
+        elif roll < 0.25:
+            lines += [f"while more {i}:", f"    {i}. Step {i % 5}"]
+        elif roll < 0.3:
+            lines += ["repeat:", f"    Step {i % 5}", f"until done {i}"]
+        elif roll < 0.35:
+            lines.append(f"goto {rng.choice(['Step 2', '4'])}")
+        else:
+            lines.append(f"{i}. Step {i % 5}" if rng.random() < 0.3 else f"Step {i % 5}")
+    return lines
+
+def random_lines(rng: random.Random):
+    choices = ["Step 1", "Step 3", "    Step 2", "4. Step 4", "goto Step 1", "    goto 4", "if new:", "else:",
+               "while again:", "repeat:", "until ok", "    Nested", "", "End"]
+    return [rng.choice(choices) for _ in range(rng.randint(0, 3))]
+
+@pytest.mark.parametrize("seed", range(10))
+def test_edits_match_a_fresh_parse(seed):
+    rng = random.Random(seed)
+    document = NestedDocument(make_spec(60, rng))
+    chart = document.chart()
+    for _ in range(60):
+        start = rng.randint(0, len(document.lines))
+        end = min(len(document.lines), start + rng.randint(0, 3))
+        chart = apply_diff(chart, document.edit(start, end, random_lines(rng)))
+        assert shape(document.chart()) == shape(parse_nested_text(document.text))
+        assert by_id(chart) == by_id(document.chart())
+
+def test_edit_keeps_ids_of_unchanged_nodes():
+    document = NestedDocument("Start\nGet order\nif ok:\n    Ship\n    goto Get order\nEnd")
+    before = {node["text"]: node["id"] for node in document.chart()["nodes"]}
+    diff = document.edit(3, 4, ["    Ship express"])
+    after = {node["text"]: node["id"] for node in document.chart()["nodes"]}
+    assert after["Ship express"] == before["Ship"]
+    assert {text: after[text] for text in ("Start", "Get order", "if ok", "End")} == \
+        {text: before[text] for text in ("Start", "Get order", "if ok", "End")}
+    assert diff["removed_nodes"] == []
+    assert [node["text"] for node in diff["added_nodes"]] == ["Ship express"]
@@ -0,0 +1,27 @@
+import io
+
+from reportlab import rl_config
+
+from services.pdf_export import write_pdf
+
+def _pdf(nodes, edges, mode='tile') -> bytes:
+    buffer = io.BytesIO()
+    write_pdf(buffer, nodes, edges, mode)
+    return buffer.getvalue()
+
+def test_reportlab_config_is_left_alone():
+    before = rl_config.useA85
+    data = _pdf([{"id": "a", "text": "A", "type": "start", "position": {"x": 0, "y": 0}}], [])
+    assert rl_config.useA85 == before
+    assert b"ASCII85Decode" not in data
+
+def test_diagonal_edge_only_lands_on_tiles_it_crosses():
+    nodes = [
+        {"id": "a", "text": "A", "type": "start", "position": {"x": 0, "y": 0}},
+        {"id": "b", "text": "B", "type": "end", "position": {"x": 6000, "y": 6000}},
+    ]
+    with_edge = _pdf(nodes, [["a", "b"]]).count(b"/Type /Page\n")
+    # The bounding box of the edge covers 9 x 7 tiles; its segment crosses a
+    # diagonal of them, plus the neighbours its arrowhead and width reach into
+    assert with_edge < 20
+    assert with_edge > _pdf(nodes, []).count(b"/Type /Page\n")
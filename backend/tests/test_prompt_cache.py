@@ -0,0 +1,142 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from services import cache as cache_module
+from services.ai_generator import (
+    fallback_flowchart, generate_flowchart_from_prompt, generate_flowchart_from_prompt_async
+)
+from services.cache import MemoryCache, SQLiteCache
+
+CHART = {"nodes": [{"id": "1", "text": "Start", "type": "start"}], "edges": []}
+
+def _response(content: str):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+class FakeGroq:
+    """Stands in for groq.Groq: counts completions and answers with a fixed chart (or fails)."""
+
+    def __init__(self, content: str = json.dumps(CHART), error: Exception = None):
+        self.calls = 0
+        self.content = content
+        self.error = error
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return _response(self.content)
+
+class FakeAsyncGroq(FakeGroq):
+    async def create(self, **kwargs):
+        return super().create(**kwargs)
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A controllable time.time() for the cache module."""
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    return now
+
+def test_cache_hit_skips_the_client():
+    client = FakeGroq()
+    cache = MemoryCache()
+    assert generate_flowchart_from_prompt("Make tea", client, cache) == CHART
+    # Same prompt up to case and whitespace
+    assert generate_flowchart_from_prompt("  make   TEA ", client, cache) == CHART
+    assert client.calls == 1
+    assert cache.hits == 1
+
+def test_async_cache_hit_skips_the_client():
+    client = FakeAsyncGroq()
+    cache = MemoryCache()
+    assert asyncio.run(generate_flowchart_from_prompt_async("Make tea", client, cache)) == CHART
+    assert asyncio.run(generate_flowchart_from_prompt_async("make tea", client, cache)) == CHART
+    assert client.calls == 1
+
+@pytest.mark.parametrize("client", [FakeGroq(error=RuntimeError("down")), FakeGroq(content="not json")])
+def test_fallback_chart_is_not_cached(client):
+    cache = MemoryCache()
+    assert generate_flowchart_from_prompt("Make tea", client, cache) == fallback_flowchart("Make tea")
+    assert cache.stats()["size"] == 0
+    # The next call tries the LLM again and caches the real answer
+    working = FakeGroq()
+    assert generate_flowchart_from_prompt("Make tea", working, cache) == CHART
+    assert working.calls == 1
+    assert cache.stats()["size"] == 1
+
+def test_cached_value_is_a_copy():
+    cache = MemoryCache()
+    cache.set("k", CHART)
+    cache.get("k")["nodes"].clear()
+    assert cache.get("k") == CHART
+
+@pytest.mark.parametrize("make_cache", [
+    lambda tmp_path: MemoryCache(ttl=60),
+    lambda tmp_path: SQLiteCache(str(tmp_path / "cache.sqlite3"), ttl=60),
+])
+def test_entries_expire_after_ttl(tmp_path, clock, make_cache):
+    cache = make_cache(tmp_path)
+    cache.set("k", CHART)
+    clock[0] += 59
+    assert cache.get("k") == CHART
+    clock[0] += 2
+    assert cache.get("k") is None
+    assert cache.stats()["evictions"] == 1
+
+@pytest.mark.parametrize("make_cache", [
+    lambda tmp_path: MemoryCache(max_entries=2),
+    lambda tmp_path: SQLiteCache(str(tmp_path / "cache.sqlite3"), max_entries=2),
+])
+def test_least_recently_used_entry_is_evicted_by_count(tmp_path, clock, make_cache):
+    cache = make_cache(tmp_path)
+    cache.set("a", 1)
+    clock[0] += 1
+    cache.set("b", 2)
+    clock[0] += 1
+    assert cache.get("a") == 1
+    clock[0] += 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+@pytest.mark.parametrize("make_cache", [
+    lambda tmp_path: MemoryCache(max_bytes=25),
+    lambda tmp_path: SQLiteCache(str(tmp_path / "cache.sqlite3"), max_bytes=25),
+])
+def test_least_recently_used_entry_is_evicted_by_bytes(tmp_path, clock, make_cache):
+    cache = make_cache(tmp_path)
+    # Each value encodes to 12 bytes: '"' + 5 x 2-byte 'é' + '"' (6 characters)
+    value = "é" * 5
+    cache.set("a", value)
+    clock[0] += 1
+    cache.set("b", value)
+    assert cache.stats()["bytes"] == 24
+    clock[0] += 1
+    cache.set("c", value)
+    assert cache.get("a") is None
+    assert cache.get("b") == value
+    assert cache.get("c") == value
+    assert cache.stats()["bytes"] <= 25
+    # A value larger than the whole budget is never stored
+    cache.set("huge", "x" * 100)
+    assert cache.get("huge") is None
+
+def test_sqlite_cache_survives_reopen(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    SQLiteCache(path).set("k", CHART)
+    reopened = SQLiteCache(path)
+    assert reopened.get("k") == CHART
+    assert reopened.stats()["size"] == 1
+
+def test_prompt_cache_survives_reopen_without_calling_the_client(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    first = FakeGroq()
+    generate_flowchart_from_prompt("Make tea", first, SQLiteCache(path))
+    second = FakeGroq()
+    assert generate_flowchart_from_prompt("Make tea", second, SQLiteCache(path)) == CHART
+    assert second.calls == 0
@@ -0,0 +1,53 @@
+import io
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import main
+from benchmarks.bench_png import make_back_edge_chart
+from services import raster_export
+from services.raster_export import iter_png
+
+def _render(chart, band_bytes):
+    data = b"".join(iter_png(chart["nodes"], chart["edges"], band_bytes=band_bytes))
+    return np.asarray(Image.open(io.BytesIO(data)))
+
+def test_back_edge_keeps_bands_small_and_pixels_exact(monkeypatch):
+    chart = make_back_edge_chart(40)
+    whole = _render(chart, 1 << 62)
+
+    heights = []
+    new_image = Image.new
+
+    def recording_new(mode, size, color=0):
+        heights.append(size[1])
+        return new_image(mode, size, color)
+
+    monkeypatch.setattr(raster_export.Image, "new", recording_new)
+    banded = _render(chart, 200_000)
+    band_height = 200_000 // (whole.shape[1] * 3)
+    assert np.array_equal(whole, banded)
+    # A band reaches above its rows by at most one node, never up to the loop's arrowhead
+    assert max(heights) < band_height + 300
+
+def test_json_exports_answer():
+    chart = make_back_edge_chart(5)
+    client = TestClient(main.app)
+    for kind in ("png", "svg", "pdf"):
+        response = client.post(f"/api/export/{kind}", json=chart)
+        assert response.status_code == 200
+        assert response.json()["data"]
+
+@pytest.mark.parametrize("path", ["/api/export/png", "/api/export/png/stream"])
+@pytest.mark.parametrize("scale", ["0", "-1"])
+def test_non_positive_scale_is_rejected(path, scale):
+    response = TestClient(main.app).post(f"{path}?scale={scale}", json=make_back_edge_chart(3))
+    assert response.status_code == 422
+
+def test_bad_scale_fails_before_the_first_piece():
+    chart = make_back_edge_chart(3)
+    for scale in (0, -2, float("inf")):
+        with pytest.raises(ValueError):
+            next(iter_png(chart["nodes"], chart["edges"], scale))
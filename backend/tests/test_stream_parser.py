@@ -0,0 +1,84 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from services.ai_generator import fallback_flowchart, prompt_cache_key, stream_flowchart_from_prompt
+from services.cache import MemoryCache
+from services.stream_parser import FlowchartStreamParser
+
+# Strings holding brackets, braces, quotes, escapes and a fake "nodes" key,
+# so a parser that does not track string state emits the wrong elements
+TRICKY = {
+    "title": "not {an} [array] \"nodes\": [",
+    "nodes": [
+        {"id": "1", "text": "Start {here}", "type": "start"},
+        {"id": "2", "text": "Say \"hi\" \\ then ] and }", "type": "io", "meta": {"tags": ["a", "[b]"]}},
+        {"id": "3", "text": "Café → done", "type": "end"}
+    ],
+    "edges": [["1", "2"], ["2", "3", "yes \"really\""]]
+}
+
+def _feed(chunks):
+    parser = FlowchartStreamParser()
+    return [event for chunk in chunks for event in parser.feed(chunk)]
+
+def _expected(chart):
+    return [("node", node) for node in chart["nodes"]] + [("edge", edge) for edge in chart["edges"]]
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_every_split_gives_the_same_elements(ensure_ascii):
+    text = json.dumps(TRICKY, ensure_ascii=ensure_ascii)
+    assert _feed([text]) == _expected(TRICKY)
+    assert _feed(list(text)) == _expected(TRICKY)
+    # Two chunks split at every position: inside strings, escapes and elements
+    for cut in range(1, len(text)):
+        assert _feed([text[:cut], text[cut:]]) == _expected(TRICKY), cut
+
+def test_markdown_fence_is_skipped():
+    text = "Here you go:\n```json\n" + json.dumps(TRICKY, indent=2) + "\n```\nAnything else? {\"nodes\": [{}]}"
+    assert _feed([text[i:i + 7] for i in range(0, len(text), 7)]) == _expected(TRICKY)
+
+def test_elements_arrive_as_soon_as_they_close():
+    parser = FlowchartStreamParser()
+    assert parser.feed('{"nodes": [{"id": "1", "text": "A"') == []
+    assert parser.feed('}, {"id": "2"') == [("node", {"id": "1", "text": "A"})]
+    assert parser.feed('}], "edges": [["1", "2"]') == [("node", {"id": "2"}), ("edge", ["1", "2"])]
+
+def _delta(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+class BrokenStreamGroq:
+    """Streams ``pieces`` of a completion and then fails, like a dropped connection."""
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        async def stream():
+            for piece in self.pieces:
+                yield _delta(piece)
+            raise ConnectionError("stream dropped")
+        return stream()
+
+async def _collect(prompt, client, cache):
+    return [event async for event in stream_flowchart_from_prompt(prompt, client, cache)]
+
+def test_stream_broken_before_any_node_falls_back():
+    cache = MemoryCache()
+    text = json.dumps(TRICKY)
+    events = asyncio.run(_collect("Make tea", BrokenStreamGroq([text[:20], text[20:40]]), cache))
+    assert events == [("result", fallback_flowchart("Make tea"))]
+    # The fallback is never cached
+    assert cache.get(prompt_cache_key("Make tea")) is None
+
+def test_stream_broken_partway_keeps_the_streamed_nodes():
+    cache = MemoryCache()
+    text = json.dumps(TRICKY)
+    cut = text.index('{"id": "3"')
+    events = asyncio.run(_collect("Make tea", BrokenStreamGroq([text[:cut // 2], text[cut // 2:cut]]), cache))
+    assert events[:-1] == [("node", TRICKY["nodes"][0]), ("node", TRICKY["nodes"][1])]
+    assert events[-1] == ("result", {"nodes": TRICKY["nodes"][:2], "edges": []})
+    assert cache.get(prompt_cache_key("Make tea")) is None
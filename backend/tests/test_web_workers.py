@@ -0,0 +1,67 @@
+import os
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from services.batch import batch_workers
+from services.metrics import Metrics
+from services.workers import ImageWorkerPool
+
+client = TestClient(main.app)
+
+STATEFUL_REQUESTS = [
+    ("/api/text-to-flowchart/incremental", {"document_id": "doc", "text": "Start\nEnd"}),
+    ("/api/clusters/expand", {"chart_id": "abc", "cluster_id": "cluster-1"}),
+    ("/api/text-to-flowchart", {"text": "Start\nEnd", "detail": "overview"}),
+    ("/api/export/svg?detail=overview", {"chart_id": "abc"}),
+]
+
+@pytest.mark.parametrize("path, body", STATEFUL_REQUESTS)
+def test_per_worker_state_is_refused_with_several_workers(monkeypatch, path, body):
+    monkeypatch.setenv("WEB_WORKERS", "4")
+    monkeypatch.delenv("STICKY_SESSIONS", raising=False)
+    assert client.post(path, json=body).status_code == 501
+
+def test_sticky_sessions_allow_per_worker_state(monkeypatch):
+    monkeypatch.setenv("WEB_WORKERS", "4")
+    monkeypatch.setenv("STICKY_SESSIONS", "1")
+    path, body = STATEFUL_REQUESTS[0]
+    assert client.post(path, json=body).status_code == 200
+
+def test_auto_detail_lays_out_every_node_with_several_workers(monkeypatch):
+    monkeypatch.setenv("WEB_WORKERS", "4")
+    monkeypatch.setenv("CLUSTER_AUTO_NODES", "2")
+    text = "\n".join(["Start"] + [f"Step {i}" for i in range(10)] + ["End"])
+    answer = client.post("/api/text-to-flowchart", json={"text": text, "detail": "auto"}).json()
+    assert "chart_id" not in answer
+    assert len(answer["nodes"]) == 12
+
+def test_pool_defaults_share_the_cores_between_web_workers(monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    monkeypatch.delenv("IMAGE_WORKERS", raising=False)
+    monkeypatch.delenv("BATCH_WORKERS", raising=False)
+    monkeypatch.setenv("WEB_WORKERS", "4")
+    assert ImageWorkerPool.from_env().max_workers == 2
+    assert batch_workers() == 2
+    monkeypatch.setenv("WEB_WORKERS", "16")
+    assert ImageWorkerPool.from_env().max_workers == 1
+    assert batch_workers() == 1
+
+def test_metrics_sum_every_worker_snapshot(tmp_path):
+    registry = Metrics(str(tmp_path))
+    registry.observe_request("root", 0.002)
+    registry.count_error("http")
+
+    other = Metrics()
+    other.observe_request("root", 0.002)
+    other.observe_request("root", 20.0)
+    other.count_error("http")
+    (tmp_path / "999999.json").write_bytes(orjson.dumps(other.snapshot()))
+
+    text = registry.render()
+    assert 'flowchart_request_seconds_count{endpoint="root"} 3' in text
+    assert 'flowchart_request_seconds_bucket{endpoint="root",le="0.0025"} 2' in text
+    assert 'flowchart_errors_total{stage="http"} 2' in text
+    assert (tmp_path / f"{os.getpid()}.json").exists()
@@ -4,7 +4,14 @@ import FlowchartCanvas from './components/FlowchartCanvas'
 import InputPanel from './components/InputPanel'
 import ExportPanel from './components/ExportPanel'
 import ExampleChips from './components/ExampleChips'
-import { generateFlowchart } from './services/api'
+import { generateFlowchart, streamFlowchartFromPrompt } from './services/api'
+
+// Where a streamed node sits until the laid-out chart arrives (one row along the flow)
+const streamedPosition = (index, orientation) => (
+  orientation === 'horizontal'
+    ? { x: 150 + index * 300, y: 250 }
+    : { x: 400, y: 100 + index * 150 }
+)
 
 function App() {
   const [darkMode, setDarkMode] = useState(false)
@@ -23,8 +30,29 @@ function App() {
   const handleGenerate = async (input, mode) => {
     setLoading(true)
     try {
-      const data = await generateFlowchart(input, mode, orientation)
-      setFlowchartData(data)
+      if (mode === 'prompt') {
+        // Render nodes and edges as the LLM produces them, then the laid-out chart
+        setFlowchartData(null)
+        const partial = { nodes: [], edges: [] }
+        const data = await streamFlowchartFromPrompt(input, orientation, (frame) => {
+          if (frame.type === 'node') {
+            const position = streamedPosition(partial.nodes.length, orientation)
+            partial.nodes = [...partial.nodes, { ...frame.node, position }]
+          } else if (frame.type === 'edge') {
+            partial.edges = [...partial.edges, frame.edge]
+          } else {
+            return
+          }
+          setFlowchartData({ ...partial })
+        })
+        if (!data) {
+          throw new Error('Stream ended without a flowchart')
+        }
+        setFlowchartData(data)
+      } else {
+        const data = await generateFlowchart(input, mode, orientation)
+        setFlowchartData(data)
+      }
     } catch (error) {
       console.error('Generation error:', error)
       alert('Failed to generate flowchart. Please try again.')
@@ -160,7 +188,7 @@ function App() {
           {/* Right Panel - Canvas */}
           <div className="lg:col-span-2 animate-slide-up">
             <div className="glass-card rounded-2xl p-4 h-[calc(100vh-8rem)]">
-              {loading ? (
+              {loading && !flowchartData ? (
                 <div className="h-full flex items-center justify-center">
                   <div className="text-center">
                     <div className="w-16 h-16 border-4 border-blue-500 border-t-transparent rounded-full animate-spin mx-auto mb-4"></div>
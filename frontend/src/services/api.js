@@ -37,6 +37,47 @@ export const generateFlowchart = async (input, mode, orientation = 'horizontal')
   }
 }
 
+export const streamFlowchartFromPrompt = async (prompt, orientation = 'horizontal', onFrame) => {
+  try {
+    const response = await fetch(`${API_BASE_URL}/api/prompt-to-flowchart/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ prompt, orientation })
+    })
+    if (!response.ok) {
+      throw new Error(`Stream failed with status ${response.status}`)
+    }
+
+    // NDJSON: one frame per line (node, edge, then done with the laid-out chart)
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    let result = null
+    while (true) {
+      const { value, done } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+      const lines = buffer.split('\n')
+      buffer = lines.pop()
+      for (const line of lines) {
+        if (!line.trim()) continue
+        const frame = JSON.parse(line)
+        if (frame.type === 'error') {
+          throw new Error(frame.detail)
+        }
+        if (frame.type === 'done') {
+          result = { nodes: frame.nodes, edges: frame.edges }
+        }
+        if (onFrame) onFrame(frame)
+      }
+    }
+    return result
+  } catch (error) {
+    console.error('Stream Error:', error)
+    throw error
+  }
+}
+
 export const exportFlowchart = async (nodes, edges, format) => {
   try {
     const endpoint = `/api/export/${format}`